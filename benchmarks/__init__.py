@@ -0,0 +1,4 @@
+"""Load-testing harness of the TodoApp API.
+
+Run it with `python -m benchmarks.run --help`.
+"""
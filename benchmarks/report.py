@@ -0,0 +1,114 @@
+"""Statistics, report and baseline comparison of benchmark results."""
+import json
+import statistics
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+
+@dataclass
+class ScenarioResult:
+    """Measurements of one scenario.
+
+    Attributes:
+        name (str): The scenario name.
+        requests (int): Number of requests sent.
+        errors (int): Number of responses with an unexpected status code.
+        rps (float): Throughput, in requests per second.
+        p50_ms, p95_ms, p99_ms (float): Latency percentiles, in milliseconds.
+        queries_per_request (float | None): Mean number of SQL statements per
+        request, None when the API runs in another process.
+    """
+    name: str
+    requests: int
+    errors: int
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    queries_per_request: float | None
+
+
+def summarize(name: str, latencies: list[float], errors: int, elapsed: float,
+              queries: int | None) -> ScenarioResult:
+    """Build the result of a scenario from its raw measurements (in seconds)."""
+
+    count = len(latencies)
+    if count > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+
+    return ScenarioResult(
+        name=name,
+        requests=count,
+        errors=errors,
+        rps=round(count / elapsed, 1) if elapsed else 0.0,
+        p50_ms=round(p50 * 1000, 2),
+        p95_ms=round(p95 * 1000, 2),
+        p99_ms=round(p99 * 1000, 2),
+        queries_per_request=round(queries / count, 2) if queries is not None and count else None
+    )
+
+def format_report(results: list[ScenarioResult]) -> str:
+    """Render the results as a fixed-width table."""
+
+    header = (f"{'scenario':<24}{'requests':>9}{'errors':>8}{'req/s':>10}"
+              f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    lines = [header, "-" * len(header)]
+    for result in results:
+        queries = "-" if result.queries_per_request is None else f"{result.queries_per_request:g}"
+        lines.append(
+            f"{result.name:<24}{result.requests:>9}{result.errors:>8}{result.rps:>10.1f}"
+            f"{result.p50_ms:>10.2f}{result.p95_ms:>10.2f}{result.p99_ms:>10.2f}{queries:>9}"
+        )
+    return "\n".join(lines)
+
+# ================================ Baselines ================================= #
+def save_baseline(path: Path, results: list[ScenarioResult], config: dict) -> None:
+    """Store the results, with the run configuration, as a JSON baseline."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"config": config, "results": {result.name: asdict(result) for result in results}}
+    path.write_text(json.dumps(data, indent=2) + "\n")
+
+def compare_with_baseline(path: Path, results: list[ScenarioResult],
+                          tolerance: float) -> list[str]:
+    """List the regressions of the results compared with a stored baseline.
+
+    Query counts are deterministic and any increase is a regression. Timings
+    depend on the machine, they regress beyond `tolerance` (0.2 = 20%).
+
+    Returns:
+        list[str]: A message per regression, empty when none.
+    """
+
+    baseline = json.loads(path.read_text())["results"]
+    regressions = []
+
+    for result in results:
+        reference = baseline.get(result.name)
+        if reference is None:
+            continue
+
+        if (result.queries_per_request is not None
+                and reference["queries_per_request"] is not None
+                and result.queries_per_request > reference["queries_per_request"]):
+            regressions.append(
+                f"{result.name}: {result.queries_per_request:g} queries per request "
+                f"(baseline {reference['queries_per_request']:g})"
+            )
+
+        if result.rps < reference["rps"] * (1 - tolerance):
+            regressions.append(f"{result.name}: {result.rps:.1f} req/s "
+                               f"(baseline {reference['rps']:.1f})")
+
+        if result.p95_ms > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{result.name}: p95 {result.p95_ms:.2f} ms "
+                               f"(baseline {reference['p95_ms']:.2f})")
+
+        if result.errors > reference["errors"]:
+            regressions.append(f"{result.name}: {result.errors} errors "
+                               f"(baseline {reference['errors']})")
+
+    return regressions
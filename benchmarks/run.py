@@ -0,0 +1,195 @@
+"""Command line entry point of the benchmark.
+
+Seed a database, then replay each scenario with concurrent clients and report
+the throughput, latency percentiles and SQL statements per request:
+
+    python -m benchmarks.run --users 20 --todos-per-user 200 --concurrency 10
+    python -m benchmarks.run --baseline benchmarks/baselines/sqlite.json
+
+By default the API runs in-process (httpx ASGI transport) on a temporary
+SQLite file. `--database-url` targets another database (e.g. a local
+PostgreSQL) and `--base-url` a server started separately on that database, in
+which case query counts are not available.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+
+# SQL statements executed on behalf of the current worker
+query_counter: ContextVar[list[int] | None] = ContextVar("query_counter", default=None)
+
+def count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run",
+                                     description="Benchmark the TodoApp API.")
+    parser.add_argument("--users", type=int, default=20, help="regular users to seed")
+    parser.add_argument("--todos-per-user", type=int, default=200, help="todos seeded per user")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent clients")
+    parser.add_argument("--scenarios", nargs="+", metavar="NAME", help="scenarios to run (default: all)")
+    parser.add_argument("--database-url", help="database to seed (default: a temporary SQLite file)")
+    parser.add_argument("--reset", action="store_true", help="drop the tables of --database-url first")
+    parser.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated data")
+    parser.add_argument("--baseline", type=Path, help="baseline to compare the results with")
+    parser.add_argument("--save-baseline", type=Path, help="store the results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed timing regression against the baseline (default: 0.2)")
+    return parser.parse_args(argv)
+
+def configure_environment(args: argparse.Namespace) -> str:
+    """Point the API settings at the benchmark database, return its URL.
+
+    Must run before `todo_api` is imported, its engines are created from the
+    settings at import time.
+    """
+
+    url = args.database_url
+    if url is None:
+        url = f"sqlite:///{Path(tempfile.mkdtemp(prefix='todo-bench-')) / 'bench.db'}"
+
+    os.environ["DATABASE_URL"] = url
+    os.environ["MIGRATE_ON_STARTUP"] = "False"
+    # The login scenario measures Argon2 throughput from a single client IP
+    os.environ["RATE_LIMIT_ENABLED"] = "False"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    return url
+
+# ================================== Runner ================================== #
+async def login_clients(http, seed_data, concurrency: int):
+    """Authenticate one client per worker, and one administrator per worker."""
+    from benchmarks.scenarios import Client
+    from benchmarks.seed import BENCH_PASSWORD
+
+    async def authenticate(username: str) -> dict:
+        response = await http.post("/auth/token",
+                                   data={"username": username, "password": BENCH_PASSWORD})
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    usernames = [seed_data.usernames[worker % len(seed_data.usernames)]
+                 for worker in range(concurrency)]
+    headers = {username: await authenticate(username) for username in set(usernames)}
+    clients = [Client(username, headers[username], seed_data.todo_ids[username])
+               for username in usernames]
+
+    admin_headers = await authenticate(seed_data.admin_username)
+    admins = [Client(seed_data.admin_username, admin_headers, [])] * concurrency
+    return clients, admins
+
+async def run_scenario(http, scenario, clients, total: int, concurrency: int,
+                       count_queries: bool):
+    from benchmarks.report import summarize
+
+    if scenario.max_requests is not None:
+        total = min(total, scenario.max_requests)
+
+    latencies: list[float] = []
+    errors = 0
+    counter = [0]
+
+    async def worker(index: int) -> None:
+        nonlocal errors
+        # Each worker runs in its own task, hence its own context
+        query_counter.set(counter)
+        client = clients[index]
+        for i in range(index, total, concurrency):
+            spec = scenario.build(client, i)
+            start = time.perf_counter()
+            response = await http.request(spec.method, spec.url, **spec.kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return summarize(scenario.name, latencies, errors, elapsed,
+                     counter[0] if count_queries else None)
+
+async def run_benchmark(args: argparse.Namespace, seed_data) -> list:
+    import httpx
+    from sqlalchemy import event
+    from benchmarks.scenarios import get_scenarios
+    from todo_api.database import async_engine
+
+    scenarios = get_scenarios(args.scenarios)
+
+    if args.base_url:
+        http = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+        count_queries = False
+    else:
+        from todo_api.api import app
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count_query)
+        http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                 base_url="http://benchmark", timeout=60)
+        count_queries = True
+
+    results = []
+    try:
+        async with http:
+            clients, admins = await login_clients(http, seed_data, args.concurrency)
+            for scenario in scenarios:
+                result = await run_scenario(http, scenario, admins if scenario.admin else clients,
+                                            args.requests, args.concurrency, count_queries)
+                results.append(result)
+                print(f"  {scenario.name}: {result.rps:.1f} req/s", file=sys.stderr)
+    finally:
+        # Pooled aiosqlite connections keep the interpreter alive until closed
+        await async_engine.dispose()
+
+    return results
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    url = configure_environment(args)
+
+    # Imported once the environment points at the benchmark database
+    from sqlalchemy.engine import make_url
+    from benchmarks.report import compare_with_baseline, format_report, save_baseline
+    from benchmarks.seed import reset_database, seed_database
+
+    if args.reset:
+        reset_database(url)
+
+    print(f"Seeding {args.users} users x {args.todos_per_user} todos...", file=sys.stderr)
+    seed_data = seed_database(url, args.users, args.todos_per_user, seed=args.seed)
+
+    results = asyncio.run(run_benchmark(args, seed_data))
+    print(format_report(results))
+
+    config = {
+        "backend": make_url(url).get_backend_name(),
+        "mode": "server" if args.base_url else "in-process",
+        "users": args.users,
+        "todos_per_user": args.todos_per_user,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+    }
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, config)
+
+    if args.baseline:
+        regressions = compare_with_baseline(args.baseline, results, args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:", *regressions, sep="\n  ")
+            return 1
+        print("\nNo regression against the baseline.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Requests replayed by the benchmark, one scenario per endpoint."""
+import itertools
+from dataclasses import dataclass
+from typing import Callable
+
+from benchmarks.seed import BENCH_PASSWORD, WORDS
+
+
+@dataclass
+class Client:
+    """A benchmark worker, authenticated as one of the seeded users.
+
+    Attributes:
+        username (str): The user of the worker.
+        headers (dict): The Authorization header of the user.
+        todo_ids (list[int]): The todos of the user, shared by the workers
+        logged in as the same user (delete pops from it).
+    """
+    username: str
+    headers: dict
+    todo_ids: list[int]
+
+    def __post_init__(self):
+        self._todo_cycle = itertools.cycle(list(self.todo_ids))
+
+    def next_todo_id(self) -> int:
+        return next(self._todo_cycle)
+
+
+@dataclass
+class RequestSpec:
+    method: str
+    url: str
+    kwargs: dict
+
+
+@dataclass
+class Scenario:
+    """An endpoint under load.
+
+    Attributes:
+        name (str): Identifier of the scenario in reports and baselines.
+        build (Callable): Build the request number `i` of a worker.
+        admin (bool): Run the scenario with administrator workers.
+        max_requests (int | None): Cap of the number of requests, for the
+        scenarios too slow to run the requested count.
+    """
+    name: str
+    build: Callable[[Client, int], RequestSpec]
+    admin: bool = False
+    max_requests: int | None = None
+
+
+def login(client: Client, i: int) -> RequestSpec:
+    return RequestSpec("POST", "/auth/token",
+                       {"data": {"username": client.username, "password": BENCH_PASSWORD}})
+
+def list_todos(client: Client, i: int) -> RequestSpec:
+    return RequestSpec("GET", "/todos", {"headers": client.headers, "params": {"limit": 50}})
+
+def list_incomplete_todos(client: Client, i: int) -> RequestSpec:
+    return RequestSpec("GET", "/todos", {"headers": client.headers,
+                                         "params": {"complete": False, "limit": 50}})
+
+def search_todos(client: Client, i: int) -> RequestSpec:
+    return RequestSpec("GET", "/todos", {"headers": client.headers,
+                                         "params": {"search": WORDS[i % len(WORDS)][:4]}})
+
+def create_todo(client: Client, i: int) -> RequestSpec:
+    return RequestSpec("POST", "/todos", {
+        "headers": client.headers,
+        "json": {"title": f"Benchmark todo {i}", "description": "Created by the benchmark",
+                 "priority": i % 5 + 1}
+    })
+
+def read_todo(client: Client, i: int) -> RequestSpec:
+    return RequestSpec("GET", f"/todos/{client.next_todo_id()}", {"headers": client.headers})
+
+def update_todo(client: Client, i: int) -> RequestSpec:
+    return RequestSpec("PUT", f"/todos/{client.next_todo_id()}", {
+        "headers": client.headers,
+        "json": {"priority": i % 5 + 1, "complete": i % 2 == 0}
+    })
+
+def delete_todo(client: Client, i: int) -> RequestSpec:
+    # Once the user has no todo left the request fails with 404
+    todo_id = client.todo_ids.pop() if client.todo_ids else 0
+    return RequestSpec("DELETE", f"/todos/{todo_id}", {"headers": client.headers})
+
+def admin_list_users(client: Client, i: int) -> RequestSpec:
+    return RequestSpec("GET", "/admin/users", {"headers": client.headers,
+                                               "params": {"limit": 50}})
+
+def admin_search_users(client: Client, i: int) -> RequestSpec:
+    return RequestSpec("GET", "/admin/users", {"headers": client.headers,
+                                               "params": {"username": "bench_user_1"}})
+
+# Delete runs last, it consumes the seeded todos
+SCENARIOS = [
+    # Argon2 is deliberately slow (~100 ms per hash)
+    Scenario("login", login, max_requests=100),
+    Scenario("list_todos", list_todos),
+    Scenario("list_incomplete_todos", list_incomplete_todos),
+    Scenario("search_todos", search_todos),
+    Scenario("read_todo", read_todo),
+    Scenario("create_todo", create_todo),
+    Scenario("update_todo", update_todo),
+    Scenario("admin_list_users", admin_list_users, admin=True),
+    Scenario("admin_search_users", admin_search_users, admin=True),
+    Scenario("delete_todo", delete_todo),
+]
+
+def get_scenarios(names: list[str] | None) -> list[Scenario]:
+    """The scenarios named in `names`, in their run order (all when None)."""
+
+    if not names:
+        return SCENARIOS
+
+    unknown = set(names) - {scenario.name for scenario in SCENARIOS}
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    return [scenario for scenario in SCENARIOS if scenario.name in names]
@@ -0,0 +1,106 @@
+"""Seeding of the benchmark database."""
+import random
+from dataclasses import dataclass, field
+
+from sqlalchemy import func, insert, select, text
+
+from todo_api.database import Base, create_database_engine, run_migrations
+from todo_api.models import User, Todo
+from todo_api.security import hash_password
+
+
+BENCH_PASSWORD = "benchmark-password"
+ADMIN_USERNAME = "bench_admin"
+
+# Words of the seeded titles and descriptions, searched by the search scenario
+WORDS = ["groceries", "report", "meeting", "invoice", "garden", "backup",
+         "review", "travel", "dentist", "release", "budget", "laundry"]
+
+@dataclass
+class SeedData:
+    """Accounts and rows created by `seed_database`.
+
+    Attributes:
+        usernames (list[str]): The regular users, all sharing `BENCH_PASSWORD`.
+        admin_username (str): The administrator account.
+        todo_ids (dict[str, list[int]]): The todo ids owned by each user.
+    """
+    usernames: list[str]
+    admin_username: str = ADMIN_USERNAME
+    todo_ids: dict[str, list[int]] = field(default_factory=dict)
+
+
+def reset_database(url: str) -> None:
+    """Drop every table of the database, including the Alembic version table."""
+
+    engine = create_database_engine(url)
+    try:
+        Base.metadata.drop_all(engine)
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    finally:
+        engine.dispose()
+
+def seed_database(url: str, users: int, todos_per_user: int,
+                  seed: int = 0) -> SeedData:
+    """Migrate the database and insert `users` users owning `todos_per_user` todos.
+
+    Args:
+        url (str): The database URL, the database must not hold any user.
+        users (int): Number of regular users.
+        todos_per_user (int): Number of todos of each user.
+        seed (int): Seed of the generated titles, for reproducible runs.
+
+    Returns:
+        SeedData: The created accounts and todo ids.
+
+    Raises:
+        SystemExit: If the database already holds users.
+    """
+
+    run_migrations(url)
+    rng = random.Random(seed)
+    # Argon2 is slow by design, every account shares the same hash
+    hashed_password = hash_password(BENCH_PASSWORD)
+
+    engine = create_database_engine(url)
+    try:
+        with engine.begin() as connection:
+            if connection.scalar(select(func.count()).select_from(User)):
+                raise SystemExit(f"{url} already holds users, use --reset to empty it.")
+
+            usernames = [f"bench_user_{index}" for index in range(users)]
+            accounts = [
+                {"username": username, "email": f"{username}@example.com",
+                 "first_name": "Bench", "last_name": "User", "role": "user"}
+                for username in usernames
+            ]
+            accounts.append({"username": ADMIN_USERNAME, "email": "admin@example.com",
+                             "first_name": "Bench", "last_name": "Admin", "role": "admin"})
+            for account in accounts:
+                account.update(hashed_password=hashed_password, is_active=True)
+
+            user_ids = connection.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True), accounts
+            ).scalars().all()
+
+            data = SeedData(usernames=usernames)
+            for username, user_id in zip(usernames, user_ids):
+                rows = [
+                    {"title": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} #{index}",
+                     "description": " ".join(rng.sample(WORDS, 3)),
+                     "priority": rng.randint(1, 5),
+                     "complete": rng.random() < 0.3,
+                     "owner_id": user_id}
+                    for index in range(todos_per_user)
+                ]
+                if rows:
+                    data.todo_ids[username] = connection.execute(
+                        insert(Todo).returning(Todo.id, sort_by_parameter_order=True), rows
+                    ).scalars().all()
+                else:
+                    data.todo_ids[username] = []
+    finally:
+        engine.dispose()
+
+    return data
@@ -1,37 +1,75 @@
 import pytest
+import pytest_asyncio
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from sqlalchemy.exc import PendingRollbackError, InvalidRequestError
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 
 from todo_api.database import Base
 from todo_api.api import app
-from todo_api.dependencies import get_db, get_current_user
+from todo_api.dependencies import get_db, get_current_user, db_dependency
 from todo_api.models import User, Todo
 from todo_api.security import hash_password
+from todo_api.config import settings
+from todo_api.cache import user_cache, TTLCache
+from todo_api.metrics import instrument_engine
+from todo_api.revocation import revocation_list
+from todo_api import ratelimit
+
+# The tests build their own schema, the configured database must not be migrated
+settings.migrate_on_startup = False
 
 # ============================= DB Setup Fixtures ============================ #
 @pytest.fixture(scope="session")
-def engine():
-    """Creates the SQLAlchemy engine for an in-memory SQLite database."""
+def database_path(tmp_path_factory):
+    """Path of the temporary SQLite database shared by the sync and async engines.
+    
+    The API runs on the async engine while the tests arrange and assert data
+    through a sync session, so both engines must point to the same database.
+    """
+    return tmp_path_factory.mktemp("db") / "test_todosapp.db"
+
+@pytest.fixture(scope="session")
+def engine(database_path):
+    """Creates the sync SQLAlchemy engine used by the tests themselves."""
     
-    # StaticPool ensures that the same thread is always used for SQLite
-    SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+    SQLALCHEMY_DATABASE_URL = f"sqlite:///{database_path}"
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool
+        connect_args={"check_same_thread": False}
     )
     
     Base.metadata.create_all(bind=engine)
     yield engine
+    engine.dispose()
+    
+@pytest.fixture(scope="session")
+def async_engine(database_path, engine):
+    """Creates the async SQLAlchemy engine used by the API under test.
+    
+    NullPool: every TestClient runs its own event loop, so connections must not
+    be reused across tests.
+    """
+    
+    SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{database_path}"
+    async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+    # Like the engines of `todo_api.database`, statements feed the request metrics
+    instrument_engine(async_engine.sync_engine)
+    yield async_engine
+    
+@pytest.fixture(scope="session")
+def async_session_factory(async_engine):
+    """Session factory mirroring `todo_api.database.AsyncSessionLocal`."""
+    
+    return async_sessionmaker(bind=async_engine, autoflush=False,
+                              expire_on_commit=False)
     
 @pytest.fixture(scope="function")
 def db(engine):
-    """Creates an isolated DB session for each test.
+    """Creates a sync DB session for each test.
 
-    Transactions are rolled back at the end (quick cleanup).
+    Every table is emptied at the end of the test (quick cleanup).
     
     Args:
         engine: The SQLAlchemy engine instance provided by the engine fixture.
@@ -39,33 +77,67 @@ def db(engine):
     Yields:
         db: A SQLAlchemy session object scoped to the test function.
     """
-    connection = engine.connect()
-    transaction = connection.begin()
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=connection)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     db = TestingSessionLocal()
     try:
         yield db
     finally:
-        
-        try:
-            db.rollback()
-        except (PendingRollbackError, InvalidRequestError):
-            pass
-        
+        db.rollback()
         db.close()
         
-        if transaction.is_active:
-            transaction.rollback()
+        # Children first to respect the foreign keys
+        with engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(table.delete())
+                
+@pytest_asyncio.fixture(scope="function")
+async def async_db(db, async_session_factory):
+    """Creates an async DB session, for tests calling dependencies directly."""
+    
+    async with async_session_factory() as session:
+        yield session
         
-        connection.close()
+@pytest.fixture(scope="function", autouse=True)
+def empty_user_cache():
+    """Start each test with an empty user cache, ids are reused between tests."""
+    
+    user_cache.backend = TTLCache(max_size=settings.user_cache_max_size)
+    
+@pytest.fixture(scope="function", autouse=True)
+def empty_revocation_list():
+    """Start each test without revoked tokens, the tables are emptied between tests."""
+    
+    revocation_list.clear()
+    
+@pytest.fixture(scope="function", autouse=True)
+def empty_rate_limits():
+    """Start each test with full rate limit buckets, the tests log in repeatedly."""
+    
+    ratelimit.rate_limit_backend = ratelimit.MemoryRateLimitBackend(
+        max_keys=settings.rate_limit_max_keys
+    )
+    
+def override_current_user(user: User):
+    """Build a `get_current_user` override authenticating `user`.
+    
+    The user is loaded through the request session, as the real dependency
+    does, so that the routers can update it.
+    """
+    
+    user_id = user.id
+    
+    async def override_get_current_user(db: db_dependency) -> User:
+        return await db.get(User, user_id)
+    
+    return override_get_current_user
         
 @pytest.fixture(scope="function")
-def client(db):
-    """Fixture to provide a TestClient with the same injected session."""
+def client(db, async_session_factory):
+    """Fixture to provide a TestClient bound to the test database."""
 
-    def override_get_db_for_client():
-        # The override simply returns the existing session, not a new one.
-        yield db 
+    async def override_get_db_for_client():
+        async with async_session_factory() as session:
+            yield session
 
     app.dependency_overrides[get_db] = override_get_db_for_client
     
@@ -76,17 +148,15 @@ def client(db):
     
 
 @pytest.fixture(scope="function")
-def auth_client(db, test_user):
+def auth_client(db, async_session_factory, test_user):
     """Fixture to provide a TestClient with an authenticated test user."""
     
-    def override_get_db_for_client():
-        yield db
-    
-    def override_get_current_user():
-        return test_user
+    async def override_get_db_for_client():
+        async with async_session_factory() as session:
+            yield session
 
     app.dependency_overrides[get_db] = override_get_db_for_client
-    app.dependency_overrides[get_current_user] = override_get_current_user
+    app.dependency_overrides[get_current_user] = override_current_user(test_user)
     
     with TestClient(app) as test_client:
         yield test_client
@@ -94,17 +164,15 @@ def auth_client(db, test_user):
     app.dependency_overrides.clear()
 
 @pytest.fixture(scope="function")
-def admin_client(db, test_admin):
+def admin_client(db, async_session_factory, test_admin):
     """Fixture to provide a TestClient with an authenticated admin."""
     
-    def override_get_db_for_client():
-        yield db
-    
-    def override_get_current_user():
-        return test_admin
+    async def override_get_db_for_client():
+        async with async_session_factory() as session:
+            yield session
 
     app.dependency_overrides[get_db] = override_get_db_for_client
-    app.dependency_overrides[get_current_user] = override_get_current_user
+    app.dependency_overrides[get_current_user] = override_current_user(test_admin)
     
     with TestClient(app) as test_client:
         yield test_client
@@ -127,7 +195,7 @@ def test_user(db):
     )
     
     db.add(user)
-    db.flush()
+    db.commit()
     db.refresh(user)
     yield user
     
@@ -146,7 +214,7 @@ def test_admin(db):
     )
     
     db.add(admin)
-    db.flush()
+    db.commit()
     db.refresh(admin)
     yield admin
     
@@ -165,7 +233,7 @@ def test_inactive_user(db):
     )
     
     db.add(user)
-    db.flush()
+    db.commit()
     db.refresh(user)
     yield user
 # ============================ Todo Fixture ================================== #
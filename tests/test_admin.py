@@ -1,7 +1,9 @@
 from fastapi import status
+from datetime import timedelta
 
 from tests.utils import model_to_dict
 from todo_api.models import Todo, User
+from todo_api.security import create_access_token
 
 class TestReaAllUser:
     
@@ -11,7 +13,7 @@ class TestReaAllUser:
         response = admin_client.get("/admin/users")
         assert response.status_code == status.HTTP_200_OK
         
-        user_list = response.json()
+        user_list = response.json()["items"]
         assert len(user_list) == 2
         
     def test_read_all_users_role_filter(self, db, admin_client, test_admin, test_user):
@@ -20,7 +22,7 @@ class TestReaAllUser:
         response = admin_client.get("/admin/users?role=user")
         assert response.status_code == status.HTTP_200_OK
         
-        user_list = response.json()
+        user_list = response.json()["items"]
         assert len(user_list) == 1
         
         assert user_list[0]["role"] == "user"
@@ -33,11 +35,27 @@ class TestReaAllUser:
         response = admin_client.get(f"/admin/users?username={pattern}")
         assert response.status_code == status.HTTP_200_OK
         
-        user_list = response.json()
+        user_list = response.json()["items"]
         assert len(user_list) == 1
         
         assert user_list[0]["username"].startswith(pattern)
         
+    def test_read_all_users_username_filter_last_code_point(self, db, admin_client, test_user):
+        
+        # A prefix without a successor is an open-ended range
+        response = admin_client.get("/admin/users", params={"username": "\U0010FFFF"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["items"] == []
+        
+    def test_read_all_users_username_filter_non_ascii(self, db, admin_client, test_user):
+        
+        test_user.username = "Élodie"
+        db.commit()
+        
+        # Non-ASCII letters are matched as stored, like SQLite's lower()
+        response = admin_client.get("/admin/users", params={"username": "Élo"})
+        assert [user["username"] for user in response.json()["items"]] == ["Élodie"]
+        
     def test_read_all_users_is_active_filter(self, db, admin_client, test_admin,
                                              test_inactive_user):
         
@@ -45,10 +63,59 @@ class TestReaAllUser:
         response = admin_client.get("/admin/users?is_active=False")
         assert response.status_code == status.HTTP_200_OK
         
-        user_list = response.json()
+        user_list = response.json()["items"]
         assert len(user_list) == 1
         
         assert user_list[0]["is_active"] is False
+        
+    def test_read_all_users_with_stats(self, db, admin_client, test_admin, test_user,
+                                       test_inactive_user, test_todos):
+        
+        # Send GET request
+        response = admin_client.get("/admin/users", params={"include_stats": True})
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that the todo activity of every user comes in the same query
+        # (the other one authenticates the admin)
+        assert 'desc="2 queries"' in response.headers["Server-Timing"]
+        
+        users = {user["id"]: user for user in response.json()["items"]}
+        assert users[test_user.id]["todo_count"] == 2
+        assert users[test_user.id]["complete_count"] == 1
+        assert users[test_user.id]["last_activity"] == max(
+            todo.updated_at for todo in test_todos["user"]
+        ).isoformat()
+        assert users[test_admin.id]["todo_count"] == 1
+        assert users[test_inactive_user.id]["todo_count"] == 0
+        assert users[test_inactive_user.id]["last_activity"] is None
+        
+    def test_read_all_users_without_stats(self, db, admin_client, test_admin):
+        
+        # Send GET request
+        response = admin_client.get("/admin/users")
+        assert "todo_count" not in response.json()["items"][0]
+        
+    def test_read_all_users_pagination(self, db, admin_client, test_admin, test_user,
+                                       test_inactive_user):
+        
+        # Send GET request for the first page
+        response = admin_client.get("/admin/users?limit=2")
+        assert response.status_code == status.HTTP_200_OK
+        
+        first_page = response.json()
+        assert len(first_page["items"]) == 2
+        assert first_page["next_cursor"] is not None
+        
+        # Send GET request for the next page
+        response = admin_client.get("/admin/users", params={
+            "limit": 2, "cursor": first_page["next_cursor"]
+        })
+        assert response.status_code == status.HTTP_200_OK
+        
+        last_page = response.json()
+        assert len(last_page["items"]) == 1
+        assert last_page["next_cursor"] is None
+        assert last_page["items"][0]["id"] > first_page["items"][-1]["id"]
 
 class TestReadUser:
     
@@ -90,6 +157,78 @@ class TestReadTodo:
         response = admin_client.get("/admin/todos/42")
         assert response.status_code == status. HTTP_404_NOT_FOUND
         assert response.json()["detail"] == "Todo not found."
+        
+    def test_read_user_todos_sorted(self, db, admin_client, test_user, test_todos):
+        
+        # Send GET request
+        response = admin_client.get(f"/admin/users/{test_user.id}/todos",
+                                    params={"sort": "priority"})
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that the todos are in ascending priority order
+        priorities = [todo["priority"] for todo in response.json()]
+        assert priorities == [3, 5]
+        
+    def test_read_user_todos_single_query(self, db, admin_client, test_user, test_todos):
+        
+        # Send GET request
+        response = admin_client.get(f"/admin/users/{test_user.id}/todos")
+        assert response.status_code == status.HTTP_200_OK
+        assert [todo["id"] for todo in response.json()] == [
+            todo.id for todo in test_todos["user"]
+        ]
+        
+        # verifies that the user check and the todos share a query (the other
+        # one authenticates the admin)
+        assert 'desc="2 queries"' in response.headers["Server-Timing"]
+        
+    def test_read_user_todos_without_todos(self, db, admin_client, test_inactive_user):
+        
+        # Send GET request
+        response = admin_client.get(f"/admin/users/{test_inactive_user.id}/todos")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []
+        
+    def test_read_user_todos_not_found(self, db, admin_client, test_admin):
+        
+        # Send GET request
+        response = admin_client.get("/admin/users/42/todos")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json()["detail"] == "User not found."
+        
+    def test_export_user_todos(self, db, admin_client, test_user, test_todos):
+        
+        # Send GET request
+        response = admin_client.get(f"/admin/users/{test_user.id}/todos/export",
+                                    params={"format": "csv"})
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that only the todos of the user follow the header
+        lines = response.text.splitlines()
+        assert lines[0] == "id,title,description,priority,complete,owner_id"
+        assert [int(line.split(",")[0]) for line in lines[1:]] == [
+            todo.id for todo in test_todos["user"]
+        ]
+        
+    def test_export_user_todos_not_found(self, db, admin_client, test_todos):
+        
+        # Send GET request
+        response = admin_client.get("/admin/users/42/todos/export")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json()["detail"] == "User not found."
+
+class TestTodoStats:
+    
+    def test_read_todo_stats(self, db, admin_client, test_todos):
+        
+        # Send GET request
+        response = admin_client.get("/admin/stats")
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that the todos of every user are counted
+        stats = response.json()
+        assert (stats["total"], stats["complete"], stats["pending"]) == (3, 1, 2)
+        assert [counts["priority"] for counts in stats["by_priority"]] == [3, 4, 5]
 
 class TestUpdateUser:
     
@@ -117,6 +256,46 @@ class TestUpdateUser:
         for field, value in old_data.items():
             assert value == getattr(test_inactive_user, field)
             
+    def test_update_user_refreshes_cached_user(self, db, client, test_admin, test_user):
+        
+        # Real tokens, going through `get_current_user` and its cache
+        user_headers, admin_headers = [
+            {"Authorization": "Bearer " + create_access_token(
+                user.username, user.id, user.role, timedelta(minutes=5)
+            )} for user in (test_user, test_admin)
+        ]
+        
+        # The first request caches the authenticated user
+        response = client.get("/user/me", headers=user_headers)
+        assert response.json()["role"] == "user"
+        
+        # Send PUT request
+        response = client.put(f"/admin/users/{test_user.id}", json={"role": "admin"},
+                              headers=admin_headers)
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that the cached user was invalidated
+        response = client.get("/user/me", headers=user_headers)
+        assert response.json()["role"] == "admin"
+            
+    def test_update_user_deactivated_logged_out(self, db, client, test_admin, test_user):
+        
+        admin_headers = {"Authorization": "Bearer " + create_access_token(
+            test_admin.username, test_admin.id, test_admin.role, timedelta(minutes=5))}
+        user_headers = {"Authorization": "Bearer " + create_access_token(
+            test_user.username, test_user.id, test_user.role, timedelta(minutes=5))}
+        
+        client.put(f"/admin/users/{test_user.id}", headers=admin_headers,
+                   json={"is_active": False})
+        response = client.get("/user/me", headers=user_headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+        # verifies that the token stays revoked once the user is reactivated
+        client.put(f"/admin/users/{test_user.id}", headers=admin_headers,
+                   json={"is_active": True})
+        response = client.get("/user/me", headers=user_headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
     def test_update_user_not_found(self, db, admin_client, test_admin,
                                    test_inactive_user):
         
@@ -182,6 +361,12 @@ class TestNonAdminUser:
         assert response.status_code == status.HTTP_403_FORBIDDEN
         assert response.json()["detail"] == "Operation requires administrator privileges."
         
+    def test_read_todo_stats(self, db, auth_client, test_user):
+        
+        # Send GET request
+        response = auth_client.get("/admin/stats")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        
     def test_update_user(self, db, auth_client, test_user):
         
         new_data = {
@@ -1,12 +1,16 @@
+import asyncio
 import pytest
 from fastapi import status, HTTPException
 from jose import jwt
 from datetime import datetime, timedelta, timezone
 
 from todo_api.config import settings
-from todo_api.models import User
-from todo_api.security import credential_exception
+from todo_api.models import User, RevokedToken, RefreshToken
+from todo_api.security import credential_exception, create_access_token, decode_access_token
+from todo_api.cache import user_cache
 from todo_api.dependencies import get_current_user
+from todo_api.revocation import RevocationList, revocation_list, revoke_token
+from todo_api.refresh_tokens import hash_refresh_token
 from todo_api.routers.auth import authenticate_user
 from tests.utils import model_to_dict
 
@@ -38,7 +42,9 @@ class TestRegister:
         
         user_data_db = model_to_dict(user_in_db, exclude={"id",
                                                           "hashed_password",
-                                                          "is_active"})
+                                                          "is_active",
+                                                          "todos_version",
+                                                          "tokens_valid_after"})
         for field, value in user_data_db.items():
             assert value == user_data.get(field)
             
@@ -76,29 +82,32 @@ class TestRegister:
             
 class TestLogin:
 
-    def test_authenticate_user_success(self, client, db, test_user):
+    @pytest.mark.asyncio
+    async def test_authenticate_user_success(self, client, db, async_db, test_user):
         
-        auth_user = authenticate_user(username=test_user.username,
-                                      password="testpassword",
-                                      db=db)
+        auth_user = await authenticate_user(username=test_user.username,
+                                            password="testpassword",
+                                            db=async_db)
         
         assert auth_user
         
         for field, value in model_to_dict(auth_user).items():
             assert value == getattr(test_user, field)
             
-    def test_authenticate_user_wrong_password(self, client, db, test_user):
+    @pytest.mark.asyncio
+    async def test_authenticate_user_wrong_password(self, client, db, async_db, test_user):
         
-        auth_user = authenticate_user(username=test_user.username,
-                                      password="anypassword",
-                                      db=db)
+        auth_user = await authenticate_user(username=test_user.username,
+                                            password="anypassword",
+                                            db=async_db)
         assert auth_user is None
         
-    def test_authenticate_user_unknow_user(self, client, db, test_user):
+    @pytest.mark.asyncio
+    async def test_authenticate_user_unknow_user(self, client, db, async_db, test_user):
         
-        auth_user = authenticate_user(username="AnyUser",
-                                      password="testpassword",
-                                      db=db)
+        auth_user = await authenticate_user(username="AnyUser",
+                                            password="testpassword",
+                                            db=async_db)
         assert auth_user is None
         
     def test_login_success(self, client, db, test_user):
@@ -117,6 +126,19 @@ class TestLogin:
         assert isinstance(token_response["access_token"], str)
         assert len(token_response["access_token"]) > 0
         assert token_response["token_type"] == "bearer"
+        assert token_response["expires_in"] == settings.access_token_expire_minutes * 60
+        assert len(token_response["refresh_token"]) > 0
+        
+    def test_login_inactive_user(self, client, db, test_inactive_user):
+        
+        login_data = {
+            "username": test_inactive_user.username,
+            "password": "testpassword"
+        }
+        
+        # verifies that no token is issued to an inactive user
+        response = client.post("/auth/token", data=login_data)
+        assert response.status_code == credential_exception.status_code
         
     def test_login_unhauthorized(self, client, db, test_user):
         
@@ -134,12 +156,16 @@ class TestLogin:
 class TestCurrentUser:
     
     @pytest.mark.asyncio
-    async def test_get_current_user_valid_token(self, client, db, test_user):
+    async def test_get_current_user_valid_token(self, client, db, async_db, test_user):
         
+        now = datetime.now(timezone.utc)
         to_encode = {
             "sub": test_user.username,
             "id": test_user.id,
-            "role": test_user.role
+            "role": test_user.role,
+            "jti": "token-id",
+            "iat": now.timestamp(),
+            "exp": now + timedelta(minutes=5)
         }
         
         token = jwt.encode(
@@ -148,13 +174,36 @@ class TestCurrentUser:
             algorithm=settings.algorithm
         )
         
-        user = await get_current_user(token=token, db=db)
+        user = await get_current_user(token=token, db=async_db)
         
-        for field, value in model_to_dict(user).items():
+        for field, value in user.model_dump().items():
             assert value == getattr(test_user, field)
             
     @pytest.mark.asyncio
-    async def test_get_current_user_missing_value(self, client, db, test_user):
+    async def test_get_current_user_cached(self, client, db, async_db, test_user):
+        
+        token = create_access_token(test_user.username, test_user.id,
+                                    test_user.role, timedelta(minutes=5))
+        
+        user = await get_current_user(token=token, db=async_db)
+        
+        # Remove the user behind the cache's back
+        db.delete(test_user)
+        db.commit()
+        
+        # verifies that the second call is served without the database
+        cached_user = await get_current_user(token=token, db=async_db)
+        assert cached_user == user
+        
+        await user_cache.invalidate(user.id)
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(token=token, db=async_db)
+        
+        assert exc_info.value.status_code == credential_exception.status_code
+            
+    @pytest.mark.asyncio
+    async def test_get_current_user_missing_value(self, client, db, async_db, test_user):
         
         to_encode = {
             "sub": test_user.username
@@ -167,13 +216,13 @@ class TestCurrentUser:
         )
         
         with pytest.raises(HTTPException) as exc_info:
-            await get_current_user(token=token, db=db)
+            await get_current_user(token=token, db=async_db)
         
         assert exc_info.value.status_code == credential_exception.status_code
         assert exc_info.value.detail == credential_exception.detail
         
     @pytest.mark.asyncio
-    async def test_get_current_user_expired_token(self, client, db, test_user):
+    async def test_get_current_user_expired_token(self, client, db, async_db, test_user):
         
         to_encode = {
             "sub": test_user.username,
@@ -189,13 +238,13 @@ class TestCurrentUser:
         )
         
         with pytest.raises(HTTPException) as exc_info:
-            await get_current_user(token=token, db=db)
+            await get_current_user(token=token, db=async_db)
         
         assert exc_info.value.status_code == credential_exception.status_code
         assert exc_info.value.detail == credential_exception.detail
         
     @pytest.mark.asyncio
-    async def test_get_current_user_deleted_user(self, client, db, test_user):
+    async def test_get_current_user_deleted_user(self, client, db, async_db, test_user):
         
         to_encode = {
             "sub": test_user.username,
@@ -213,7 +262,227 @@ class TestCurrentUser:
         db.commit()
         
         with pytest.raises(HTTPException) as exc_info:
-            await get_current_user(token=token, db=db)
+            await get_current_user(token=token, db=async_db)
         
         assert exc_info.value.status_code == credential_exception.status_code
-        assert exc_info.value.detail == credential_exception.detail
\ No newline at end of file
+        assert exc_info.value.detail == credential_exception.detail
+            
+    @pytest.mark.asyncio
+    async def test_get_current_user_inactive(self, client, db, async_db, test_inactive_user):
+        
+        token = create_access_token(test_inactive_user.username, test_inactive_user.id,
+                                    test_inactive_user.role, timedelta(minutes=5))
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(token=token, db=async_db)
+        
+        assert exc_info.value.status_code == credential_exception.status_code
+        
+    @pytest.mark.asyncio
+    async def test_get_current_user_issued_before_valid_after(self, client, db, async_db,
+                                                              test_user):
+        
+        token = create_access_token(test_user.username, test_user.id,
+                                    test_user.role, timedelta(minutes=5))
+        
+        # Tokens revoked by a later password change
+        test_user.tokens_valid_after = decode_access_token(token)["issued_at"] + timedelta(seconds=1)
+        db.commit()
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(token=token, db=async_db)
+        
+        assert exc_info.value.status_code == credential_exception.status_code
+        
+    @pytest.mark.asyncio
+    async def test_get_current_user_revoked_elsewhere(self, client, db, async_db, test_user,
+                                                      monkeypatch):
+        
+        monkeypatch.setattr(revocation_list, "refresh_interval", 0)
+        token = create_access_token(test_user.username, test_user.id,
+                                    test_user.role, timedelta(minutes=5))
+        await get_current_user(token=token, db=async_db)
+        
+        # Revoked by another worker, after the first refresh
+        token_data = decode_access_token(token)
+        db.add(RevokedToken(jti=token_data["jti"], expires_at=token_data["expires_at"]))
+        db.commit()
+        await async_db.rollback()
+        
+        # verifies that the incremental refresh picks the revocation up
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(token=token, db=async_db)
+        
+        assert exc_info.value.status_code == credential_exception.status_code
+        assert len(revocation_list) == 1
+        
+    @pytest.mark.asyncio
+    async def test_revocation_list_first_refresh_waited(self, db, async_db, test_user):
+        
+        token = create_access_token(test_user.username, test_user.id,
+                                    test_user.role, timedelta(minutes=5))
+        token_data = decode_access_token(token)
+        db.add(RevokedToken(jti=token_data["jti"], expires_at=token_data["expires_at"]))
+        db.commit()
+        
+        revocations = RevocationList(refresh_interval=60)
+        first_refresh = asyncio.create_task(revocations.refresh(async_db))
+        await asyncio.sleep(0)
+        
+        # verifies that a check during the first refresh waits for the revoked tokens
+        await revocations.refresh(None)
+        assert revocations.is_revoked(token_data["jti"])
+        await first_refresh
+        
+
+class TestLogout:
+    
+    def test_logout(self, client, db, test_user):
+        
+        login_data = {"username": test_user.username, "password": "testpassword"}
+        token = client.post("/auth/token", data=login_data).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        
+        response = client.post("/auth/logout", headers=headers)
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        
+        # verifies that the token is rejected, another one still works
+        response = client.get("/user/me", headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+        token = client.post("/auth/token", data=login_data).json()["access_token"]
+        response = client.get("/user/me", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == status.HTTP_200_OK
+        
+    def test_logout_stored(self, client, db, test_user):
+        
+        token = create_access_token(test_user.username, test_user.id,
+                                    test_user.role, timedelta(minutes=5))
+        client.post("/auth/logout", headers={"Authorization": f"Bearer {token}"})
+        
+        # verifies that the revocation is stored for the other workers
+        revoked = db.query(RevokedToken).one()
+        assert revoked.jti == decode_access_token(token)["jti"]
+        
+    @pytest.mark.asyncio
+    async def test_revoke_token_rolled_back(self, db, async_db, test_user):
+        
+        token = create_access_token(test_user.username, test_user.id,
+                                    test_user.role, timedelta(minutes=5))
+        token_data = decode_access_token(token)
+        await revoke_token(async_db, token_data["jti"], token_data["expires_at"])
+        await async_db.rollback()
+        
+        # verifies that a revocation which is not committed does not reject the token
+        assert not revocation_list.is_revoked(token_data["jti"])
+        assert await get_current_user(token=token, db=async_db)
+        
+
+class TestRefreshToken:
+    
+    def login(self, client, test_user) -> dict:
+        login_data = {"username": test_user.username, "password": "testpassword"}
+        return client.post("/auth/token", data=login_data).json()
+    
+    def test_refresh(self, client, db, test_user):
+        
+        tokens = self.login(client, test_user)
+        
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that both tokens are new and the session is kept
+        refreshed = response.json()
+        assert refreshed["refresh_token"] != tokens["refresh_token"]
+        assert refreshed["access_token"] != tokens["access_token"]
+        assert (decode_access_token(refreshed["access_token"])["session_id"]
+                == decode_access_token(tokens["access_token"])["session_id"])
+        
+        response = client.get("/user/me",
+                              headers={"Authorization": f"Bearer {refreshed['access_token']}"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["username"] == test_user.username
+        
+    def test_refresh_token_hashed(self, client, db, test_user):
+        
+        tokens = self.login(client, test_user)
+        
+        # verifies that only the hash of the token is stored
+        stored = db.query(RefreshToken).one()
+        assert stored.token_hash == hash_refresh_token(tokens["refresh_token"])
+        assert stored.user_id == test_user.id
+        assert stored.used_at is None
+        
+    def test_refresh_unknown_token(self, client, db, test_user):
+        
+        response = client.post("/auth/refresh", json={"refresh_token": "unknown"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+    def test_refresh_expired_token(self, client, db, test_user):
+        
+        tokens = self.login(client, test_user)
+        db.query(RefreshToken).update({RefreshToken.expires_at: datetime(2000, 1, 1)})
+        db.commit()
+        
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+    def test_refresh_reuse_revokes_family(self, client, db, test_user):
+        
+        tokens = self.login(client, test_user)
+        other_session = self.login(client, test_user)
+        
+        rotated = client.post("/auth/refresh",
+                              json={"refresh_token": tokens["refresh_token"]}).json()
+        
+        # verifies that replaying the used token is rejected and revokes the
+        # token it was replaced with, not the other sessions
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+        response = client.post("/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+        response = client.post("/auth/refresh",
+                               json={"refresh_token": other_session["refresh_token"]})
+        assert response.status_code == status.HTTP_200_OK
+        
+    def test_refresh_after_logout(self, client, db, test_user):
+        
+        tokens = self.login(client, test_user)
+        client.post("/auth/logout", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+        
+        # verifies that logout ends the session
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+    def test_refresh_after_password_change(self, client, db, test_user):
+        
+        tokens = self.login(client, test_user)
+        client.put("/user/me/password",
+                   headers={"Authorization": f"Bearer {tokens['access_token']}"},
+                   json={"old_password": "testpassword", "new_password": "newpassword"})
+        
+        # verifies that the sessions opened before the change are revoked
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+    def test_refresh_inactive_user(self, client, db, test_user):
+        
+        tokens = self.login(client, test_user)
+        test_user.is_active = False
+        db.commit()
+        
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+    def test_refresh_skips_argon2(self, client, db, test_user, monkeypatch):
+        
+        tokens = self.login(client, test_user)
+        
+        def fail(*args):
+            raise AssertionError("Argon2 used by a refresh")
+        monkeypatch.setattr("todo_api.security.verify_password", fail)
+        
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == status.HTTP_200_OK
@@ -0,0 +1,40 @@
+from benchmarks.report import ScenarioResult, compare_with_baseline, save_baseline, summarize
+from benchmarks.serialization import compare_paths
+
+
+def make_result(**overrides) -> ScenarioResult:
+    values = {"name": "list_todos", "requests": 100, "errors": 0, "rps": 200.0,
+              "p50_ms": 5.0, "p95_ms": 10.0, "p99_ms": 20.0, "queries_per_request": 1.0}
+    values.update(overrides)
+    return ScenarioResult(**values)
+
+
+def test_summarize():
+    latencies = [index / 1000 for index in range(1, 101)]
+    
+    result = summarize("list_todos", latencies, errors=2, elapsed=0.5, queries=150)
+    
+    assert result.requests == 100
+    assert result.rps == 200.0
+    assert result.p50_ms == 50.5
+    assert result.p99_ms == 99.01
+    assert result.queries_per_request == 1.5
+    
+def test_compare_with_baseline(tmp_path):
+    path = tmp_path / "baseline.json"
+    save_baseline(path, [make_result()], config={})
+    
+    # verifies that timings within the tolerance are not regressions
+    assert compare_with_baseline(path, [make_result(rps=180.0, p95_ms=11.0)], 0.2) == []
+    
+    regressions = compare_with_baseline(
+        path, [make_result(rps=100.0, p95_ms=30.0, queries_per_request=2.0)], 0.2
+    )
+    assert len(regressions) == 3
+    
+def test_serialization_paths_match(engine, test_todos, test_user):
+    
+    # compare_paths fails when the fast path document differs
+    timings = compare_paths(engine, test_user.id, repeat=2)
+    
+    assert set(timings) == {"orm_ms", "fast_ms"}
@@ -0,0 +1,55 @@
+import pytest
+
+from todo_api.cache import TTLCache, UserCache
+from todo_api.schema import UserPrincipal
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_get_set_delete():
+    cache = TTLCache(max_size=10)
+    
+    await cache.set("key", "value", ttl=60)
+    assert await cache.get("key") == "value"
+    
+    await cache.delete("key")
+    assert await cache.get("key") is None
+    
+@pytest.mark.asyncio
+async def test_ttl_cache_expiration():
+    cache = TTLCache(max_size=10)
+    
+    # verifies that an expired entry is dropped
+    await cache.set("key", "value", ttl=0)
+    assert await cache.get("key") is None
+    assert len(cache) == 0
+    
+@pytest.mark.asyncio
+async def test_ttl_cache_lru_eviction():
+    cache = TTLCache(max_size=2)
+    
+    await cache.set("a", 1, ttl=60)
+    await cache.set("b", 2, ttl=60)
+    
+    # Reading 'a' makes 'b' the least recently used entry
+    assert await cache.get("a") == 1
+    await cache.set("c", 3, ttl=60)
+    
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1
+    assert await cache.get("c") == 3
+    
+@pytest.mark.asyncio
+async def test_user_cache_set_after_invalidation(test_user):
+    cache = UserCache(backend=TTLCache(max_size=10), ttl=60)
+    principal = UserPrincipal.model_validate(test_user)
+    
+    # The user changes while its previous row is being loaded
+    generation = cache.generation
+    await cache.invalidate(test_user.id)
+    
+    # verifies that the principal loaded before the invalidation is not stored
+    await cache.set(principal, generation)
+    assert await cache.get(test_user.id) is None
+    
+    await cache.set(principal, cache.generation)
+    assert await cache.get(test_user.id) == principal
@@ -0,0 +1,169 @@
+import httpx
+import pytest
+
+from tests.utils import make_transport
+from todo_client.utils.cache import ResponseCache
+
+
+def test_response_cache_get_set():
+    cache = ResponseCache(max_size=10, ttl=60)
+    key = ResponseCache.key("user", "GET", "/todos", {"limit": 10})
+
+    cache.set(key, {"items": []})
+    assert cache.get(key) == {"items": []}
+
+    # verifies that the key does not depend on the order of the parameters
+    assert (ResponseCache.key("user", "GET", "/todos", {"a": 1, "b": 2})
+            == ResponseCache.key("user", "GET", "/todos", {"b": 2, "a": 1}))
+
+def test_response_cache_expiration(monkeypatch):
+    cache = ResponseCache(max_size=10, ttl=30)
+    now = 1000.0
+    monkeypatch.setattr("todo_client.utils.cache.time.monotonic", lambda: now)
+
+    cache.set("default", 1)
+    cache.set("short", 2, ttl=5)
+
+    # verifies that an entry expires after its own TTL, the default otherwise
+    now += 5
+    assert cache.get("short") is None
+    assert cache.get("default") == 1
+
+    now += 25
+    assert cache.get("default") is None
+    assert len(cache) == 0
+
+def test_response_cache_lru_eviction():
+    cache = ResponseCache(max_size=2, ttl=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    # Reading 'a' makes 'b' the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+def test_response_cache_invalidate():
+    cache = ResponseCache(max_size=10, ttl=60)
+    keys = {
+        "alice_todos": ResponseCache.key("alice", "GET", "/todos", None),
+        "alice_stats": ResponseCache.key("alice", "GET", "/todos/stats", None),
+        "alice_user": ResponseCache.key("alice", "GET", "/user/me", None),
+        "bob_todos": ResponseCache.key("bob", "GET", "/todos", None),
+        "admin_users": ResponseCache.key("admin", "GET", "/admin/users", None),
+    }
+    for name, key in keys.items():
+        cache.set(key, name)
+
+    # verifies that only the entries of the user under the prefix are dropped
+    cache.invalidate("/todos", user="alice")
+    assert cache.get(keys["alice_todos"]) is None
+    assert cache.get(keys["alice_stats"]) is None
+    assert cache.get(keys["alice_user"]) == "alice_user"
+    assert cache.get(keys["bob_todos"]) == "bob_todos"
+
+    # verifies that the entries of every user are dropped without `user`
+    cache.invalidate("/admin", "/todos")
+    assert cache.get(keys["bob_todos"]) is None
+    assert cache.get(keys["admin_users"]) is None
+    assert len(cache) == 1
+
+def test_api_client_response_cache(monkeypatch):
+    pytest.importorskip("streamlit")
+    from todo_client.utils import api_client
+
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        if request.method == "GET":
+            return httpx.Response(200, json={"items": [], "next_cursor": None})
+        return httpx.Response(201, json={"id": 1})
+
+    transport = make_transport(handler)
+    monkeypatch.setattr(api_client.st, "session_state", {"username": "alice"})
+    monkeypatch.setattr(api_client, "get_transport", lambda: transport)
+    monkeypatch.setattr(api_client, "get_response_cache",
+                        lambda: ResponseCache(max_size=10, ttl=60))
+    client = api_client.APIClient()
+
+    try:
+        # verifies that a repeated GET is served from the cache
+        client.read_all_todos(limit=10)
+        client.read_all_todos(limit=10)
+        assert requests == [("GET", "/todos")]
+
+        # verifies that cache_ttl=0 always calls the API
+        client.read_all_todos(limit=10, cache_ttl=0)
+        assert len(requests) == 2
+
+        # verifies that a todo write invalidates the cached todos
+        client.create_todo({"title": "Title", "priority": 1})
+        client.read_all_todos(limit=10)
+        assert requests[2:] == [("POST", "/todos"), ("GET", "/todos")]
+    finally:
+        transport.close()
+
+@pytest.fixture
+def users_client(monkeypatch):
+    """An APIClient logged in as admin whose API knows bob (id 2), with its
+    response cache holding responses of admin and bob."""
+
+    pytest.importorskip("streamlit")
+    from todo_client.utils import api_client
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            return httpx.Response(200, json={"id": 2, "username": "bob"})
+        return httpx.Response(200, json={"message": "Done."})
+
+    transport = make_transport(handler)
+    cache = ResponseCache(max_size=10, ttl=60)
+    keys = {
+        "admin_user": ResponseCache.key("admin", "GET", "/user/me", None),
+        "bob_todos": ResponseCache.key("bob", "GET", "/todos", None),
+        "bob_user": ResponseCache.key("bob", "GET", "/user/me", None),
+    }
+    for name, key in keys.items():
+        cache.set(key, name)
+
+    monkeypatch.setattr(api_client.st, "session_state", {"username": "admin"})
+    monkeypatch.setattr(api_client, "get_transport", lambda: transport)
+    monkeypatch.setattr(api_client, "get_response_cache", lambda: cache)
+    yield api_client.APIClient(), cache, keys
+    transport.close()
+
+def test_api_client_delete_user_invalidates_username(users_client):
+    client, cache, keys = users_client
+
+    client.delete_user_by_id(2)
+
+    # verifies that every response cached under the freed username is dropped
+    assert cache.get(keys["bob_todos"]) is None
+    assert cache.get(keys["bob_user"]) is None
+    assert cache.get(keys["admin_user"]) == "admin_user"
+
+def test_api_client_rename_user_invalidates_username(users_client):
+    client, cache, keys = users_client
+
+    client.update_user_by_id(2, {"username": "robert"})
+
+    # verifies that the responses cached under the old username are dropped
+    assert cache.get(keys["bob_todos"]) is None
+
+def test_api_client_rename_me_invalidates_username(users_client):
+    client, cache, keys = users_client
+    from todo_client.utils import api_client
+    api_client.st.session_state["username"] = "bob"
+
+    client.update_user_me({"username": "robert"})
+
+    # verifies that the responses cached under the old username are dropped
+    assert cache.get(keys["bob_todos"]) is None
+    assert cache.get(keys["bob_user"]) is None
+    assert cache.get(keys["admin_user"]) == "admin_user"
+    assert api_client.st.session_state["username"] == "robert"
@@ -0,0 +1,93 @@
+import json
+
+import httpx
+import pytest
+
+from tests.utils import make_transport
+from todo_client.utils.cache import ResponseCache
+from todo_client.utils.paging import view_page
+
+
+@pytest.mark.parametrize("page, expected_items, expected_page", [
+    (0, [1, 2, 3], 0),
+    (1, [4, 5, 6], 1),
+    (2, [7], 2),
+    # The items shrank below the page, the last page is shown
+    (5, [7], 2),
+])
+def test_view_page(page, expected_items, expected_page):
+    items, page, page_count = view_page([1, 2, 3, 4, 5, 6, 7], page, page_size=3)
+
+    assert items == expected_items
+    assert page == expected_page
+    assert page_count == 3
+
+def test_view_page_empty():
+
+    # verifies that an empty list has a single empty page
+    assert view_page([], 3, page_size=10) == ([], 0, 1)
+
+@pytest.fixture
+def todos_client(monkeypatch):
+    """An APIClient whose API pages 5 todos and answers the batch updates,
+    with the list of the requests it received."""
+
+    pytest.importorskip("streamlit")
+    from todo_client.utils import api_client
+
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.method == "PATCH":
+            items = json.loads(request.content)["items"]
+            return httpx.Response(200, json={"results": [
+                {"index": index, "id": item["id"], "status_code": 200 if item["id"] < 5 else 404,
+                 "detail": None if item["id"] < 5 else "Todo not found or not owned by the user."}
+                for index, item in enumerate(items)
+            ]})
+
+        start = int(request.url.params.get("cursor", 0))
+        limit = int(request.url.params["limit"])
+        ids = list(range(1, 6))[start:start + limit]
+        next_cursor = str(start + limit) if start + limit < 5 else None
+        return httpx.Response(200, json={"items": [{"id": todo_id} for todo_id in ids],
+                                         "next_cursor": next_cursor})
+
+    transport = make_transport(handler)
+    monkeypatch.setattr(api_client.st, "session_state", {"username": "alice"})
+    monkeypatch.setattr(api_client, "get_transport", lambda: transport)
+    monkeypatch.setattr(api_client, "get_response_cache",
+                        lambda: ResponseCache(max_size=10, ttl=60))
+    yield api_client.APIClient(), requests
+    transport.close()
+
+def test_api_client_read_all_todos_pages(todos_client):
+    client, requests = todos_client
+    
+    todos, cursor = [], None
+    while True:
+        page = client.read_all_todos(cursor=cursor, limit=2)
+        todos += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # verifies that the cursor of each page fetches the next one
+    assert [todo["id"] for todo in todos] == [1, 2, 3, 4, 5]
+    assert len(requests) == 3
+
+def test_api_client_update_todos_batch(todos_client):
+    client, requests = todos_client
+    
+    result = client.update_todos_batch([{"id": 1, "complete": True},
+                                        {"id": 9, "priority": 2}])
+
+    # verifies that the updates are sent in a single request
+    assert len(requests) == 1
+    request = requests[0]
+    assert (request.method, request.url.path) == ("PATCH", "/todos/batch")
+    assert json.loads(request.content) == {"items": [{"id": 1, "complete": True},
+                                                     {"id": 9, "priority": 2}]}
+
+    assert [item["status_code"] for item in result["results"]] == [200, 404]
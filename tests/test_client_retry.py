@@ -0,0 +1,201 @@
+import httpx
+import pytest
+
+from tests.utils import make_transport
+from todo_client.utils.transport import CircuitBreaker, CircuitOpenError
+
+
+def failing_then(responses: list):
+    """A handler answering its requests with the status codes of `responses` in
+    turn, the last one repeated, raising the exception classes instead.
+    Returns the handler and the list of the requests it received."""
+
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        response = responses[min(len(sent), len(responses) - 1)]
+        sent.append(request)
+        if isinstance(response, type) and issubclass(response, httpx.RequestError):
+            raise response("failed", request=request)
+        if isinstance(response, type) and issubclass(response, Exception):
+            raise response("failed")
+        return httpx.Response(response)
+
+    return handler, sent
+
+# ============================== Circuit breaker ============================= #
+@pytest.fixture
+def clock(monkeypatch):
+    """The time of the circuit breakers, advanced by the tests."""
+
+    now = [1000.0]
+    monkeypatch.setattr("todo_client.utils.transport.time.monotonic", lambda: now[0])
+    return now
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.allow()
+
+    # verifies that the consecutive failures open the circuit
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.retry_in() == 10
+
+def test_breaker_success_resets_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    # verifies that only consecutive failures are counted
+    assert breaker.state == "closed"
+
+def test_breaker_trial_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+
+    # verifies that a single trial request is allowed after the reset timeout
+    clock[0] += 10
+    assert breaker.allow()
+    assert breaker.state == "half-open"
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+def test_breaker_trial_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+
+    clock[0] += 10
+    assert breaker.allow()
+    breaker.record_failure()
+
+    # verifies that a failed trial waits for a new reset timeout
+    assert breaker.state == "open"
+    assert breaker.opened == 2
+    assert breaker.retry_in() == 10
+
+def test_breaker_abort_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+
+    clock[0] += 10
+    assert breaker.allow()
+    breaker.abort_trial()
+
+    # verifies that the next request is the trial
+    assert breaker.allow()
+
+# ================================== Retries ================================= #
+def test_transport_retries_idempotent_request():
+    handler, sent = failing_then([503, 502, 200])
+    transport = make_transport(handler, max_retries=2)
+    try:
+        response = transport.run(transport.send("GET", "/todos"))
+    finally:
+        transport.close()
+
+    assert response.status_code == 200
+    assert len(sent) == 3
+    assert transport.snapshot()["retries"] == 2
+
+def test_transport_returns_last_response_after_retries():
+    handler, sent = failing_then([503])
+    transport = make_transport(handler, max_retries=2)
+    try:
+        response = transport.run(transport.send("GET", "/todos"))
+    finally:
+        transport.close()
+
+    # verifies that the retries are bounded
+    assert response.status_code == 503
+    assert len(sent) == 3
+
+@pytest.mark.parametrize("method, retry", [("POST", True), ("PATCH", True), ("PUT", False)])
+def test_transport_does_not_retry_non_idempotent_request(method, retry):
+    handler, sent = failing_then([503, 200])
+    transport = make_transport(handler, max_retries=2)
+    try:
+        response = transport.run(transport.send(method, "/todos", retry=retry))
+    finally:
+        transport.close()
+
+    assert response.status_code == 503
+    assert len(sent) == 1
+
+def test_transport_retries_request_not_received():
+    handler, sent = failing_then([httpx.ConnectError, 201])
+    transport = make_transport(handler, max_retries=2)
+    try:
+        response = transport.run(transport.send("POST", "/todos"))
+    finally:
+        transport.close()
+
+    # verifies that a request whose connection failed is retried, whatever its method
+    assert response.status_code == 201
+    assert len(sent) == 2
+
+def test_transport_raises_after_read_error():
+    handler, sent = failing_then([httpx.ReadError, 201])
+    transport = make_transport(handler, max_retries=2)
+    try:
+        # verifies that a request the API may have received is not sent again
+        with pytest.raises(httpx.ReadError):
+            transport.run(transport.send("POST", "/todos"))
+    finally:
+        transport.close()
+
+    assert len(sent) == 1
+
+def test_transport_retry_after():
+    transport = make_transport(lambda request: httpx.Response(200), max_retries=1)
+    transport.close()
+    transport.max_backoff = 5.0
+
+    # verifies that the Retry-After of the response bounds the delay
+    assert transport._retry_delay(1, httpx.Response(503, headers={"Retry-After": "2"})) == 2.0
+    assert transport._retry_delay(1, httpx.Response(503, headers={"Retry-After": "60"})) == 5.0
+    assert 0 <= transport._retry_delay(3, None) <= 5.0
+
+# ============================ Transport and breaker ========================= #
+def test_transport_short_circuits_when_open():
+    handler, sent = failing_then([502])
+    transport = make_transport(handler,
+                               breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    try:
+        for _ in range(2):
+            assert transport.run(transport.send("GET", "/todos")).status_code == 502
+
+        # verifies that the requests are not sent while the circuit is open
+        with pytest.raises(CircuitOpenError):
+            transport.run(transport.send("GET", "/todos"))
+    finally:
+        transport.close()
+
+    assert len(sent) == 2
+    assert transport.snapshot()["short_circuited"] == 1
+    assert transport.snapshot()["circuit_state"] == "open"
+
+def test_transport_releases_trial_on_unexpected_error(clock):
+    handler, sent = failing_then([502, ValueError, 200])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    transport = make_transport(handler, breaker=breaker)
+    try:
+        transport.run(transport.send("GET", "/todos"))
+        clock[0] += 10
+
+        with pytest.raises(ValueError):
+            transport.run(transport.send("GET", "/todos"))
+
+        # verifies that the trial request did not leave the circuit half-open
+        assert transport.run(transport.send("GET", "/todos")).status_code == 200
+    finally:
+        transport.close()
+
+    assert breaker.state == "closed"
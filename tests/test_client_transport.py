@@ -0,0 +1,77 @@
+import asyncio
+
+import httpx
+import pytest
+
+from tests.utils import make_transport
+
+
+@pytest.fixture
+def concurrent_transport():
+    """A transport whose responses are only sent once 3 requests are in flight."""
+
+    arrived = 0
+    all_arrived = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal arrived
+        arrived += 1
+        if arrived == 3:
+            all_arrived.set()
+        # Sequential requests would wait here until the timeout
+        await asyncio.wait_for(all_arrived.wait(), timeout=2)
+
+        if request.url.path == "/error":
+            raise httpx.ConnectError("unreachable", request=request)
+        return httpx.Response(200, json={"path": request.url.path})
+
+    transport = make_transport(handler)
+    yield transport
+    transport.close()
+
+def test_transport_send():
+    transport = make_transport(lambda request: httpx.Response(200, json={"ok": True}))
+    try:
+        response = transport.run(transport.send("GET", "/todos", params={"limit": 10}))
+    finally:
+        transport.close()
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert transport.snapshot()["requests"] == 1
+
+def test_transport_send_all_is_concurrent(concurrent_transport):
+    responses = concurrent_transport.run(concurrent_transport.send_all([
+        ("GET", "/a", {}), ("GET", "/b", {}), ("GET", "/c", {}),
+    ]))
+
+    # verifies that the responses are returned in request order
+    assert [response.json()["path"] for response in responses] == ["/a", "/b", "/c"]
+
+def test_transport_send_all_returns_the_exceptions(concurrent_transport):
+    responses = concurrent_transport.run(concurrent_transport.send_all([
+        ("GET", "/a", {}), ("GET", "/error", {}), ("GET", "/c", {}),
+    ]))
+
+    # verifies that a failed request does not fail the others
+    assert responses[0].status_code == 200
+    assert isinstance(responses[1], httpx.ConnectError)
+    assert responses[2].status_code == 200
+
+def test_api_client_gather(monkeypatch, concurrent_transport):
+    pytest.importorskip("streamlit")
+    from todo_client.utils import api_client
+    from todo_client.utils.cache import ResponseCache
+
+    monkeypatch.setattr(api_client.st, "session_state", {})
+    monkeypatch.setattr(api_client, "get_transport", lambda: concurrent_transport)
+    monkeypatch.setattr(api_client, "get_response_cache",
+                        lambda: ResponseCache(max_size=10, ttl=60))
+    client = api_client.APIClient()
+
+    user, stats, todos = client.gather(client.read_user_me, client.read_todo_stats,
+                                       lambda: client.read_all_todos(limit=10))
+
+    assert user == {"path": "/user/me"}
+    assert stats == {"path": "/todos/stats"}
+    assert todos == {"path": "/todos"}
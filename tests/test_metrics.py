@@ -0,0 +1,66 @@
+from todo_api.config import settings
+from todo_api.metrics import Histogram, registry
+
+
+def test_histogram_render():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    
+    histogram.observe(0.05, "/todos")
+    histogram.observe(0.5, "/todos")
+    histogram.observe(5, "/todos")
+    
+    assert histogram.samples() == [
+        'latency_seconds_bucket{route="/todos",le="0.1"} 1',
+        'latency_seconds_bucket{route="/todos",le="1.0"} 2',
+        'latency_seconds_bucket{route="/todos",le="+Inf"} 3',
+        'latency_seconds_sum{route="/todos"} 5.55',
+        'latency_seconds_count{route="/todos"} 3',
+    ]
+    
+def test_server_timing_header(auth_client, test_todos):
+    response = auth_client.get("/todos")
+    
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    assert timing.startswith("app;dur=")
+    # verifies that the SQL statements of the request are counted: the
+    # current user lookup (test override), the todos version and the todos page
+    assert 'desc="3 queries"' in timing
+    
+def test_server_timing_argon2(client, test_user):
+    response = client.post("/auth/token",
+                           data={"username": "TestUser", "password": "testpassword"})
+    
+    assert response.status_code == 200
+    assert "argon2;dur=" in response.headers["server-timing"]
+    
+def test_metrics_endpoint(auth_client, test_todos, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", True)
+    auth_client.get(f"/todos/{test_todos['user'][0].id}")
+    
+    response = auth_client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    # verifies that routes are labelled by their template
+    assert 'http_requests_total{method="GET",route="/todos/{todo_id}",status="200"}' in response.text
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert 'argon2_duration_seconds' in registry.render()
+    
+def test_metrics_endpoint_disabled_by_default(client):
+    
+    # verifies that the metrics are not exposed unless enabled
+    assert client.get("/metrics").status_code == 404
+    
+def test_metrics_endpoint_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", True)
+    monkeypatch.setattr(settings, "metrics_token", "scraper-token")
+    
+    # verifies that the metrics are only served with the token
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer wrong-token"})
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+    
+    response = client.get("/metrics", headers={"Authorization": "Bearer scraper-token"})
+    assert response.status_code == 200
@@ -0,0 +1,134 @@
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from todo_api.database import MIGRATIONS_PATH, Base, run_migrations
+from todo_api.search import include_name
+
+
+# SQLite cannot reflect expression-based indexes, they are checked by name
+@pytest.mark.filterwarnings("ignore:.*expression-based index")
+def test_migrations_match_models(tmp_path):
+    
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    run_migrations(url)
+    
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection,
+                                             opts={"include_name": include_name})
+        
+        # verifies that the migrated schema has no difference with the models
+        assert compare_metadata(context, Base.metadata) == []
+        
+        index_names = connection.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )).scalars().all()
+        assert "ix_users_username_lower" in index_names
+        
+        # verifies that the full-text search table is in sync with the todos
+        connection.execute(text(
+            "INSERT INTO users (id, username) VALUES (1, 'Alice')"
+        ))
+        connection.execute(text(
+            "INSERT INTO todos (title, description, owner_id) "
+            "VALUES ('Groceries', 'Buy bread', 1)"
+        ))
+        matches = connection.execute(text(
+            "SELECT rowid FROM todos_fts WHERE todos_fts MATCH 'bre*'"
+        )).scalars().all()
+        assert len(matches) == 1
+        
+    engine.dispose()
+    
+def test_migrations_stamp_existing_database(tmp_path):
+    
+    # Database created before migrations were introduced
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR UNIQUE)"
+        ))
+        connection.execute(text(
+            "CREATE TABLE todos (id INTEGER PRIMARY KEY, title VARCHAR, "
+            "description VARCHAR, priority INTEGER, complete BOOLEAN, owner_id INTEGER)"
+        ))
+        connection.execute(text(
+            "INSERT INTO todos (title, description, owner_id) "
+            "VALUES ('Groceries', 'Buy bread', 1)"
+        ))
+        
+    run_migrations(url)
+    
+    # verifies that only the later revisions were applied
+    indexes = {index["name"] for index in inspect(engine).get_indexes("todos")}
+    assert "ix_todos_owner_id_complete_id" in indexes
+    assert "ix_todos_owner_id_complete_priority_id" in indexes
+    
+    # verifies that the existing todos were indexed for full-text search
+    with engine.connect() as connection:
+        matches = connection.execute(text(
+            "SELECT rowid FROM todos_fts WHERE todos_fts MATCH 'bread'"
+        )).scalars().all()
+    assert len(matches) == 1
+    
+    engine.dispose()
+    
+def alembic_config(url: str) -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_PATH))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+@pytest.mark.filterwarnings("ignore:.*expression-based index")
+def test_migrations_recreate_username_index(tmp_path):
+    
+    url = f"sqlite:///{tmp_path / 'repaired.db'}"
+    config = alembic_config(url)
+    index_names_query = text("SELECT name FROM sqlite_master WHERE type = 'index'")
+    
+    # Downgraded then upgraded again through 0004, which loses the index
+    command.upgrade(config, "0004")
+    command.downgrade(config, "0003")
+    command.upgrade(config, "0008")
+    
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        assert "ix_users_username_lower" not in connection.execute(index_names_query).scalars().all()
+    
+    run_migrations(url)
+    
+    # verifies that the index is recreated
+    with engine.connect() as connection:
+        assert "ix_users_username_lower" in connection.execute(index_names_query).scalars().all()
+        
+    engine.dispose()
+    
+def test_migrations_timestamps_format(tmp_path):
+    
+    url = f"sqlite:///{tmp_path / 'stamped.db'}"
+    config = alembic_config(url)
+    
+    # A todo stamped by 0005
+    command.upgrade(config, "0004")
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (id, username) VALUES (1, 'Alice')"))
+        connection.execute(text(
+            "INSERT INTO todos (title, description, owner_id) VALUES ('Groceries', 'Buy bread', 1)"
+        ))
+    
+    run_migrations(url)
+    
+    # verifies that the timestamps are in the DateTime format, with microseconds
+    with engine.connect() as connection:
+        updated_at, created_at = connection.execute(text(
+            "SELECT updated_at, created_at FROM todos"
+        )).one()
+    assert len(updated_at) == len(created_at) == len("2026-10-18 16:00:00.000000")
+    
+    engine.dispose()
@@ -0,0 +1,126 @@
+import pytest
+from fastapi import status
+
+from todo_api.ratelimit import (MemoryRateLimitBackend, login_ip_limiter,
+                                login_username_limiter, register_ip_limiter)
+
+
+@pytest.mark.asyncio
+async def test_bucket_burst_then_wait():
+    backend = MemoryRateLimitBackend(max_keys=10)
+    
+    # verifies that the burst is allowed, then the wait for the next token
+    assert await backend.take("key", capacity=2, refill_rate=1.0) == 0
+    assert await backend.take("key", capacity=2, refill_rate=1.0) == 0
+    wait = await backend.take("key", capacity=2, refill_rate=1.0)
+    assert 0 < wait <= 1.0
+    
+@pytest.mark.asyncio
+async def test_bucket_refill(monkeypatch):
+    backend = MemoryRateLimitBackend(max_keys=10)
+    now = 1000.0
+    monkeypatch.setattr("todo_api.ratelimit.time.monotonic", lambda: now)
+    
+    assert await backend.take("key", capacity=1, refill_rate=0.5) == 0
+    assert await backend.take("key", capacity=1, refill_rate=0.5) == pytest.approx(2.0)
+    
+    # verifies that a token is back after 1 / refill_rate seconds
+    now += 2.0
+    assert await backend.take("key", capacity=1, refill_rate=0.5) == 0
+    
+@pytest.mark.asyncio
+async def test_bucket_lru_eviction():
+    backend = MemoryRateLimitBackend(max_keys=2)
+    
+    await backend.take("a", capacity=1, refill_rate=0.1)
+    await backend.take("b", capacity=1, refill_rate=0.1)
+    await backend.take("c", capacity=1, refill_rate=0.1)
+    
+    # verifies that the least recently used bucket is dropped, and starts full
+    assert len(backend) == 2
+    assert await backend.take("a", capacity=1, refill_rate=0.1) == 0
+    
+
+class TestLoginRateLimit:
+    
+    def test_login_ip_limit(self, client, db, test_user, monkeypatch):
+        
+        monkeypatch.setattr(login_ip_limiter, "burst", 2)
+        
+        for username in ("first", "second"):
+            response = client.post("/auth/token",
+                                   data={"username": username, "password": "wrong"})
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+        # verifies that the IP is limited whatever the username
+        response = client.post("/auth/token", data={"username": test_user.username,
+                                                    "password": "testpassword"})
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response.headers["Retry-After"]) >= 1
+        
+    def test_login_username_limit(self, client, db, test_user, monkeypatch):
+        
+        monkeypatch.setattr(login_username_limiter, "burst", 1)
+        
+        response = client.post("/auth/token", data={"username": test_user.username,
+                                                    "password": "wrong"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+        # verifies that the username is limited, case variants included
+        response = client.post("/auth/token", data={"username": test_user.username.upper(),
+                                                    "password": "testpassword"})
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        
+        response = client.post("/auth/token", data={"username": "other", "password": "wrong"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+    def test_limited_login_skips_argon2(self, client, db, test_user, monkeypatch):
+        
+        monkeypatch.setattr(login_ip_limiter, "burst", 1)
+        client.post("/auth/token", data={"username": test_user.username, "password": "wrong"})
+        
+        def fail(*args):
+            raise AssertionError("Argon2 used by a rate limited login")
+        monkeypatch.setattr("todo_api.security.verify_password", fail)
+        
+        response = client.post("/auth/token", data={"username": test_user.username,
+                                                    "password": "testpassword"})
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        
+    def test_rate_limit_disabled(self, client, db, test_user, monkeypatch):
+        
+        monkeypatch.setattr(login_ip_limiter, "burst", 1)
+        monkeypatch.setattr("todo_api.ratelimit.settings.rate_limit_enabled", False)
+        
+        for _ in range(2):
+            response = client.post("/auth/token", data={"username": test_user.username,
+                                                        "password": "testpassword"})
+            assert response.status_code == status.HTTP_200_OK
+            
+    def test_rate_limited_metric(self, client, db, test_user, monkeypatch):
+        
+        monkeypatch.setattr(login_ip_limiter, "burst", 1)
+        monkeypatch.setattr("todo_api.api.settings.metrics_enabled", True)
+        for _ in range(2):
+            client.post("/auth/token", data={"username": "any", "password": "wrong"})
+        
+        response = client.get("/metrics")
+        assert 'rate_limited_total{scope="login_ip"}' in response.text
+        
+
+class TestRegisterRateLimit:
+    
+    def test_register_ip_limit(self, client, db, monkeypatch):
+        
+        monkeypatch.setattr(register_ip_limiter, "burst", 1)
+        
+        user_data = {"username": "NewUser", "email": "new@mail.com", "role": "user",
+                     "password": "PassWord"}
+        response = client.post("/auth/register", json=user_data)
+        assert response.status_code == status.HTTP_201_CREATED
+        
+        user_data = {"username": "Other", "email": "other@mail.com", "role": "user",
+                     "password": "PassWord"}
+        response = client.post("/auth/register", json=user_data)
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert "Retry-After" in response.headers
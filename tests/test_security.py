@@ -1,9 +1,12 @@
 from todo_api.security import hash_password, verify_password, create_access_token, decode_access_token, credential_exception
+from todo_api.security import hash_password_async, verify_password_async, PasswordHashingPool, hashing_unavailable_exception
 from todo_api.config import settings
 from datetime import datetime, timezone, timedelta
 from jose import jwt, JWTError
 from fastapi import HTTPException
 import pytest
+import asyncio
+import threading
 
 def test_hash_password():
     password = 'strongpassword'
@@ -66,6 +69,8 @@ def test_decode_access_token():
         'sub':'Alice',
         'id':1,
         'role':'user',
+        'jti':'token-id',
+        'iat':datetime(2026, 1, 1, 12, 0, 0, 500000, tzinfo=timezone.utc).timestamp(),
         'exp':datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
     }
     
@@ -80,6 +85,10 @@ def test_decode_access_token():
     assert decoded_token['username'] == payload_to_encode['sub']
     assert decoded_token['id'] == payload_to_encode['id']
     assert decoded_token['role'] == payload_to_encode['role']
+    assert decoded_token['jti'] == payload_to_encode['jti']
+    
+    # verifies that the issue time keeps its microseconds, as a naive UTC datetime
+    assert decoded_token['issued_at'] == datetime(2026, 1, 1, 12, 0, 0, 500000)
     
 def test_decode_access_token_expired():
     
@@ -123,3 +132,33 @@ def test_decode_access_token_missing_value():
     # verifies that is credential_exception (401)
     assert exc_info.value.status_code == credential_exception.status_code
     assert exc_info.value.detail == credential_exception.detail
+        
+@pytest.mark.asyncio
+async def test_hash_and_verify_password_async():
+    password = 'strongpassword'
+    hashed_password = await hash_password_async(password)
+    
+    assert hashed_password.startswith("$argon2id$")
+    assert await verify_password_async(password, hashed_password) is True
+    assert await verify_password_async("otherpassword", hashed_password) is False
+    
+@pytest.mark.asyncio
+async def test_hashing_pool_saturated():
+    pool = PasswordHashingPool(max_workers=1, max_pending=0)
+    release = threading.Event()
+    
+    # Occupy the only slot of the pool
+    blocked = asyncio.create_task(pool.run(release.wait))
+    await asyncio.sleep(0)
+    
+    # verifies that the pool rejects immediately instead of queuing
+    with pytest.raises(HTTPException) as exc_info:
+        await pool.run(hash_password, "strongpassword")
+        
+    assert exc_info.value.status_code == hashing_unavailable_exception.status_code
+    assert exc_info.value.headers["Retry-After"] == "1"
+    
+    release.set()
+    await blocked
+    assert pool.in_flight == 0
+    pool.shutdown()
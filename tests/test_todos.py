@@ -1,7 +1,13 @@
+import csv
+import io
+import json
 import re
+import pytest
 from fastapi import status
 
 from todo_api.models import Todo
+from todo_api.config import settings
+from todo_api.pagination import encode_cursor
 from tests.utils import model_to_dict
 
 
@@ -32,9 +38,118 @@ class TestCreateTodo:
         # Verify the fields
         for field, value in model_to_dict(todo, exclude={"complete",
                                                          "owner_id",
-                                                         "id"}).items():
+                                                         "id",
+                                                         "version",
+                                                         "created_at",
+                                                         "updated_at"}).items():
             assert value == todo_data[field]
             
+class TestBatchTodos:
+    
+    def test_create_todos_batch(self, auth_client, db, test_user):
+        
+        items = [
+            {"title": f"Batch todo {i}", "description": "Imported", "priority": i}
+            for i in range(1, 4)
+        ]
+        
+        # Send POST request
+        response = auth_client.post("/todos/batch", json={"items": items})
+        assert response.status_code == status.HTTP_201_CREATED
+        
+        results = response.json()["results"]
+        assert [result["index"] for result in results] == [0, 1, 2]
+        assert all(result["status_code"] == 201 for result in results)
+        
+        # verifies that the returned ids match the created todos, in order
+        for result, item in zip(results, items):
+            todo = db.query(Todo).filter(Todo.id == result["id"]).first()
+            assert todo.owner_id == test_user.id
+            assert todo.title == item["title"]
+            assert todo.complete is False
+            
+    def test_create_todos_batch_invalid_item(self, auth_client, db, test_user):
+        
+        items = [
+            {"title": "Valid todo", "description": "Imported", "priority": 1},
+            {"title": "Invalid todo", "description": "Imported", "priority": 42}
+        ]
+        
+        # Send POST request
+        response = auth_client.post("/todos/batch", json={"items": items})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+        
+        # verifies that nothing was created
+        assert db.query(Todo).count() == 0
+        
+    def test_update_todos_batch(self, auth_client, db, test_todos, test_user):
+        
+        todo_1, todo_2 = test_todos["user"]
+        admin_todo = test_todos["admin"][0]
+        
+        items = [
+            {"id": todo_1.id, "complete": True},
+            {"id": admin_todo.id, "title": "Hijacked"},
+            {"id": todo_2.id, "title": "Renamed todo", "priority": 1}
+        ]
+        
+        # Send PATCH request
+        response = auth_client.patch("/todos/batch", json={"items": items})
+        assert response.status_code == status.HTTP_200_OK
+        
+        results = response.json()["results"]
+        assert [result["status_code"] for result in results] == [200, 404, 200]
+        assert results[1]["detail"] == "Todo not found or not owned by the user."
+        
+        db.refresh(todo_1)
+        db.refresh(todo_2)
+        db.refresh(admin_todo)
+        
+        # Verify updated and unchanged fields
+        assert todo_1.complete is True
+        assert todo_1.title == "User Todo 1"
+        assert (todo_2.title, todo_2.priority, todo_2.complete) == ("Renamed todo", 1, True)
+        assert admin_todo.title == "Admin Todo"
+        
+    def test_update_todos_batch_non_updatable_field(self, auth_client, db, test_todos):
+        
+        items = [{"id": test_todos["user"][0].id, "owner_id": 2}]
+        
+        # Send PATCH request
+        response = auth_client.patch("/todos/batch", json={"items": items})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+        
+    @pytest.mark.parametrize("field", ["title", "description", "priority", "complete"])
+    def test_update_todos_batch_null_field(self, auth_client, db, test_todos, field):
+        
+        todo = test_todos["user"][0]
+        items = [{"id": todo.id, field: None}]
+        
+        # Send PATCH request
+        response = auth_client.patch("/todos/batch", json={"items": items})
+        
+        # verifies that a null is rejected rather than written to a non-nullable column
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+        db.refresh(todo)
+        assert getattr(todo, field) is not None
+        
+    def test_delete_todos_batch(self, auth_client, db, test_todos, test_user):
+        
+        ids = [todo.id for todo in test_todos["user"]] + [test_todos["admin"][0].id]
+        
+        # Send DELETE request
+        response = auth_client.request("DELETE", "/todos/batch", json={"ids": ids})
+        assert response.status_code == status.HTTP_200_OK
+        
+        results = response.json()["results"]
+        assert [result["status_code"] for result in results] == [204, 204, 404]
+        
+        db.expire_all()
+        
+        # verifies that only the user's todos were deleted
+        remaining = db.query(Todo).all()
+        assert [todo.id for todo in remaining] == [test_todos["admin"][0].id]
+
 class TestReadAllTodos:
     
     def test_read_all_todos(self, auth_client, test_todos, test_user):
@@ -43,20 +158,46 @@ class TestReadAllTodos:
         response = auth_client.get("/todos")
         assert response.status_code == status.HTTP_200_OK
         
-        todos_list = response.json()
+        todos_list = response.json()["items"]
         assert len(todos_list) == 2
         
         returned_owner_id = {todo["owner_id"] for todo in todos_list}
         expected_owner_id = {test_user.id}
         assert returned_owner_id == expected_owner_id
         
+    def test_read_all_todos_not_modified(self, auth_client, test_todos):
+        
+        response = auth_client.get("/todos")
+        etag = response.headers["etag"]
+        
+        # verifies that the current ETag gets a 304 without body
+        response = auth_client.get("/todos", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+        
+        # Other filters are another representation
+        response = auth_client.get("/todos", params={"complete": True},
+                                   headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        
+    def test_read_all_todos_etag_changes_on_write(self, auth_client, test_todos):
+        
+        etag = auth_client.get("/todos").headers["etag"]
+        
+        auth_client.put(f"/todos/{test_todos['user'][0].id}", json={"priority": 1})
+        
+        response = auth_client.get("/todos", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+        
     def test_read_all_todos_completed(self, auth_client, test_todos, test_user):
         
         # Send GET request
         response = auth_client.get("/todos?complete=true")
         assert response.status_code == status.HTTP_200_OK
         
-        todo_list = response.json()
+        todo_list = response.json()["items"]
         assert len(todo_list) == 1
         
         for todo in todo_list:
@@ -69,7 +210,7 @@ class TestReadAllTodos:
         response = auth_client.get("/todos?search=complete")
         assert response.status_code == status.HTTP_200_OK
         
-        todo_list = response.json()
+        todo_list = response.json()["items"]
         assert len(todo_list) == 1
         
         pattern = re.compile('complete', re.IGNORECASE)
@@ -77,6 +218,457 @@ class TestReadAllTodos:
         for todo in todo_list:
             assert (pattern.search(todo["title"]) or pattern.search(todo["description"]))
             assert todo["owner_id"] == test_user.id
+            
+    def test_read_all_todos_search_word_prefix(self, auth_client, test_todos):
+        
+        # Words are matched by prefix, not as arbitrary substrings
+        response = auth_client.get("/todos?search=compl")
+        assert response.status_code == status.HTTP_200_OK
+        assert [todo["title"] for todo in response.json()["items"]] == ["User Todo 2"]
+        
+        response = auth_client.get("/todos?search=pleted")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["items"] == []
+        
+    def test_read_all_todos_search_ranked(self, auth_client, db, test_user):
+        
+        db.add_all([
+            Todo(title="Groceries", description="Buy bread", priority=1,
+                 owner_id=test_user.id),
+            Todo(title="Bread recipe", description="Bake bread, bread everywhere",
+                 priority=1, owner_id=test_user.id),
+            Todo(title="Laundry", description="Wash clothes", priority=1,
+                 owner_id=test_user.id),
+        ])
+        db.commit()
+        
+        # Walk through the results one per page, best match first
+        titles = []
+        cursor = None
+        while True:
+            params = {"search": "bread", "limit": 1}
+            if cursor is not None:
+                params["cursor"] = cursor
+            
+            response = auth_client.get("/todos", params=params)
+            assert response.status_code == status.HTTP_200_OK
+            
+            page = response.json()
+            titles.extend(todo["title"] for todo in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+                
+        assert titles == ["Bread recipe", "Groceries"]
+        
+    def test_read_all_todos_search_after_update(self, auth_client, test_todos):
+        
+        todo_id = test_todos["user"][0].id
+        
+        # Send PUT request
+        response = auth_client.put(f"/todos/{todo_id}", json={"description": "Renamed"})
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that the search index follows the update
+        response = auth_client.get("/todos?search=renamed")
+        assert [todo["id"] for todo in response.json()["items"]] == [todo_id]
+        
+        response = auth_client.get("/todos?search=important")
+        assert response.json()["items"] == []
+        
+    def test_read_all_todos_pagination(self, auth_client, db, test_todos, test_user):
+        
+        # Add todos so that the list spans several pages
+        db.add_all([Todo(title=f"Extra Todo {i}", description="Paginated",
+                         priority=1, owner_id=test_user.id) for i in range(3)])
+        db.commit()
+        
+        # Walk through the pages, 2 todos per page
+        ids = []
+        cursor = None
+        for expected_size in (2, 2, 1):
+            params = {"limit": 2}
+            if cursor is not None:
+                params["cursor"] = cursor
+                
+            response = auth_client.get("/todos", params=params)
+            assert response.status_code == status.HTTP_200_OK
+            
+            page = response.json()
+            assert len(page["items"]) == expected_size
+            ids.extend(todo["id"] for todo in page["items"])
+            cursor = page["next_cursor"]
+        
+        # Last page, ordered by id without duplicates
+        assert cursor is None
+        assert ids == sorted(set(ids))
+        assert len(ids) == 5
+        
+    def test_read_all_todos_sorted_by_priority(self, auth_client, db, test_todos, test_user):
+        
+        db.add_all([Todo(title=f"Extra Todo {i}", description="Sorted", priority=priority,
+                         complete=False, owner_id=test_user.id)
+                    for i, priority in enumerate((5, 1, 4))])
+        db.commit()
+        
+        # Walk through the incomplete todos, highest priority first
+        todos = []
+        cursor = None
+        while True:
+            params = {"complete": False, "sort": "-priority", "limit": 2}
+            if cursor is not None:
+                params["cursor"] = cursor
+            page = auth_client.get("/todos", params=params).json()
+            todos.extend(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        
+        # verifies that ties are broken by id, in the same direction
+        keys = [(todo["priority"], todo["id"]) for todo in todos]
+        assert keys == sorted(keys, reverse=True)
+        assert [priority for priority, _ in keys] == [5, 5, 4, 1]
+        
+    @pytest.mark.parametrize("sort, expected", [("priority", [1, 5, None, None, None]),
+                                                ("-priority", [None, None, None, 5, 1])])
+    def test_read_all_todos_sorted_by_null_priority(self, auth_client, db, test_todos,
+                                                    test_user, sort, expected):
+        
+        db.add_all([Todo(title=f"Extra Todo {i}", description="Sorted", priority=priority,
+                         complete=False, owner_id=test_user.id)
+                    for i, priority in enumerate((None, 1, None, None))])
+        db.commit()
+        
+        # Walk through the incomplete todos, one per page so that cursors hold null keys
+        todos = []
+        cursor = None
+        while True:
+            params = {"complete": False, "sort": sort, "limit": 1}
+            if cursor is not None:
+                params["cursor"] = cursor
+            page = auth_client.get("/todos", params=params).json()
+            todos.extend(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        
+        # verifies that the todos without a priority are paged through, last in
+        # ascending order, first in descending order, ties broken by id
+        assert [todo["priority"] for todo in todos] == expected
+        null_ids = [todo["id"] for todo in todos if todo["priority"] is None]
+        assert null_ids == sorted(null_ids, reverse=sort.startswith("-"))
+        
+    def test_read_all_todos_sorted_by_created_at(self, auth_client, test_todos):
+        
+        response = auth_client.get("/todos", params={"sort": "created_at", "limit": 1})
+        page = response.json()
+        assert page["items"][0]["id"] == test_todos["user"][0].id
+        
+        # verifies that the cursor of a datetime key is accepted
+        response = auth_client.get("/todos", params={"sort": "created_at", "limit": 1,
+                                                     "cursor": page["next_cursor"]})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["items"][0]["id"] == test_todos["user"][1].id
+        
+    def test_read_all_todos_invalid_sort(self, auth_client, test_todos):
+        
+        response = auth_client.get("/todos", params={"sort": "owner_id"})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+        
+    def test_read_all_todos_invalid_cursor(self, auth_client, test_todos):
+        
+        # Send GET request
+        response = auth_client.get("/todos?cursor=not-a-cursor")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Invalid pagination cursor."
+        
+    @pytest.mark.parametrize("values", [{"id": True}, {"id": 10**30}, {"id": "1"}])
+    def test_read_all_todos_invalid_cursor_id(self, auth_client, test_todos, values):
+        
+        # verifies that ids the driver cannot bind are rejected, not a 500
+        response = auth_client.get("/todos", params={"cursor": encode_cursor(values)})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Invalid pagination cursor."
+        
+    @pytest.mark.parametrize("sort, key", [("priority", [1, 2]), ("priority", "1"),
+                                           ("title", {"a": 1}), ("created_at", 1)])
+    def test_read_all_todos_invalid_cursor_key(self, auth_client, test_todos, sort, key):
+        
+        # verifies that a key of the wrong type for the sort is rejected, not a 500
+        cursor = encode_cursor({"id": 1, "key": key})
+        response = auth_client.get("/todos", params={"sort": sort, "cursor": cursor})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Invalid pagination cursor."
+        
+    def test_read_all_todos_limit_too_large(self, auth_client, test_todos):
+        
+        # Send GET request
+        response = auth_client.get("/todos?limit=100000")
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+class TestImportTodos:
+    
+    def test_import_todos_ndjson(self, auth_client, db, test_user):
+        
+        content = "\n".join([
+            '{"title": "Imported 1", "description": "First", "priority": 2}',
+            '',
+            '{"title": "Imported 2", "description": "Second", "priority": 4, "complete": true}',
+            '{"title": "No", "description": "Too short", "priority": 1}',
+            'not json',
+            '[1, 2]',
+        ])
+        response = auth_client.post("/todos/import", content=content)
+        assert response.status_code == status.HTTP_201_CREATED
+        
+        # verifies that the valid records are created and the others reported
+        report = response.json()
+        assert report["accepted"] == 2
+        assert report["rejected"] == 3
+        assert [error["line"] for error in report["errors"]] == [4, 5, 6]
+        assert report["errors"][0]["detail"].startswith("title:")
+        assert report["errors"][1]["detail"] == "Invalid JSON."
+        
+        todos = db.query(Todo).filter(Todo.owner_id == test_user.id).order_by(Todo.id).all()
+        assert [(todo.title, todo.complete) for todo in todos] == [
+            ("Imported 1", False), ("Imported 2", True)
+        ]
+        
+    def test_import_todos_csv(self, auth_client, db, test_user):
+        
+        content = ('title,description,priority,complete\r\n'
+                   'Imported 1,"Multi\r\nline, ""quoted""",3,\r\n'
+                   'Imported 2,Second,9,True\r\n')
+        response = auth_client.post("/todos/import", params={"format": "csv"},
+                                    content=content)
+        assert response.status_code == status.HTTP_201_CREATED
+        
+        # verifies that the record spanning two lines is parsed as one
+        report = response.json()
+        assert report["accepted"] == 1
+        assert [error["line"] for error in report["errors"]] == [4]
+        assert report["errors"][0]["detail"].startswith("priority:")
+        
+        todo = db.query(Todo).filter(Todo.owner_id == test_user.id).one()
+        assert todo.description == 'Multi\nline, "quoted"'
+        assert todo.complete is False
+        
+    def test_import_todos_exported(self, auth_client, db, test_todos, test_user):
+        
+        exported = auth_client.get("/todos/export", params={"format": "csv"}).text
+        
+        # verifies that an export imports back, ids and owners being ignored
+        response = auth_client.post("/todos/import", params={"format": "csv"},
+                                    content=exported)
+        assert response.json()["accepted"] == len(test_todos["user"])
+        assert db.query(Todo).filter(Todo.owner_id == test_user.id).count() == 4
+        
+    def test_import_todos_streamed_in_batches(self, auth_client, db, test_user, monkeypatch):
+        
+        monkeypatch.setattr(settings, "import_batch_size", 2)
+        content = "".join(json.dumps({"title": f"Todo {i}", "description": "Imported",
+                                      "priority": 1}) + "\n" for i in range(5))
+        
+        # Chunks cutting the records anywhere
+        chunks = (content[i:i + 7].encode() for i in range(0, len(content), 7))
+        response = auth_client.post("/todos/import", content=chunks)
+        assert response.json() == {"accepted": 5, "rejected": 0, "errors": []}
+        
+        todos = db.query(Todo).filter(Todo.owner_id == test_user.id).order_by(Todo.id).all()
+        assert [todo.title for todo in todos] == [f"Todo {i}" for i in range(5)]
+        
+    def test_import_todos_record_too_long(self, auth_client, db, test_user, monkeypatch):
+        
+        monkeypatch.setattr(settings, "import_max_record_bytes", 100)
+        content = ('{"title": "Too long", "description": "' + "x" * 200 + '", "priority": 1}\n'
+                   '{"title": "Imported", "description": "Short", "priority": 1}\n')
+        chunks = (content[i:i + 50].encode() for i in range(0, len(content), 50))
+        
+        response = auth_client.post("/todos/import", content=chunks)
+        assert response.json() == {"accepted": 1, "rejected": 1, "errors": [
+            {"line": 1, "detail": "Record too long."}
+        ]}
+        
+    def test_import_todos_invalid_format(self, auth_client, test_user):
+        
+        response = auth_client.post("/todos/import", params={"format": "xml"}, content="")
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+class TestTodoChanges:
+    
+    def test_todo_changes_without_token(self, auth_client, test_todos):
+        
+        response = auth_client.get("/todos/changes")
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that only the token of the current state is returned
+        changes = response.json()
+        assert changes["changed"] == []
+        assert changes["deleted"] == []
+        assert changes["sync_token"]
+        
+    def test_todo_changes_since_token(self, auth_client, test_todos):
+        
+        token = auth_client.get("/todos/changes").json()["sync_token"]
+        updated, deleted = test_todos["user"]
+        
+        auth_client.post("/todos", json={"title": "New todo", "description": "Created.",
+                                         "priority": 2})
+        auth_client.put(f"/todos/{updated.id}", json={"complete": True})
+        auth_client.delete(f"/todos/{deleted.id}")
+        
+        response = auth_client.get("/todos/changes", params={"since": token})
+        assert response.status_code == status.HTTP_200_OK
+        
+        changes = response.json()
+        assert [todo["title"] for todo in changes["changed"]] == [updated.title, "New todo"]
+        assert changes["changed"][0]["complete"] is True
+        assert changes["deleted"] == [deleted.id]
+        
+        # verifies that the new token has no change to report
+        response = auth_client.get("/todos/changes",
+                                   params={"since": changes["sync_token"]})
+        assert response.json()["changed"] == []
+        assert response.json()["deleted"] == []
+        
+    def test_todo_changes_batch(self, auth_client, test_todos):
+        
+        token = auth_client.get("/todos/changes").json()["sync_token"]
+        todo_ids = [todo.id for todo in test_todos["user"]]
+        
+        auth_client.request("DELETE", "/todos/batch", json={"ids": todo_ids})
+        
+        changes = auth_client.get("/todos/changes", params={"since": token}).json()
+        assert sorted(changes["deleted"]) == sorted(todo_ids)
+        
+    def test_todo_changes_invalid_token(self, auth_client, test_todos):
+        
+        response = auth_client.get("/todos/changes", params={"since": "not-a-token"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Invalid sync token."
+        
+    @pytest.mark.parametrize("version", [10**30, True, -1])
+    def test_todo_changes_invalid_token_version(self, auth_client, test_todos, version):
+        
+        # verifies that versions the driver cannot bind are rejected, not a 500
+        token = encode_cursor({"version": version})
+        response = auth_client.get("/todos/changes", params={"since": token})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Invalid sync token."
+
+class TestTodoStats:
+    
+    def test_todo_stats(self, auth_client, test_todos):
+        
+        response = auth_client.get("/todos/stats")
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that only the user's todos are counted (priority 5 pending,
+        # priority 3 complete)
+        assert response.json() == {
+            "total": 2, "complete": 1, "pending": 1,
+            "by_priority": [
+                {"priority": 3, "total": 1, "complete": 1, "pending": 0},
+                {"priority": 5, "total": 1, "complete": 0, "pending": 1},
+            ]
+        }
+        
+    def test_todo_stats_null_priority(self, auth_client, test_todos):
+        
+        response = auth_client.put(f"/todos/{test_todos['user'][0].id}", json={"priority": None})
+        assert response.status_code == status.HTTP_200_OK
+        
+        response = auth_client.get("/todos/stats")
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that the todos without a priority are counted last
+        assert response.json()["by_priority"] == [
+            {"priority": 3, "total": 1, "complete": 1, "pending": 0},
+            {"priority": None, "total": 1, "complete": 0, "pending": 1},
+        ]
+        
+    def test_todo_stats_empty(self, auth_client, test_user):
+        
+        response = auth_client.get("/todos/stats")
+        assert response.json() == {"total": 0, "complete": 0, "pending": 0, "by_priority": []}
+        
+    def test_todo_stats_not_modified(self, auth_client, test_todos):
+        
+        etag = auth_client.get("/todos/stats").headers["ETag"]
+        
+        response = auth_client.get("/todos/stats", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        
+        # verifies that a write changes the stats ETag
+        auth_client.put(f"/todos/{test_todos['user'][0].id}", json={"complete": True})
+        response = auth_client.get("/todos/stats", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["complete"] == 2
+
+class TestExportTodos:
+    
+    def test_export_todos_ndjson(self, auth_client, test_todos, test_user):
+        
+        response = auth_client.get("/todos/export")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert 'filename="todos.ndjson"' in response.headers["content-disposition"]
+        
+        # verifies that every todo of the user is a line, in id order
+        todos = [json.loads(line) for line in response.text.splitlines()]
+        assert todos == [
+            {"id": todo.id, "title": todo.title, "description": todo.description,
+             "priority": todo.priority, "complete": todo.complete, "owner_id": test_user.id}
+            for todo in test_todos["user"]
+        ]
+        
+    def test_export_todos_csv(self, auth_client, test_todos, test_user):
+        
+        response = auth_client.get("/todos/export", params={"format": "csv"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+        
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [int(row["id"]) for row in rows] == [todo.id for todo in test_todos["user"]]
+        assert rows[0]["title"] == test_todos["user"][0].title
+        
+    def test_export_todos_csv_formulas(self, auth_client, db, test_user):
+        
+        titles = ["=HYPERLINK(\"http://evil\")", "+1+2", "-2+3", "@SUM(A1)", "'=SUM(A1)",
+                  "'quoted'", "Safe - title"]
+        db.add_all(Todo(title=title, description="Exported", priority=1,
+                        owner_id=test_user.id) for title in titles)
+        db.commit()
+        
+        exported = auth_client.get("/todos/export", params={"format": "csv"}).text
+        
+        # verifies that the cells a spreadsheet would evaluate are quoted as text
+        rows = list(csv.DictReader(io.StringIO(exported)))
+        assert [row["title"] for row in rows] == ["'" + title for title in titles[:6]] + [titles[6]]
+        
+        # verifies that exactly one quote is removed when the export is imported
+        # back, the titles starting with a quote included
+        db.query(Todo).delete()
+        db.commit()
+        auth_client.post("/todos/import", params={"format": "csv"}, content=exported)
+        assert [todo.title for todo in db.query(Todo).order_by(Todo.id)] == titles
+        
+    def test_export_todos_in_batches(self, auth_client, db, test_user, monkeypatch):
+        
+        monkeypatch.setattr(settings, "export_batch_size", 2)
+        db.add_all(Todo(title=f"Todo {i}", description="Exported", priority=1,
+                        owner_id=test_user.id) for i in range(5))
+        db.commit()
+        
+        # verifies that the partial batches add up to every todo
+        response = auth_client.get("/todos/export")
+        titles = [json.loads(line)["title"] for line in response.text.splitlines()]
+        assert titles == [f"Todo {i}" for i in range(5)]
+        
+    def test_export_todos_invalid_format(self, auth_client, test_todos):
+        
+        response = auth_client.get("/todos/export", params={"format": "xml"})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
 
 class TestReadTodo:
     
@@ -97,6 +689,19 @@ class TestReadTodo:
             
         assert todo["owner_id"] == todo_ref.owner_id
         
+    def test_read_todo_not_modified(self, auth_client, test_todos):
+        
+        url = f"/todos/{test_todos['user'][0].id}"
+        etag = auth_client.get(url).headers["etag"]
+        
+        response = auth_client.get(url, headers={"If-None-Match": f"W/{etag}"})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        
+        # verifies that deleting another todo of the user changes the ETag
+        auth_client.delete(f"/todos/{test_todos['user'][1].id}")
+        response = auth_client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        
     def test_read_todo_not_found(self, auth_client, test_todos, test_user):
         
         # Send GET request
@@ -126,7 +731,9 @@ class TestUpdateTodo:
             "complete": True
         }
         
-        old_data = {f:v for f, v in model_to_dict(todo_ref).items()
+        # The sync tracking columns change on every write
+        old_data = {f:v for f, v in model_to_dict(todo_ref, exclude={"version",
+                                                                     "updated_at"}).items()
                     if f not in updated_data}
         
         # Send PUT request
@@ -1,7 +1,8 @@
 from fastapi import status
+from datetime import timedelta
 
 from tests.utils import model_to_dict
-from todo_api.security import verify_password
+from todo_api.security import verify_password, create_access_token
 from todo_api.models import Todo, User
 
 class TestReadUser:
@@ -15,6 +16,27 @@ class TestReadUser:
         user_data = response.json()
         for field, value in user_data.items():
             assert value == getattr(test_user, field)
+            
+    def test_read_user_me_not_modified(self, client, db, test_user):
+        
+        headers = auth_headers(test_user)
+        etag = client.get("/user/me", headers=headers).headers["etag"]
+        
+        response = client.get("/user/me", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        
+        # verifies that a profile update changes the ETag
+        client.put("/user/me", headers=headers, json={"first_name": "Renamed"})
+        response = client.get("/user/me", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["first_name"] == "Renamed"
+
+def auth_headers(user: User) -> dict[str, str]:
+    """Authorization header of a real token, going through `get_current_user`."""
+    
+    token = create_access_token(user.username, user.id, user.role,
+                                timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
 
 class TestUpdateUser:
     
@@ -42,6 +64,22 @@ class TestUpdateUser:
         for field, value in old_data.items():
             assert value == getattr(test_user, field)
             
+    def test_update_user_me_refreshes_cached_user(self, client, db, test_user):
+        
+        headers = auth_headers(test_user)
+        
+        # The first request caches the authenticated user
+        response = client.get("/user/me", headers=headers)
+        assert response.json()["first_name"] == "Test"
+        
+        # Send PUT request
+        response = client.put("/user/me", json={"first_name": "Alice"}, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that the cached user was invalidated
+        response = client.get("/user/me", headers=headers)
+        assert response.json()["first_name"] == "Alice"
+            
     def test_update_user_me_duplicate_username(self, auth_client, db, test_user, test_admin):
         
         new_data = {
@@ -103,6 +141,22 @@ class TestChangePassword:
         assert test_user.hashed_password != old_hashed
         assert verify_password(password_data["new_password"], test_user.hashed_password)
         
+    def test_change_password_revokes_tokens(self, client, db, test_user):
+        
+        headers = auth_headers(test_user)
+        
+        response = client.put("/user/me/password", headers=headers,
+                              json={"old_password": "testpassword",
+                                    "new_password": "newpassword"})
+        assert response.status_code == status.HTTP_200_OK
+        
+        # verifies that the tokens issued before the change are rejected
+        response = client.get("/user/me", headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+        response = client.get("/user/me", headers=auth_headers(test_user))
+        assert response.status_code == status.HTTP_200_OK
+        
     def test_change_password_wrong_old_password(self, auth_client, db, test_user):
         
         password_data = {
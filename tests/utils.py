@@ -1,5 +1,8 @@
+import httpx
 from sqlalchemy.orm import DeclarativeBase
 
+from todo_client.utils.transport import CircuitBreaker, Transport
+
 def model_to_dict(model_instance: DeclarativeBase, exclude: set[str] | None = None) -> dict:
     """Converts a SQLAlchemy model instance into a dictionary containing its column data.
 
@@ -20,4 +23,23 @@ def model_to_dict(model_instance: DeclarativeBase, exclude: set[str] | None = No
         if column.name not in exclude:
             data[column.name] = getattr(model_instance, column.name)
             
-    return data
\ No newline at end of file
+    return data
+
+def make_transport(handler, breaker: CircuitBreaker | None = None,
+                   max_retries: int = 0) -> Transport:
+    """Creates a client transport whose requests are answered by `handler`.
+
+    Args:
+        handler: Function (or coroutine function) of an `httpx.Request`
+                 returning the `httpx.Response`, see `httpx.MockTransport`.
+        breaker: The circuit breaker, one that never opens by default.
+        max_retries: Retries of a failed request, sent without delay.
+
+    Returns:
+        Transport: The transport, to close at the end of the test.
+    """
+    if breaker is None:
+        breaker = CircuitBreaker(failure_threshold=100, reset_timeout=60)
+
+    return Transport(breaker=breaker, max_retries=max_retries, backoff=0.0, max_backoff=0.0,
+                     transport=httpx.MockTransport(handler), base_url="http://api.test")
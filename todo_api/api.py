@@ -1,22 +1,36 @@
-from fastapi import FastAPI, Request, HTTPException, status
-from fastapi.responses import JSONResponse
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
+from typing import Annotated
+from fastapi import FastAPI, Request, HTTPException, Header, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.exc import IntegrityError
-from todo_api.database import Base, engine
-from todo_api import models
+from todo_api.database import run_migrations
+from todo_api.metrics import MetricsMiddleware, registry
 from todo_api.routers.auth import router as auth_router
 from todo_api.routers.user import router as user_router
 from todo_api.routers.todos import router as todos_router
 from todo_api.routers.admin import router as admin_router
 from todo_api.config import settings
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Bring the database schema up to date before serving requests."""
+    
+    if settings.migrate_on_startup:
+        await asyncio.to_thread(run_migrations)
+    yield
+
 # FastAPI application initialization
 app = FastAPI(
     title=settings.app_name,
     description=settings.app_description,
-    version=settings.app_version
+    version=settings.app_version,
+    lifespan=lifespan
 )
 
-Base.metadata.create_all(bind=engine)
+# Latency, SQL statements, Argon2 time and response size of every request
+app.add_middleware(MetricsMiddleware)
 
 @app.exception_handler(IntegrityError)
 async def integrety_error_handler(resquest: Request, exc: IntegrityError) -> JSONResponse:
@@ -39,6 +53,26 @@ async def integrety_error_handler(resquest: Request, exc: IntegrityError) -> JSO
 async def root():
     return {'message': 'Welcome to the Todo App API. Visit /docs for documentation.'}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Annotated[str | None, Header()] = None) -> PlainTextResponse:
+    """Request metrics in the Prometheus text exposition format.
+    
+    Served when `metrics_enabled`, to the requests bearing `metrics_token`
+    when it is set (the `bearer_token` of the Prometheus scrape config).
+    """
+    
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    
+    if settings.metrics_token and not secrets.compare_digest(
+        (authorization or "").encode(), f"Bearer {settings.metrics_token}".encode()
+    ):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Invalid metrics token.",
+                            headers={"WWW-Authenticate": "Bearer"})
+    
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(auth_router)
 app.include_router(user_router)
 app.include_router(todos_router)
@@ -0,0 +1,109 @@
+"""In-process caches, with a pluggable backend to share them between workers."""
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from todo_api.config import settings
+from todo_api.schema import UserPrincipal
+
+
+# ============================== Cache backends ============================== #
+class CacheBackend(Protocol):
+    """Interface of a key-value cache with per-entry expiration.
+
+    The in-process `TTLCache` is the default, a shared store (e.g. Redis) can be
+    plugged in by implementing these methods.
+    """
+
+    async def get(self, key: str) -> Any | None: ...
+
+    async def set(self, key: str, value: Any, ttl: float) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after a time-to-live.
+
+    Args:
+        max_size (int): Maximum number of entries, the least recently used
+        entry is evicted beyond.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# ================================ User cache ================================ #
+class UserCache:
+    """Cache of authenticated user principals, keyed by user id.
+
+    Entries must be invalidated whenever the user row changes. With an
+    in-process backend other workers only see the change once their entry
+    expires, so the TTL bounds the staleness.
+
+    A principal loaded before an invalidation must not be stored after it:
+    `generation` counts the invalidations, it is read before loading the
+    principal and passed to `set`, which drops the principal when it changed.
+
+    Args:
+        backend (CacheBackend): The store holding the principals.
+        ttl (float): Time-to-live of the entries, in seconds.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        # Only touched from the event loop, see PasswordHashingPool
+        self.generation = 0
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    async def get(self, user_id: int) -> UserPrincipal | None:
+        return await self.backend.get(self._key(user_id))
+
+    async def set(self, principal: UserPrincipal, generation: int | None = None) -> None:
+        """Store a principal, unless an invalidation happened since
+        `generation` was read."""
+
+        if generation is not None and generation != self.generation:
+            return
+        await self.backend.set(self._key(principal.id), principal, self.ttl)
+
+    async def invalidate(self, user_id: int) -> None:
+        self.generation += 1
+        await self.backend.delete(self._key(user_id))
+
+
+user_cache = UserCache(
+    backend=TTLCache(max_size=settings.user_cache_max_size),
+    ttl=settings.user_cache_ttl_seconds
+)
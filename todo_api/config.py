@@ -15,14 +15,45 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite:///./todosapp.db"
+    migrate_on_startup: bool = True
+    db_pool_timeout_seconds: float = 30.0
+    
+    # Database - SQLite profile
+    sqlite_tuning: bool = True
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456
+    sqlite_pool_size: int = 5
+    sqlite_max_overflow: int = 5
+    
+    # Database - PostgreSQL profile
+    postgres_pool_size: int = 10
+    postgres_max_overflow: int = 20
+    postgres_pool_pre_ping: bool = True
+    postgres_pool_recycle_seconds: int = 1800
     
     # API
     api_base_url: str = "http://localhost:8000"
+    default_page_size: int = 50
+    max_page_size: int = 200
+    max_batch_size: int = 1000
+    export_batch_size: int = 500
+    import_batch_size: int = 1000
+    import_max_record_bytes: int = 65536
+    import_max_errors: int = 100
+    # The metrics expose the routes, the traffic and the latencies: opt-in, and
+    # behind a bearer token when one is set
+    metrics_enabled: bool = False
+    metrics_token: str | None = None
     
     # Security - JWT
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    token_revocation_refresh_seconds: float = 5.0
+    refresh_token_expire_days: int = 30
     
     # Security - Argon2
     argon2_time_cost: int = 2
@@ -31,6 +62,24 @@ class Settings(BaseSettings):
     argon2_hash_len: int = 32
     argon2_salt_len: int = 16
     
+    # Security - Authenticated user cache
+    user_cache_ttl_seconds: float = 60.0
+    user_cache_max_size: int = 10000
+    
+    # Security - Argon2 worker pool
+    argon2_pool_workers: int = 4
+    argon2_pool_max_pending: int = 64
+    
+    # Security - Rate limiting of the endpoints running Argon2
+    rate_limit_enabled: bool = True
+    rate_limit_max_keys: int = 100000
+    login_rate_limit_ip_burst: int = 20
+    login_rate_limit_ip_per_minute: float = 10.0
+    login_rate_limit_username_burst: int = 10
+    login_rate_limit_username_per_minute: float = 5.0
+    register_rate_limit_ip_burst: int = 5
+    register_rate_limit_ip_per_minute: float = 2.0
+    
     # CORS
     cors_origins: str = "http://localhost:8501"
     
@@ -1,16 +1,153 @@
-from sqlalchemy import create_engine
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import declarative_base
 
 from todo_api.config import settings
+from todo_api.metrics import instrument_engine
+
+# Sync driver -> async driver used by the request handlers
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+# Async driver -> sync driver used by migrations and scripts
+SYNC_DRIVERS = {
+    "sqlite+aiosqlite": "sqlite",
+    "postgresql+asyncpg": "postgresql",
+}
+
+def get_async_url(url: str | URL) -> URL:
+    """Return the async flavour of a database URL.
+
+    URLs already using an async driver (e.g. `sqlite+aiosqlite`,
+    `postgresql+asyncpg`, `postgresql+psycopg`) are returned unchanged.
+    """
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+def get_sync_url(url: str | URL) -> URL:
+    """Return the sync flavour of a database URL."""
+    url = make_url(url)
+    return url.set(drivername=SYNC_DRIVERS.get(url.drivername, url.drivername))
+
+def get_connect_args(url: URL) -> dict:
+    """Driver specific connection arguments."""
+    if url.get_backend_name() == "sqlite":
+        return {'check_same_thread': False}
+    return {}
+
+def get_engine_options(url: URL) -> dict:
+    """Engine arguments of the configured profile for the database backend.
+
+    In-memory SQLite databases keep SQLAlchemy's default pool, every connection
+    being a distinct database.
+    """
+    options = {"connect_args": get_connect_args(url)}
+    backend = url.get_backend_name()
+    
+    if backend == "sqlite" and url.database not in (None, "", ":memory:"):
+        options.update(pool_size=settings.sqlite_pool_size,
+                       max_overflow=settings.sqlite_max_overflow,
+                       pool_timeout=settings.db_pool_timeout_seconds)
+        
+    elif backend == "postgresql":
+        options.update(pool_size=settings.postgres_pool_size,
+                       max_overflow=settings.postgres_max_overflow,
+                       pool_timeout=settings.db_pool_timeout_seconds,
+                       pool_pre_ping=settings.postgres_pool_pre_ping,
+                       pool_recycle=settings.postgres_pool_recycle_seconds)
+    
+    return options
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Apply the SQLite profile to a new connection.
+
+    WAL lets readers run concurrently with the writer, `synchronous=NORMAL`
+    is durable across application crashes in WAL mode and `busy_timeout` makes
+    concurrent writers wait instead of failing with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms:d}")
+    # A negative cache_size is a size in KiB rather than in pages
+    cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib:d}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size:d}")
+    cursor.close()
+
+def create_database_engine(url: str | URL) -> Engine:
+    """Create a sync engine configured with the profile of its backend."""
+    url = get_sync_url(url)
+    db_engine = create_engine(url, **get_engine_options(url))
+    
+    if url.get_backend_name() == "sqlite" and settings.sqlite_tuning:
+        event.listen(db_engine, "connect", set_sqlite_pragmas)
+    
+    instrument_engine(db_engine)
+    return db_engine
+
+def create_async_database_engine(url: str | URL) -> AsyncEngine:
+    """Create an async engine configured with the profile of its backend."""
+    url = get_async_url(url)
+    db_engine = create_async_engine(url, **get_engine_options(url))
+    
+    if url.get_backend_name() == "sqlite" and settings.sqlite_tuning:
+        event.listen(db_engine.sync_engine, "connect", set_sqlite_pragmas)
+    
+    instrument_engine(db_engine.sync_engine)
+    return db_engine
 
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL,
-                       connect_args={'check_same_thread': False},
-                       future=True)
+# Sync engine, used by migrations and tooling
+engine = create_database_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine, used by the API request handlers
+async_engine = create_async_database_engine(SQLALCHEMY_DATABASE_URL)
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False,
+                                       expire_on_commit=False)
+
 # Base class for all ORM models, all model classes should inherit from this.
 Base = declarative_base()
+
+# ================================ Migrations ================================ #
+MIGRATIONS_PATH = Path(__file__).parent / "migrations"
+
+# Revision matching the schema created by `Base.metadata.create_all` before
+# migrations were introduced
+INITIAL_REVISION = "0001"
+
+def run_migrations(url: str | URL = SQLALCHEMY_DATABASE_URL) -> None:
+    """Upgrade the database schema to the latest Alembic revision.
+
+    Databases created before migrations were introduced are stamped with the
+    initial revision first, so that only the later revisions are applied.
+    """
+    url = get_sync_url(url)
+    
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_PATH))
+    config.set_main_option("sqlalchemy.url",
+                           url.render_as_string(hide_password=False).replace("%", "%%"))
+    
+    migration_engine = create_database_engine(url)
+    try:
+        tables = inspect(migration_engine).get_table_names()
+    finally:
+        migration_engine.dispose()
+    
+    if "users" in tables and "alembic_version" not in tables:
+        command.stamp(config, INITIAL_REVISION)
+    
+    command.upgrade(config, "head")
@@ -1,79 +1,118 @@
 from fastapi import Depends, Path, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt, JWTError
-from typing import Annotated
-from todo_api.database import SessionLocal
+from typing import Annotated, AsyncIterator
+from todo_api.database import AsyncSessionLocal
 from todo_api.config import settings
 from todo_api.security import decode_access_token, credential_exception
 from todo_api.models import User, Todo
+from todo_api.schema import UserPrincipal
+from todo_api.cache import user_cache
+from todo_api.revocation import revocation_list
 
 
-def get_db():
+async def get_db() -> AsyncIterator[AsyncSession]:
     """
-    Provide a SQLAlchemy database session for FastAPI dependencies.
+    Provide an async SQLAlchemy database session for FastAPI dependencies.
 
     This generator creates a new database session, yields it to the calling
     endpoint (or background task), and ensures that the session is properly
     closed after use, even if an exception occurs.
 
     Yields:
-        Session: An active SQLAlchemy session connected to the database.
+        AsyncSession: An active async SQLAlchemy session connected to the
+        database.
 
     Example:
         @app.get("/items/")
-        def read_items(db: Session = Depends(get_db)):
-            return db.query(Item).all()
+        async def read_items(db: AsyncSession = Depends(get_db)):
+            return (await db.scalars(select(Item))).all()
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
         
 # ============================== DB Dependency =============================== #
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
 # ========================= Current User Dependency ========================== #
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)],
-                           db: db_dependency) -> User:
-    """Retrieve the current User object from a valid JWT token.
+                           db: db_dependency) -> UserPrincipal:
+    """Retrieve the current user from a valid JWT token.
+    
+    The user is served from `user_cache` when possible and the revoked tokens
+    from `revocation_list`, so the common path does not query the database.
     
     Args:
         token (str): The JWT token extracted from the Authorization header.
-        db (Session): The database session dependency.
+        db (AsyncSession): The database session dependency.
         
     Returns:
-        User: The authenticated SQLAlchemy User object.
+        UserPrincipal: A snapshot of the authenticated user.
     
     Raises:
-        HTTPException (401 UNAUTHORIZED): If the token is invalid or the user is
-        not found.
+        HTTPException (401 UNAUTHORIZED): If the token is invalid or revoked, or
+        the user is not found or inactive.
     """
     
     token_data = decode_access_token(token)
+    # Read before the session starts a transaction, which may not see the
+    # changes committed after it: see UserCache
+    cache_generation = user_cache.generation
+    
+    await revocation_list.refresh(db)
+    if revocation_list.is_revoked(token_data["jti"]):
+        raise credential_exception
     
-    user = db.query(User).filter(
-        User.id == token_data["id"]
-    ).first()
+    principal = await user_cache.get(token_data["id"])
+    if principal is None:
+        user = await db.get(User, token_data["id"])
+        
+        if user is None:
+            raise credential_exception
+        
+        principal = UserPrincipal.model_validate(user)
+        await user_cache.set(principal, cache_generation)
     
-    if user is None:
+    # Tokens issued before a password change or a deactivation are revoked
+    valid_after = principal.tokens_valid_after
+    if not principal.is_active or (valid_after is not None and token_data["issued_at"] < valid_after):
         raise credential_exception
     
-    return user
+    return principal
+
+user_dependency = Annotated[UserPrincipal, Depends(get_current_user)]
+
+# ======================= Current User Row Dependency ======================== #
+async def get_current_user_row(user: user_dependency, db: db_dependency) -> User:
+    """Load the database row of the current user, for endpoints modifying it.
+    
+    Such endpoints must invalidate the user in `user_cache` once committed.
+    
+    Raises:
+        HTTPException (401 UNAUTHORIZED): If the user no longer exists.
+    """
+    
+    user_row = await db.get(User, user.id)
+    
+    if user_row is None:
+        raise credential_exception
+    
+    return user_row
 
-user_dependency = Annotated[User, Depends(get_current_user)]
+user_row_dependency = Annotated[User, Depends(get_current_user_row)]
 
 # ========================= Get Todo By Id Dependency ======================== #
-def get_todo_by_id(db: db_dependency, user: user_dependency,
-                   todo_id: int = Path(gt=0)) -> Todo:
+async def get_todo_by_id(db: db_dependency, user: user_dependency,
+                         todo_id: int = Path(gt=0)) -> Todo:
     """Retrieve a Todo item by its ID, ensuring it belongs to the authenticated user.
     
     Args:
-        db (Session): The database session dependency.
-        user (User): The authenticated User object.
+        db (AsyncSession): The database session dependency.
+        user (UserPrincipal): The authenticated user.
         todo_id (int): The ID of the Todo item to retrieve.
     
     Returns:
@@ -85,8 +124,9 @@ def get_todo_by_id(db: db_dependency, user: user_dependency,
     
     
     # Query to find the todo by ID and ensure it belongs to the authenticated user
-    todo = db.query(Todo).filter(Todo.owner_id == user.id,
-                                 Todo.id == todo_id).first()
+    todo = await db.scalar(
+        select(Todo).where(Todo.owner_id == user.id, Todo.id == todo_id)
+    )
     
     # If no todo is found, raise a 404 error
     if todo is None:
@@ -104,10 +144,10 @@ def admin_dependency(user: user_dependency):
     """Ensure the current user has admin privileges.
 
     Args:
-        user (user_dependency): The authenticated User object.
+        user (user_dependency): The authenticated user.
 
     Returns:
-        User: The same User object if they have admin privileges.
+        UserPrincipal: The same user if they have admin privileges.
         
     Raises:
         HTTPException (403 FORBIDDEN): If the user does not have admin privileges.
@@ -121,4 +161,4 @@ def admin_dependency(user: user_dependency):
     
     return user
 
-admin_dependency = Annotated[User, Depends(admin_dependency)]
\ No newline at end of file
+admin_dependency = Annotated[UserPrincipal, Depends(admin_dependency)]
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""Conditional GET support: strong ETags and `If-None-Match` handling.
+
+The ETags of the todo reads derive from `users.todos_version`, a per-user
+counter bumped in the same transaction as every write to the user's todos. A
+request whose ETag is still current is answered with 304 Not Modified after a
+primary key lookup of the counter, without running the todos query.
+"""
+import hashlib
+from typing import Annotated
+
+from fastapi import Header, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from todo_api.models import User
+
+
+# Clients may reuse a response only after revalidating it
+CACHE_CONTROL = "private, no-cache"
+
+if_none_match_header = Annotated[str | None, Header()]
+
+def make_etag(*parts: object) -> str:
+    """Build a strong ETag identifying the representation made of `parts`."""
+
+    digest = hashlib.sha256("\x1f".join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an `If-None-Match` header matches `etag`.
+
+    If-None-Match uses the weak comparison: a `W/` prefix is ignored.
+    """
+
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+def not_modified(etag: str) -> Response:
+    """The 304 response of a representation the client already holds."""
+
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+# ============================== Todos version =============================== #
+async def get_todos_version(db: AsyncSession, user_id: int) -> int:
+    """Current version of the todos of a user (primary key lookup)."""
+
+    return await db.scalar(select(User.todos_version).where(User.id == user_id)) or 0
+
+async def bump_todos_version(db: AsyncSession, user_id: int) -> int:
+    """Invalidate the ETags of the user's todos, to call before committing a write.
+
+    The increment runs in the database, so concurrent writes never lose a bump.
+
+    Returns:
+        int: The new version, to stamp the written todos with (see `todo_api.sync`).
+    """
+
+    return await db.scalar(
+        update(User).where(User.id == user_id)
+        .values(todos_version=User.todos_version + 1)
+        .returning(User.todos_version)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,85 @@
+"""Streaming export of the todos of a user as NDJSON or CSV.
+
+Rows are fetched with `yield_per` (a server-side cursor on PostgreSQL, the
+driver cursor on SQLite) and serialized one batch at a time into a
+`StreamingResponse`, so memory use does not grow with the number of todos.
+Only the exported columns are selected, no ORM object is built.
+"""
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from todo_api.config import settings
+from todo_api.models import Todo
+from todo_api.schema import TodoFileFormat
+
+
+# Same fields as TodoOutput
+EXPORT_COLUMNS = (Todo.id, Todo.title, Todo.description, Todo.priority,
+                  Todo.complete, Todo.owner_id)
+EXPORT_FIELDS = tuple(column.key for column in EXPORT_COLUMNS)
+
+# Cells a spreadsheet evaluates as a formula (CSV injection), exported with a
+# leading quote which makes them text. Cells already starting with a quote are
+# escaped too, so that the import can remove exactly one quote.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+ESCAPED_PREFIXES = FORMULA_PREFIXES + ("'",)
+
+MEDIA_TYPES = {
+    TodoFileFormat.ndjson: "application/x-ndjson",
+    TodoFileFormat.csv: "text/csv; charset=utf-8",
+}
+
+# ================================ Serializers =============================== #
+def _ndjson_lines(rows: Sequence[Row]) -> str:
+    return "".join(json.dumps(row._asdict(), separators=(",", ":")) + "\n" for row in rows)
+
+def _csv_cell(value: object) -> object:
+    if isinstance(value, str) and value.startswith(ESCAPED_PREFIXES):
+        return "'" + value
+    return value
+
+def _csv_lines(rows: Sequence[Row]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(map(_csv_cell, row) for row in rows)
+    return buffer.getvalue()
+
+# ================================== Export ================================== #
+async def _stream_rows(db: AsyncSession, owner_id: int,
+                       export_format: TodoFileFormat) -> AsyncIterator[str]:
+
+    if export_format is TodoFileFormat.csv:
+        yield _csv_lines([EXPORT_FIELDS])
+    serialize = _csv_lines if export_format is TodoFileFormat.csv else _ndjson_lines
+
+    result = await db.stream(
+        select(*EXPORT_COLUMNS).where(Todo.owner_id == owner_id).order_by(Todo.id)
+        .execution_options(yield_per=settings.export_batch_size)
+    )
+    async for rows in result.partitions():
+        yield serialize(rows)
+
+def export_todos(db: AsyncSession, owner_id: int,
+                 export_format: TodoFileFormat) -> StreamingResponse:
+    """Stream the todos of a user, in id order.
+
+    The rows are read while the response is sent, with the session of the
+    request (closed once the response is complete).
+
+    Args:
+        db (AsyncSession): The database session.
+        owner_id (int): The ID of the user whose todos are exported.
+        export_format (TodoFileFormat): NDJSON (one TodoOutput object per line) or
+        CSV (a header line, then one line per todo, see `FORMULA_PREFIXES`).
+    """
+
+    return StreamingResponse(
+        _stream_rows(db, owner_id, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="todos.{export_format.value}"'}
+    )
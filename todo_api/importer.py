@@ -0,0 +1,196 @@
+"""Streaming bulk import of todos from NDJSON or CSV.
+
+The request body is read chunk by chunk and split into records, each record is
+validated with `TodoRequest` as soon as it is complete and the valid ones are
+inserted by batches of `import_batch_size` rows, one executemany INSERT and one
+commit per batch. Only the current batch and the incomplete record are held in
+memory, whatever the size of the upload.
+
+Invalid records are rejected one by one and reported with their line number,
+they never abort the import: the batches inserted before stay committed.
+"""
+import csv
+import json
+from collections.abc import AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from todo_api.config import settings
+from todo_api.etag import bump_todos_version
+from todo_api.models import Todo
+from todo_api.schema import TodoFileFormat, TodoRequest
+
+
+class RecordError(ValueError):
+    """A record that cannot be turned into a todo, with the reason why."""
+
+# ================================== Records ================================= #
+def _csv_value(value: str) -> str:
+    """A CSV field, without the quote escaping it in the exports, see
+    `export.FORMULA_PREFIXES`."""
+
+    return value.removeprefix("'")
+
+async def _read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, bytes | None]]:
+    """Split a byte stream into lines, numbered from 1.
+
+    Lines longer than `import_max_record_bytes` are yielded as None, without
+    being buffered past that size.
+    """
+
+    max_size = settings.import_max_record_bytes
+    buffer = bytearray()
+    number = 0
+    overlong = False
+
+    async for chunk in chunks:
+        buffer += chunk
+        # A newline byte never occurs inside a multi-byte UTF-8 sequence
+        *lines, rest = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            yield number, None if overlong or len(line) > max_size else bytes(line)
+            overlong = False
+
+        buffer = rest
+        if len(buffer) > max_size:
+            overlong = True
+            buffer.clear()
+
+    if buffer or overlong:
+        yield number + 1, None if overlong or len(buffer) > max_size else bytes(buffer)
+
+def _decode(line: bytes | None) -> str:
+    if line is None:
+        raise RecordError("Record too long.")
+    try:
+        return line.decode().removesuffix("\r")
+    except UnicodeDecodeError:
+        raise RecordError("Invalid UTF-8.")
+
+async def _ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict | RecordError]]:
+    async for number, line in _read_lines(chunks):
+        try:
+            text = _decode(line).removeprefix("\ufeff")
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except json.JSONDecodeError:
+                raise RecordError("Invalid JSON.")
+            if not isinstance(record, dict):
+                raise RecordError("Expected a JSON object.")
+        except RecordError as exc:
+            yield number, exc
+        else:
+            yield number, record
+
+async def _csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict | RecordError]]:
+    """Records of a CSV upload with a header line, as dicts of the non-empty fields.
+
+    A quoted field may span several lines: a record is complete once its
+    number of double quotes is even (RFC 4180 escapes them by doubling).
+    """
+
+    header = None
+    pending, start, size, quotes = [], 0, 0, 0
+
+    async for number, line in _read_lines(chunks):
+        try:
+            text = _decode(line)
+        except RecordError as exc:
+            pending, size, quotes = [], 0, 0
+            yield number, exc
+            continue
+
+        if not pending:
+            start = number
+        pending.append(text)
+        size += len(text)
+        quotes += text.count('"')
+        if quotes % 2:
+            if size > settings.import_max_record_bytes:
+                pending, size, quotes = [], 0, 0
+                yield start, RecordError("Record too long.")
+            continue
+
+        record_lines, pending, size, quotes = pending, [], 0, 0
+        # Line breaks inside quoted fields are kept, as "\n"
+        values = next(csv.reader(line + "\n" for line in record_lines), [])
+
+        if header is None:
+            header = [name.strip().removeprefix("\ufeff") for name in values]
+        elif any(value.strip() for value in values):
+            if len(values) > len(header):
+                yield start, RecordError("More fields than in the header.")
+            else:
+                yield start, {name: _csv_value(value) for name, value in zip(header, values)
+                              if value != ""}
+
+    if pending:
+        yield start, RecordError("Unterminated quoted field.")
+
+# ================================== Import ================================== #
+def _validation_detail(exc: ValidationError) -> str:
+    error = exc.errors()[0]
+    location = ".".join(map(str, error["loc"]))
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+def _validate(record: dict | RecordError) -> dict:
+    if isinstance(record, RecordError):
+        raise record
+    try:
+        return TodoRequest.model_validate(record).model_dump()
+    except ValidationError as exc:
+        raise RecordError(_validation_detail(exc))
+
+async def _insert_batch(db: AsyncSession, owner_id: int, rows: list[dict]) -> None:
+    version = await bump_todos_version(db, owner_id)
+    await db.execute(insert(Todo), [{**row, "owner_id": owner_id, "version": version}
+                                    for row in rows])
+    await db.commit()
+
+async def import_todos(db: AsyncSession, owner_id: int, chunks: AsyncIterator[bytes],
+                       import_format: TodoFileFormat) -> dict:
+    """Create the todos of an NDJSON or CSV upload for a user.
+
+    NDJSON holds one `TodoRequest` object per line, CSV a header line naming
+    the `TodoRequest` fields then one todo per line. Unknown fields (e.g. the
+    `id` and `owner_id` of an export) are ignored.
+
+    Args:
+        db (AsyncSession): The database session.
+        owner_id (int): The ID of the user the todos are created for.
+        chunks (AsyncIterator[bytes]): The body of the upload.
+        import_format (TodoFileFormat): The format of the upload.
+
+    Returns:
+        dict: The number of `accepted` and `rejected` records and the first
+        `import_max_errors` rejections under `errors` (line and detail).
+    """
+
+    records = _csv_records(chunks) if import_format is TodoFileFormat.csv else _ndjson_records(chunks)
+    report = {"accepted": 0, "rejected": 0, "errors": []}
+    rows = []
+
+    async for number, record in records:
+        try:
+            rows.append(_validate(record))
+        except RecordError as exc:
+            report["rejected"] += 1
+            if len(report["errors"]) < settings.import_max_errors:
+                report["errors"].append({"line": number, "detail": str(exc)})
+            continue
+
+        if len(rows) == settings.import_batch_size:
+            await _insert_batch(db, owner_id, rows)
+            report["accepted"] += len(rows)
+            rows = []
+
+    if rows:
+        await _insert_batch(db, owner_id, rows)
+        report["accepted"] += len(rows)
+
+    return report
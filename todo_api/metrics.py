@@ -0,0 +1,234 @@
+"""Per-request instrumentation, exposed in the Prometheus text format.
+
+`MetricsMiddleware` measures every HTTP request: latency, response size, number
+and duration of the SQL statements (recorded by the engine events installed by
+`instrument_engine`) and time spent in Argon2. The totals of a request are
+returned in its `Server-Timing` header, the aggregates are served by `/metrics`.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# ================================ Collectors ================================ #
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], **extra: str) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Counter:
+    """Monotonic counter, one value per combination of label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labels, values)} {value}"
+                    for values, value in sorted(self._values.items())]
+
+class Histogram:
+    """Cumulative histogram, one series per combination of label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), series[:-1]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket"
+                                 f"{_format_labels(self.labels, values, le=str(bound))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {series[-1]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+        return lines
+
+class Registry:
+    """The set of collectors exposed by the `/metrics` endpoint."""
+
+    def __init__(self):
+        self.collectors: list[Counter | Histogram] = []
+
+    def register(self, collector: Counter | Histogram) -> Counter | Histogram:
+        self.collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        """Render every collector in the Prometheus text exposition format."""
+
+        lines = []
+        for collector in self.collectors:
+            lines.append(f"# HELP {collector.name} {collector.description}")
+            lines.append(f"# TYPE {collector.name} {collector.kind}")
+            lines.extend(collector.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LABELS = ("method", "route")
+
+requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled.", ("method", "route", "status")))
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", REQUEST_LABELS))
+response_size = registry.register(Histogram(
+    "http_response_size_bytes", "HTTP response body size.", REQUEST_LABELS, SIZE_BUCKETS))
+db_statements = registry.register(Histogram(
+    "db_statements_per_request", "SQL statements executed per request.", REQUEST_LABELS,
+    COUNT_BUCKETS))
+db_duration = registry.register(Histogram(
+    "db_duration_seconds", "Time spent executing SQL statements per request.", REQUEST_LABELS))
+argon2_duration = registry.register(Histogram(
+    "argon2_duration_seconds", "Argon2 operation latency, queueing included.", ("operation",)))
+rate_limited_total = registry.register(Counter(
+    "rate_limited_total", "Requests rejected by a rate limit.", ("scope",)))
+
+# ============================ Request measurements ========================== #
+@dataclass
+class RequestMetrics:
+    """Totals of the request being served.
+
+    Attributes:
+        db_statements (int): Number of SQL statements executed.
+        db_seconds (float): Time spent executing them.
+        argon2_seconds (float): Time spent waiting for Argon2 operations.
+    """
+    db_statements: int = 0
+    db_seconds: float = 0.0
+    argon2_seconds: float = 0.0
+
+
+current_request: ContextVar[RequestMetrics | None] = ContextVar("current_request", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Statements run one at a time on a connection
+    conn.info["query_start"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_start"]
+    metrics = current_request.get()
+    if metrics is not None:
+        metrics.db_statements += 1
+        metrics.db_seconds += elapsed
+
+def instrument_engine(engine: Engine) -> None:
+    """Record the SQL statements of `engine` in the metrics of the current request.
+
+    For an async engine pass its `sync_engine`, SQLAlchemy propagates the
+    context of the awaiting task to the statement execution.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def record_argon2(operation: str, seconds: float) -> None:
+    """Record an Argon2 operation, in the current request metrics when any."""
+
+    argon2_duration.observe(seconds, operation)
+    metrics = current_request.get()
+    if metrics is not None:
+        metrics.argon2_seconds += seconds
+
+def record_rate_limited(scope: str) -> None:
+    """Record a request rejected by the rate limit `scope`."""
+
+    rate_limited_total.inc(scope)
+
+# ================================ Middleware ================================ #
+class MetricsMiddleware:
+    """ASGI middleware measuring each HTTP request.
+
+    Routes are labelled by their path template (e.g. `/todos/{todo_id}`) to keep
+    the number of series bounded, requests matching no route as "unmatched".
+    The `Server-Timing` header is computed when the response starts, so for
+    streamed responses it does not cover the time spent producing the body.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        start = time.perf_counter()
+        status_code = 500
+        body_size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, body_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", self._server_timing(metrics, start).encode()))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                body_size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path_format", "unmatched"))
+
+            requests_total.inc(*labels, str(status_code))
+            request_duration.observe(time.perf_counter() - start, *labels)
+            response_size.observe(body_size, *labels)
+            db_statements.observe(metrics.db_statements, *labels)
+            db_duration.observe(metrics.db_seconds, *labels)
+
+    @staticmethod
+    def _server_timing(metrics: RequestMetrics, start: float) -> str:
+        total_ms = (time.perf_counter() - start) * 1000
+        timings = [f"app;dur={total_ms:.1f}",
+                   f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.db_statements} queries"']
+        if metrics.argon2_seconds:
+            timings.append(f"argon2;dur={metrics.argon2_seconds * 1000:.1f}")
+        return ", ".join(timings)
@@ -0,0 +1,60 @@
+"""Alembic environment, runs the migrations against the application database."""
+from logging.config import fileConfig
+
+from alembic import context
+from todo_api.database import Base, SQLALCHEMY_DATABASE_URL, get_sync_url, create_database_engine
+from todo_api import models  # noqa: F401 - registers the tables on Base.metadata
+from todo_api.search import include_name
+
+config = context.config
+
+# Logging is only configured when running from the alembic CLI
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# `run_migrations` passes the URL explicitly, the CLI uses the settings
+url = get_sync_url(config.get_main_option("sqlalchemy.url") or SQLALCHEMY_DATABASE_URL)
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL script without connecting to the database."""
+    
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
+        render_as_batch=True
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run the migrations on a live connection."""
+    
+    connectable = create_database_engine(url)
+
+    with connectable.connect() as connection:
+        # Batch mode lets SQLite alter tables by recreating them
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+            render_as_batch=True
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+            
+    connectable.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
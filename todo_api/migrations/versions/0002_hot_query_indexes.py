@@ -0,0 +1,37 @@
+"""Indexes for the todos listing and the admin username prefix search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Todos of a user in id order (pagination), optionally filtered on completion
+    op.create_index('ix_todos_owner_id_id', 'todos', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_todos_owner_id_complete_id', 'todos',
+                    ['owner_id', 'complete', 'id'], unique=False)
+    
+    # Case-insensitive username prefix search
+    op.create_index('ix_users_username_lower', 'users',
+                    [sa.text('lower(username)')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_username_lower', table_name='users')
+    op.drop_index('ix_todos_owner_id_complete_id', table_name='todos')
+    op.drop_index('ix_todos_owner_id_id', table_name='todos')
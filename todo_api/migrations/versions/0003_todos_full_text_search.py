@@ -0,0 +1,47 @@
+"""Full-text search index on todo title and description
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from todo_api.search import FTS_TABLE, POSTGRES_SEARCH_INDEX, SQLITE_FTS_DDL, POSTGRES_FTS_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    
+    if dialect == "sqlite":
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+        # Index the existing todos
+        op.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        
+    elif dialect == "postgresql":
+        for statement in POSTGRES_FTS_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    
+    if dialect == "sqlite":
+        for trigger in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER IF EXISTS todos_fts_after_{trigger}")
+        op.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        
+    elif dialect == "postgresql":
+        op.execute(f"DROP INDEX IF EXISTS {POSTGRES_SEARCH_INDEX}")
@@ -0,0 +1,54 @@
+"""Todo versions, update timestamps and tombstones for the sync endpoint
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 11:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Added in place: recreating the table would drop the full-text search
+    # triggers. SQLite cannot add a column with a non-constant default, the
+    # existing rows are stamped afterwards.
+    op.add_column('todos', sa.Column('version', sa.Integer(), nullable=False,
+                                     server_default='0'))
+    op.add_column('todos', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE todos SET updated_at = CURRENT_TIMESTAMP")
+    op.create_index('ix_todos_owner_id_version', 'todos', ['owner_id', 'version'],
+                    unique=False)
+    
+    op.create_table(
+        'todo_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('todo_id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_todo_tombstones_owner_id_version', 'todo_tombstones',
+                    ['owner_id', 'version'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todo_tombstones_owner_id_version', table_name='todo_tombstones')
+    op.drop_table('todo_tombstones')
+    op.drop_index('ix_todos_owner_id_version', table_name='todos')
+    # ALTER TABLE DROP COLUMN keeps the full-text search triggers (SQLite 3.35+)
+    op.drop_column('todos', 'updated_at')
+    op.drop_column('todos', 'version')
@@ -0,0 +1,45 @@
+"""Todo creation time and the indexes of the sorted todo listings
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from todo_api.models import utcnow
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Added in place like in 0005, the creation time of the existing todos is
+    # unknown: their last update time is the best estimate
+    op.add_column('todos', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.execute(sa.text("UPDATE todos SET created_at = COALESCE(updated_at, :now)")
+               .bindparams(sa.bindparam("now", utcnow(), type_=sa.DateTime())))
+    
+    # Sorted listings, scanned in either direction
+    op.create_index('ix_todos_owner_id_priority_id', 'todos',
+                    ['owner_id', 'priority', 'id'], unique=False)
+    op.create_index('ix_todos_owner_id_complete_priority_id', 'todos',
+                    ['owner_id', 'complete', 'priority', 'id'], unique=False)
+    op.create_index('ix_todos_owner_id_created_at_id', 'todos',
+                    ['owner_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_owner_id_created_at_id', table_name='todos')
+    op.drop_index('ix_todos_owner_id_complete_priority_id', table_name='todos')
+    op.drop_index('ix_todos_owner_id_priority_id', table_name='todos')
+    op.drop_column('todos', 'created_at')
@@ -0,0 +1,32 @@
+"""Recreate the username index dropped by a downgrade of 0004
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Downgrading 0004 recreates the users table in batch mode, which drops the
+    # expression index of 0002: a database upgraded again has lost it
+    op.create_index('ix_users_username_lower', 'users',
+                    [sa.text('lower(username)')], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The index belongs to 0002
+    pass
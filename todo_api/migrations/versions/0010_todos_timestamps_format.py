@@ -0,0 +1,35 @@
+"""Todo timestamps stamped by 0005 in the DateTime format
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 0005 stamped the existing todos with CURRENT_TIMESTAMP, copied to their
+    # creation time by 0006. On SQLite its text has no microseconds, unlike the
+    # DateTime format: the stamped rows sort before the others of the same
+    # second, in the sorted listings and their cursors.
+    if op.get_bind().dialect.name == "sqlite":
+        for column in ('updated_at', 'created_at'):
+            op.execute(f"UPDATE todos SET {column} = {column} || '.000000' "
+                       f"WHERE length({column}) = 19")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The timestamps stay in the DateTime format
+    pass
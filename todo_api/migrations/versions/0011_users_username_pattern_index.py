@@ -0,0 +1,37 @@
+"""Username index in code point order on PostgreSQL
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, Sequence[str], None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The admin prefix search compares lower(username) in code point order
+    # (~>=~ and ~<~), the index of 0002 is in the order of the database
+    # collation. SQLite already compares the strings in code point order.
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index('ix_users_username_lower', table_name='users')
+        op.create_index('ix_users_username_lower', 'users',
+                        [sa.text('lower(username) text_pattern_ops')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index('ix_users_username_lower', table_name='users')
+        op.create_index('ix_users_username_lower', 'users',
+                        [sa.text('lower(username)')], unique=False)
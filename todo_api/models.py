@@ -1,8 +1,18 @@
+from datetime import datetime, timezone
 from todo_api.database import Base
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 
 
+def utcnow() -> datetime:
+    """Current naive UTC time, as stored in the DateTime columns.
+    
+    Computed in Python rather than with `func.now()`, whose SQLite format
+    differs from the one of bound datetimes and would break comparisons.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -15,10 +25,24 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     role = Column(String)  # Defines role for authorization
     phone_number = Column(String, nullable=True)
+    # Bumped by every write to the user's todos, identifies their ETags
+    todos_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Access tokens issued before are rejected, see `todo_api.revocation`. Set at
+    # creation so that tokens of a deleted user never match a reused id.
+    tokens_valid_after = Column(DateTime, nullable=True, default=utcnow)
     
     # Relationship with Todo model
     todos = relationship("Todo", back_populates="owner",
                          cascade="all, delete-orphan")
+    todo_tombstones = relationship("TodoTombstone", cascade="all, delete-orphan")
+    refresh_tokens = relationship("RefreshToken", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Case-insensitive username prefix search (admin users listing), in
+        # code point order on PostgreSQL
+        Index("ix_users_username_lower", func.lower(username).label("username_lower"),
+              postgresql_ops={"username_lower": "text_pattern_ops"}),
+    )
 
 
 class Todo(Base):
@@ -30,6 +54,89 @@ class Todo(Base):
     priority = Column(Integer)
     complete = Column(Boolean, default=False)
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    # Owner's todos version of the last write, see `todo_api.sync`
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     
     # Relationship with User model
     owner = relationship("User", back_populates="todos")
+    
+    __table_args__ = (
+        # Todos of a user in id order (pagination), optionally filtered on
+        # completion
+        Index("ix_todos_owner_id_id", owner_id, id),
+        Index("ix_todos_owner_id_complete_id", owner_id, complete, id),
+        # Todos of a user changed since a version (sync)
+        Index("ix_todos_owner_id_version", owner_id, version),
+        # Sorted listings, scanned in either direction: highest priority
+        # (incomplete) todos first, most recent first
+        Index("ix_todos_owner_id_priority_id", owner_id, priority, id),
+        Index("ix_todos_owner_id_complete_priority_id", owner_id, complete, priority, id),
+        Index("ix_todos_owner_id_created_at_id", owner_id, created_at, id),
+    )
+
+
+class TodoTombstone(Base):
+    """Record of a deleted todo, reported by the sync endpoint."""
+    __tablename__ = "todo_tombstones"
+    
+    id = Column(Integer, primary_key=True)
+    # Not unique: SQLite may reuse the id of the last deleted todo
+    todo_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Owner's todos version of the deletion
+    version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=utcnow)
+    
+    __table_args__ = (
+        Index("ix_todo_tombstones_owner_id_version", owner_id, version),
+    )
+
+
+class RevokedToken(Base):
+    """An access token revoked before its expiry, see `todo_api.revocation`."""
+    __tablename__ = "revoked_tokens"
+    
+    jti = Column(String(32), primary_key=True)
+    # Expiry of the token, the row is useless afterwards
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=False, default=utcnow)
+    
+    __table_args__ = (
+        Index("ix_revoked_tokens_revoked_at", revoked_at),
+        Index("ix_revoked_tokens_expires_at", expires_at),
+    )
+
+
+class RefreshToken(Base):
+    """A refresh token, see `todo_api.refresh_tokens`.
+    
+    Only the SHA-256 hash of the token is stored. Every refresh replaces the
+    token with a new one of the same family, the used row is kept until its
+    expiry to detect a reuse.
+    """
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    # Tokens descending from the same login
+    family_id = Column(String(32), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    # Set when the token is exchanged, a second use reveals a stolen token
+    used_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_refresh_tokens_family_id", family_id),
+        Index("ix_refresh_tokens_user_id_expires_at", user_id, expires_at),
+    )
+
+
+# Sortable columns of the todo listings besides the id, see `schema.TodoSort`
+TODO_SORT_COLUMNS = {
+    "priority": Todo.priority,
+    "title": Todo.title,
+    "created_at": Todo.created_at,
+}
@@ -0,0 +1,224 @@
+"""Keyset (cursor) pagination helpers shared by the list endpoints."""
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+from fastapi import HTTPException, Query, status
+from sqlalchemy import Boolean, ColumnElement, DateTime, Integer, Select, String, and_, or_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, Any
+
+from todo_api.config import settings
+
+# ========================= Invalid cursor exception ========================= #
+invalid_cursor_exception = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid pagination cursor."
+)
+
+# ================================== Cursor ================================== #
+# Range of the integer columns, larger values overflow the drivers
+INT64_MIN, INT64_MAX = -2**63, 2**63 - 1
+
+def is_int64(value: Any) -> bool:
+    """Whether a decoded value is an integer bindable to an integer column."""
+
+    # bool is a subclass of int
+    return (isinstance(value, int) and not isinstance(value, bool)
+            and INT64_MIN <= value <= INT64_MAX)
+
+def encode_cursor(values: dict[str, Any]) -> str:
+    """Encode the keyset of the last returned row into an opaque cursor."""
+
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_token(token: str) -> Any:
+    """Decode an opaque token produced by `encode_cursor`.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except binascii.Error as exc:
+        raise ValueError("Malformed token.") from exc
+    return json.loads(raw)
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """Decode a cursor produced by `encode_cursor`.
+
+    Raises:
+        HTTPException (400 BAD REQUEST): If the cursor is malformed.
+    """
+
+    try:
+        values = decode_token(cursor)
+    except ValueError:
+        raise invalid_cursor_exception
+
+    if not isinstance(values, dict) or not is_int64(values.get("id")):
+        raise invalid_cursor_exception
+
+    return values
+
+# ============================ Query parameters ============================== #
+cursor_query = Annotated[str | None, Query(
+    description="Opaque cursor returned as `next_cursor` by the previous page."
+)]
+limit_query = Annotated[int, Query(
+    ge=1, le=settings.max_page_size,
+    description="Maximum number of items per page."
+)]
+
+# ================================= Sorting ================================== #
+def parse_sort(sort: str, columns: dict[str, ColumnElement]) -> tuple[ColumnElement | None, bool]:
+    """Resolve a sort parameter such as "priority" or "-priority" (descending).
+
+    Args:
+        sort (str): The sort parameter, a key of `columns` or "id", prefixed by
+        '-' for a descending order.
+        columns (dict): The sortable columns by name.
+
+    Returns:
+        tuple: The column to sort on before the id (None to sort on the id
+        only) and whether the order is descending.
+    """
+
+    descending = sort.startswith("-")
+    name = sort.removeprefix("-")
+    return (None if name == "id" else columns[name]), descending
+
+def _dump_key(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _load_key(sort: ColumnElement, value: Any) -> Any:
+    """The sort key of a cursor, checked against the type of the sort expression.
+
+    Raises:
+        HTTPException (400 BAD REQUEST): If the key cannot be compared with it.
+    """
+
+    if value is None:
+        # Only a nullable column dumps a None key
+        if getattr(sort, "nullable", False):
+            return None
+        raise invalid_cursor_exception
+
+    if isinstance(sort.type, DateTime):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise invalid_cursor_exception
+
+    if isinstance(sort.type, Boolean):
+        valid = isinstance(value, bool)
+    elif isinstance(sort.type, Integer):
+        valid = is_int64(value)
+    elif isinstance(sort.type, String):
+        valid = isinstance(value, str)
+    else:
+        # Computed expressions such as a search relevance
+        valid = is_int64(value) or (isinstance(value, float) and math.isfinite(value))
+
+    if not valid:
+        raise invalid_cursor_exception
+    return value
+
+def _after(keys: list[ColumnElement], last: list[Any], descending: bool,
+           nullable: bool) -> ColumnElement:
+    """The condition selecting the rows after the keyset `last` in the order of
+    `keys`, a row value comparison.
+
+    The nulls of a nullable sort key, the first key, compare greater than any
+    value as in PostgreSQL: they come last in ascending order and first in
+    descending order. A row value comparison is never true for a null, so the
+    null keys are selected explicitly.
+    """
+
+    if len(keys) == 1:
+        return keys[0] < last[0] if descending else keys[0] > last[0]
+
+    sort, key = keys[0], last[0]
+    if nullable and key is None:
+        after_id = keys[1] < last[1] if descending else keys[1] > last[1]
+        null_rows = and_(sort.is_(None), after_id)
+        # In descending order the values follow the nulls
+        return or_(null_rows, sort.is_not(None)) if descending else null_rows
+
+    after = tuple_(*keys) < tuple_(*last) if descending else tuple_(*keys) > tuple_(*last)
+    # In ascending order the nulls follow the values
+    return or_(after, sort.is_(None)) if nullable and not descending else after
+
+# ================================ Paginate ================================== #
+async def paginate(db: AsyncSession, query: Select, cursor: str | None,
+                   limit: int, sort: ColumnElement | None = None,
+                   descending: bool = False) -> dict[str, Any]:
+    """Execute `query` one page at a time, ordered by `sort` then entity id.
+
+    Both keys are sorted in the same direction, so that an index on
+    `(..., sort, id)` serves the order and the cursor condition (a row value
+    comparison) in either direction. One extra row is fetched to know whether
+    a next page exists without a separate count query.
+
+    Selecting columns rather than the entity skips building ORM objects, the
+    items are then dicts of the selected columns.
+
+    Args:
+        db (AsyncSession): The database session.
+        query (Select): A select of a single ORM entity having an `id` column,
+        or of columns of such an entity including `id`.
+        cursor (str | None): The cursor of the page to fetch, None for the first.
+        limit (int): Maximum number of rows in the page.
+        sort (ColumnElement | None): Optional expression to sort on before the
+        id, e.g. a column or a search relevance. The nulls of a nullable column
+        sort last in ascending order, first in descending order.
+        descending (bool): Sort in descending order.
+
+    Returns:
+        dict: `items` (the ORM objects or dicts of the page) and `next_cursor`.
+    """
+
+    descriptions = query.column_descriptions
+    entity = descriptions[0]["entity"]
+    keys = [entity.id]
+    fields = None if descriptions[0]["expr"] is entity else [desc["name"] for desc in descriptions]
+
+    nullable = getattr(sort, "nullable", False)
+    if sort is not None:
+        query = query.add_columns(sort)
+        keys.insert(0, sort)
+
+    if cursor is not None:
+        values = decode_cursor(cursor)
+        last = [values["id"]]
+
+        if sort is not None:
+            if "key" not in values:
+                raise invalid_cursor_exception
+            last.insert(0, _load_key(sort, values["key"]))
+
+        query = query.where(_after(keys, last, descending, nullable))
+
+    order_by = [key.desc() for key in keys] if descending else [key.asc() for key in keys]
+    if nullable:
+        order_by[0] = order_by[0].nulls_first() if descending else order_by[0].nulls_last()
+    result = await db.execute(query.order_by(*order_by).limit(limit + 1))
+    rows = result.all()
+
+    if fields is None:
+        items = [row[0] for row in rows[:limit]]
+    else:
+        items = [dict(zip(fields, row)) for row in rows[:limit]]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last_row = rows[limit - 1]
+        values = {"id": last_row.id if fields else last_row[0].id}
+        if sort is not None:
+            values["key"] = _dump_key(last_row[-1])
+        next_cursor = encode_cursor(values)
+
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,153 @@
+"""Token bucket rate limiting of the endpoints running Argon2.
+
+Every login or registration costs an Argon2 computation, so they are limited
+per client IP (and logins per username) by dependencies run before the
+endpoint: a rejected request costs a dictionary lookup, no hashing. The
+rejection is a 429 whose `Retry-After` gives the time until a token is
+available.
+
+The buckets live in the process by default: with several workers, each one
+applies the limits on its own. A shared store (e.g. Redis) can be plugged in by
+implementing `RateLimitBackend`.
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Annotated, Protocol
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+from todo_api.config import settings
+from todo_api.metrics import record_rate_limited
+
+
+# ============================== Bucket backends ============================= #
+class RateLimitBackend(Protocol):
+    """Interface of a store of token buckets.
+
+    The in-process `MemoryRateLimitBackend` is the default, a shared store can
+    be plugged in by implementing this method, atomically.
+    """
+
+    async def take(self, key: str, capacity: int, refill_rate: float) -> float:
+        """Take a token from the bucket `key`, full when new.
+
+        Returns:
+            float: 0 when a token was taken, else the seconds until one is
+            available.
+        """
+        ...
+
+
+class MemoryRateLimitBackend:
+    """Token buckets of the process, the least recently used are dropped
+    beyond `max_keys`.
+
+    A dropped bucket starts full again, so `max_keys` must exceed the number
+    of clients active within a refill period.
+
+    Args:
+        max_keys (int): Maximum number of buckets.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # key -> (tokens, time of the last update)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, capacity: int, refill_rate: float) -> float:
+        # Only touched from the event loop, see PasswordHashingPool
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / refill_rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+# ================================== Limiter ================================= #
+def too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts, please retry later.",
+        headers={"Retry-After": str(math.ceil(retry_after))}
+    )
+
+class RateLimiter:
+    """A token bucket per key: `burst` requests at once, then `per_minute`.
+
+    Args:
+        scope (str): Name of the limit, prefixes its keys.
+        burst (int): Capacity of the buckets.
+        per_minute (float): Tokens added to a bucket per minute.
+    """
+
+    def __init__(self, scope: str, burst: int, per_minute: float):
+        self.scope = scope
+        self.burst = burst
+        self.per_minute = per_minute
+
+    async def check(self, backend: RateLimitBackend, key: str) -> None:
+        """Take a token for `key`.
+
+        Raises:
+            HTTPException (429 TOO MANY REQUESTS): If the bucket is empty.
+        """
+
+        wait = await backend.take(f"{self.scope}:{key}", self.burst, self.per_minute / 60)
+        if wait > 0:
+            record_rate_limited(self.scope)
+            raise too_many_requests(wait)
+
+
+rate_limit_backend: RateLimitBackend = MemoryRateLimitBackend(
+    max_keys=settings.rate_limit_max_keys
+)
+
+login_ip_limiter = RateLimiter("login_ip", settings.login_rate_limit_ip_burst,
+                               settings.login_rate_limit_ip_per_minute)
+login_username_limiter = RateLimiter("login_username", settings.login_rate_limit_username_burst,
+                                     settings.login_rate_limit_username_per_minute)
+register_ip_limiter = RateLimiter("register_ip", settings.register_rate_limit_ip_burst,
+                                  settings.register_rate_limit_ip_per_minute)
+
+def client_ip(request: Request) -> str:
+    """The address of the client, the one forwarded by the proxy when uvicorn
+    runs with `--proxy-headers`."""
+
+    return request.client.host if request.client else "unknown"
+
+# ================================ Dependencies ============================== #
+async def limit_login(request: Request,
+                      form_data: Annotated[OAuth2PasswordRequestForm, Depends()]) -> None:
+    """Limit the login attempts per client IP, then per username.
+
+    The form is the one of the endpoint, dependencies are solved once per request.
+    """
+
+    if not settings.rate_limit_enabled:
+        return
+
+    await login_ip_limiter.check(rate_limit_backend, client_ip(request))
+    # Usernames are case-sensitive but variants must not multiply the attempts
+    await login_username_limiter.check(rate_limit_backend, form_data.username.lower())
+
+async def limit_register(request: Request) -> None:
+    """Limit the registrations per client IP."""
+
+    if not settings.rate_limit_enabled:
+        return
+
+    await register_ip_limiter.check(rate_limit_backend, client_ip(request))
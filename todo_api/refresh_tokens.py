@@ -0,0 +1,108 @@
+"""Refresh tokens, exchanged for a new access token without the password.
+
+A refresh token is an opaque random string, stored as its SHA-256 hash: it
+carries enough entropy for a fast hash, so a refresh costs no Argon2
+verification. Every refresh rotates the token: the presented one is marked as
+used and a new one of the same family is returned. Presenting a used token
+again means that it was copied, the whole family is then revoked, so both the
+thief and the legitimate client have to log in again.
+
+The access tokens carry the family id (`sid` claim): logout revokes the family
+of the session. Password changes and deactivations revoke the refresh tokens
+through `users.tokens_valid_after`, like the access tokens.
+"""
+import hashlib
+import secrets
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from todo_api.config import settings
+from todo_api.models import RefreshToken, User, utcnow
+from todo_api.security import credential_exception
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def issue_refresh_token(db: AsyncSession, user_id: int,
+                              family_id: str | None = None) -> tuple[str, str]:
+    """Create a refresh token, to call before committing.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (int): The ID of the user.
+        family_id (str | None): The family of a rotated token, a new family
+        (login) when None.
+
+    Returns:
+        tuple: The token and its family id.
+    """
+
+    token = secrets.token_urlsafe(32)
+    family_id = family_id or uuid.uuid4().hex
+    db.add(RefreshToken(
+        token_hash=hash_refresh_token(token),
+        family_id=family_id,
+        user_id=user_id,
+        expires_at=utcnow() + timedelta(days=settings.refresh_token_expire_days)
+    ))
+    return token, family_id
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> tuple[User, str, str]:
+    """Exchange a refresh token for a new one of the same family, to call before
+    committing.
+
+    Returns:
+        tuple: The user, the new token and its family id.
+
+    Raises:
+        HTTPException (401 UNAUTHORIZED): If the token is unknown, expired,
+        already used or revoked, or the user is inactive. A reused token revokes
+        its family, committed before raising.
+    """
+
+    now = utcnow()
+    # Marking the token as used is the check: of two concurrent refreshes
+    # with the same token, only one updates the row
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == hash_refresh_token(token),
+               RefreshToken.used_at.is_(None), RefreshToken.expires_at > now)
+        .values(used_at=now)
+        .returning(RefreshToken.user_id, RefreshToken.family_id, RefreshToken.created_at)
+    )
+    row = result.one_or_none()
+
+    if row is None:
+        reused_family = await db.scalar(
+            select(RefreshToken.family_id)
+            .where(RefreshToken.token_hash == hash_refresh_token(token),
+                   RefreshToken.used_at.is_not(None), RefreshToken.expires_at > now)
+        )
+        if reused_family is not None:
+            await revoke_refresh_family(db, reused_family)
+            await db.commit()
+        raise credential_exception
+
+    user_id, family_id, created_at = row
+    user = await db.get(User, user_id)
+    if (user is None or not user.is_active
+            or (user.tokens_valid_after is not None and created_at < user.tokens_valid_after)):
+        raise credential_exception
+
+    new_token, family_id = await issue_refresh_token(db, user_id, family_id)
+    return user, new_token, family_id
+
+async def revoke_refresh_family(db: AsyncSession, family_id: str) -> None:
+    """Revoke every refresh token of a family, to call before committing."""
+
+    await db.execute(delete(RefreshToken).where(RefreshToken.family_id == family_id))
+
+async def purge_expired_refresh_tokens(db: AsyncSession, user_id: int) -> None:
+    """Delete the expired refresh tokens of a user, to call before committing."""
+
+    await db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id,
+                                                RefreshToken.expires_at <= utcnow()))
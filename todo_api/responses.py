@@ -0,0 +1,30 @@
+"""Fast serialization path of the list endpoints.
+
+By default an endpoint returning ORM objects has them validated into its
+`response_model` (`from_attributes`), dumped to Python values then encoded by
+`json.dumps`. The list endpoints rather select the columns of the response
+model, whose values already have the response types, and encode the rows in a
+single pydantic-core call.
+"""
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+def output_columns(entity: type, schema: type[BaseModel]) -> list[InstrumentedAttribute]:
+    """Columns of `entity` named like the fields of `schema`, in the field order."""
+
+    return [getattr(entity, field) for field in schema.model_fields]
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded by pydantic-core, without any validation.
+
+    The content must be made of plain values (dicts, lists, str, numbers,
+    datetimes...) matching the documented response model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
@@ -0,0 +1,108 @@
+"""Revocation of access tokens before their expiry.
+
+A single token is revoked by its `jti` (logout), kept in `revoked_tokens` until
+the token expires. All the tokens of a user are revoked by moving
+`users.tokens_valid_after` (password change, deactivation): this one is read
+from the cached user principal, at no extra cost.
+
+Every worker keeps the unexpired revoked jtis in memory, so checking a token is
+a set lookup. The set is refreshed incrementally, at most every
+`token_revocation_refresh_seconds`, with the rows revoked since the previous
+refresh: a token revoked by another worker is accepted until then.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from todo_api.config import settings
+from todo_api.models import RevokedToken, utcnow
+
+
+# Rows are read again for this long, to catch revocations committed after the
+# previous refresh by transactions started before it
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+class RevocationList:
+    """In-process copy of the unexpired revoked token ids.
+
+    Args:
+        refresh_interval (float): Minimum time between two refreshes, in seconds.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._revoked: dict[str, datetime] = {}
+        self._last_refresh: datetime | None = None
+        self._next_refresh = 0.0
+        self._lock = asyncio.Lock()
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        """Add a revoked token, once its revocation is committed."""
+
+        self._revoked[jti] = expires_at
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Load the tokens revoked since the previous refresh, when it is due.
+
+        The first refresh loads every unexpired revoked token, concurrent
+        requests wait for it since the set is empty until then. They do not
+        wait for the later refreshes, they use the current set.
+        """
+
+        # Only touched from the event loop, see PasswordHashingPool
+        if time.monotonic() < self._next_refresh:
+            return
+        if self._lock.locked() and self._last_refresh is not None:
+            return
+
+        async with self._lock:
+            # Refreshed while waiting for the first refresh
+            if time.monotonic() < self._next_refresh:
+                return
+
+            now = utcnow()
+            query = select(RevokedToken.jti, RevokedToken.expires_at).where(
+                RevokedToken.expires_at > now
+            )
+            if self._last_refresh is not None:
+                query = query.where(RevokedToken.revoked_at >= self._last_refresh - REFRESH_OVERLAP)
+
+            result = await db.execute(query)
+            self._revoked.update((jti, expires_at) for jti, expires_at in result)
+            # Expired tokens are rejected anyway
+            self._revoked = {jti: expires_at for jti, expires_at in self._revoked.items()
+                             if expires_at > now}
+
+            self._last_refresh = now
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def clear(self) -> None:
+        """Forget every revocation, the next refresh reloads them."""
+
+        self._revoked.clear()
+        self._last_refresh = None
+        self._next_refresh = 0.0
+        # Not held by anyone, a new lock drops the loop the old one is bound to
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+revocation_list = RevocationList(refresh_interval=settings.token_revocation_refresh_seconds)
+
+async def revoke_token(db: AsyncSession, jti: str, expires_at: datetime) -> None:
+    """Revoke an access token, to call before committing. Once committed, the
+    token is added to `revocation_list`: a failed commit must not reject it.
+
+    The rows of the expired tokens are purged in the same transaction.
+    """
+
+    await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= utcnow()))
+    db.add(RevokedToken(jti=jti, expires_at=expires_at))
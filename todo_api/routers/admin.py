@@ -1,39 +1,117 @@
+import string
+import sys
 from fastapi import APIRouter, status, HTTPException, Query, Path
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
 
 from todo_api.dependencies import db_dependency, admin_dependency
-from todo_api.schema import Message, AdminUserOutput, TodoOutput, AdminUpdateUserRequest
-from todo_api.models import User, Todo
+from todo_api.schema import (Message, AdminUserOutput, AdminUserListOutput, TodoOutput,
+                             AdminUpdateUserRequest, Page, TodoSort, TodoFileFormat, TodoStats)
+from todo_api.models import User, Todo, TODO_SORT_COLUMNS, utcnow
+from todo_api.pagination import paginate, parse_sort, cursor_query, limit_query
+from todo_api.cache import user_cache
+from todo_api.export import export_todos
+from todo_api.stats import get_todo_stats
+from todo_api.responses import FastJSONResponse, output_columns
+from todo_api.config import settings
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+ADMIN_USER_OUTPUT_COLUMNS = output_columns(User, AdminUserOutput)
+TODO_OUTPUT_COLUMNS = output_columns(Todo, TodoOutput)
+
+# Todo activity of the selected user, correlated subqueries evaluated for the
+# rows of the page only, each one an index lookup
+USER_TODO_STATS_COLUMNS = [
+    select(func.count()).where(Todo.owner_id == User.id)
+    .scalar_subquery().label("todo_count"),
+    select(func.count()).where(Todo.owner_id == User.id, Todo.complete.is_(True))
+    .scalar_subquery().label("complete_count"),
+    # The most recently written todo has the highest version (ix_todos_owner_id_version)
+    select(Todo.updated_at).where(Todo.owner_id == User.id)
+    .order_by(Todo.version.desc()).limit(1)
+    .scalar_subquery().label("last_activity"),
+]
+
+# SQLite's lower() only folds ASCII letters, the prefix is folded the same way
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Comparisons of lower(username) in code point order, the order of
+# `prefix_upper_bound`. PostgreSQL compares strings in the order of the
+# database collation, its pattern operators (ix_users_username_lower is a
+# text_pattern_ops index) compare the UTF-8 bytes, in code point order.
+CODE_POINT_OPERATORS = {"postgresql": ("~>=~", "~<~")}
+
+def prefix_upper_bound(prefix: str) -> str | None:
+    """Smallest string greater than every string starting with `prefix`, None
+    when there is none (the prefix is made of the last code point only)."""
+    
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    next_code_point = ord(prefix[-1]) + 1
+    if 0xD800 <= next_code_point <= 0xDFFF:
+        # Surrogates cannot be encoded, skip to the first code point after them
+        next_code_point = 0xE000
+    return prefix[:-1] + chr(next_code_point)
+
 # ================================= Get User ================================= #
-@router.get("/users", status_code=status.HTTP_200_OK, response_model=list[AdminUserOutput])
+@router.get("/users", status_code=status.HTTP_200_OK, response_model=Page[AdminUserListOutput])
 async def read_all_users(db: db_dependency, admin: admin_dependency,
                          role: str | None = Query(default=None),
-                         username: str | None = Query(default=None),
-                         is_active: bool | None = Query(default=None)) -> list[AdminUserOutput]:
-    
-    # Base query filtering
-    query = db.query(User)
+                         username: str | None = Query(
+                             default=None,
+                             description="Prefix of the usernames, case-insensitive as the database lower()."
+                         ),
+                         is_active: bool | None = Query(default=None),
+                         include_stats: bool = Query(
+                             default=False,
+                             description="Include the todo counts and last activity of the users."
+                         ),
+                         cursor: cursor_query = None,
+                         limit: limit_query = settings.default_page_size) -> Page[AdminUserListOutput]:
+    
+    # Base query filtering, the columns of AdminUserOutput only (see
+    # `todo_api.responses`)
+    query = select(*ADMIN_USER_OUTPUT_COLUMNS)
+    
+    # In the same statement, instead of a todos request per user
+    if include_stats:
+        query = query.add_columns(*USER_TODO_STATS_COLUMNS)
     
     # If 'role' is provided, further filter the users
     if role is not None:
-        query = query.filter(User.role == role)
+        query = query.where(User.role == role)
     
     if is_active is not None:
-        query = query.filter(User.is_active == is_active)
-    
-    # If 'username' is provided, further filter the users
-    if username is not None:
-        query = query.filter(User.username.ilike(f"{username}%"))
+        query = query.where(User.is_active == is_active)
+    
+    # If 'username' is provided, further filter the users. The prefix match is
+    # a range on lower(username) so that ix_users_username_lower is used, a
+    # LIKE on an expression cannot use an index. The prefix is folded like the
+    # usernames: lower() on SQLite only folds ASCII letters, on PostgreSQL it
+    # depends on the database locale and the database folds the prefix.
+    if username:
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            prefix = username.translate(ASCII_LOWER)
+        else:
+            prefix = await db.scalar(select(func.lower(username)))
         
-    return query.all()
+        greater_equal, less = CODE_POINT_OPERATORS.get(dialect, (">=", "<"))
+        username_lower = func.lower(User.username)
+        query = query.where(username_lower.op(greater_equal, is_comparison=True)(prefix))
+        upper_bound = prefix_upper_bound(prefix)
+        if upper_bound is not None:
+            query = query.where(username_lower.op(less, is_comparison=True)(upper_bound))
+    
+    return FastJSONResponse(await paginate(db, query, cursor, limit))
 
 @router.get("/users/{user_id}", status_code=status.HTTP_200_OK, response_model=AdminUserOutput)
 async def read_user(db: db_dependency, admin: admin_dependency,
                     user_id: int = Path(gt=0)) -> AdminUserOutput:
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -41,12 +119,19 @@ async def read_user(db: db_dependency, admin: admin_dependency,
     
     return user
 
+# ================================ Todo Stats ================================ #
+@router.get("/stats", status_code=status.HTTP_200_OK, response_model=TodoStats,
+            description="Counts of all the todos by completion status and priority.")
+async def read_todo_stats(db: db_dependency, admin: admin_dependency) -> TodoStats:
+    
+    return await get_todo_stats(db)
+
 # ================================= Get Todo ================================= #
 @router.get("/todos/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoOutput)
 async def read_todo(db: db_dependency, admin: admin_dependency,
                     todo_id: int = Path(gt=0)) -> TodoOutput:
     
-    todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    todo = await db.get(Todo, todo_id)
     
     if todo is None:
         raise HTTPException(
@@ -58,22 +143,51 @@ async def read_todo(db: db_dependency, admin: admin_dependency,
 
 @router.get("/users/{user_id}/todos", status_code=status.HTTP_200_OK, response_model=list[TodoOutput])
 async def read_user_todos(db: db_dependency, admin: admin_dependency,
-                          user_id: int = Path(gt=0)) -> list[TodoOutput]:
+                          user_id: int = Path(gt=0),
+                          sort: TodoSort = Query(default=TodoSort.id)) -> list[TodoOutput]:
+    
+    # Same order as the todos listing: the sort column then the id
+    sort_key, descending = parse_sort(sort.value, TODO_SORT_COLUMNS)
+    keys = [Todo.id] if sort_key is None else [sort_key, Todo.id]
+    order_by = [key.desc() for key in keys] if descending else keys
+    
+    # A single query: the outer join yields one row of nulls for a user
+    # without todos and no row for an unknown user
+    result = await db.execute(
+        select(*TODO_OUTPUT_COLUMNS).select_from(User)
+        .outerjoin(Todo, Todo.owner_id == User.id)
+        .where(User.id == user_id).order_by(*order_by)
+    )
+    rows = result.mappings().all()
+    
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="User not found.")
     
-    user = db.query(User).filter(User.id == user_id).first()
+    return FastJSONResponse([dict(row) for row in rows if row["id"] is not None])
+
+@router.get("/users/{user_id}/todos/export", status_code=status.HTTP_200_OK,
+            response_class=StreamingResponse,
+            description="Stream all the todos of a user as NDJSON or CSV.")
+async def export_user_todos(db: db_dependency, admin: admin_dependency,
+                            user_id: int = Path(gt=0),
+                            format: TodoFileFormat = Query(default=TodoFileFormat.ndjson)):
+    
+    # Checked before streaming, the status cannot change once the body started
+    user = await db.get(User, user_id)
     
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="User not found.")
     
-    return db.query(Todo).filter(Todo.owner_id == user.id).all()
+    return export_todos(db, user.id, format)
 
 # =============================== Update User =============================== #
 @router.put("/users/{user_id}", status_code=status.HTTP_200_OK, response_model=Message)
 async def update_user(update_request: AdminUpdateUserRequest, db: db_dependency,
                       admin: admin_dependency, user_id: int = Path(gt=0)) -> Message:
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -82,8 +196,13 @@ async def update_user(update_request: AdminUpdateUserRequest, db: db_dependency,
     # for loop to update attributes
     for field, value in update_request.model_dump(exclude_unset=True).items():
         setattr(user, field, value)
+    
+    # A deactivated user stays logged out once reactivated
+    if update_request.is_active is False:
+        user.tokens_valid_after = utcnow()
             
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(user_id)
     return Message(message="User updated successfully.")
 
 # =============================== Delete User ================================ #
@@ -91,12 +210,13 @@ async def update_user(update_request: AdminUpdateUserRequest, db: db_dependency,
 async def delete_user(db: db_dependency, admin: admin_dependency,
                       user_id: int = Path(gt=0)):
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="User not found.")
     
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    await user_cache.invalidate(user_id)
     return
\ No newline at end of file
@@ -1,12 +1,18 @@
-from fastapi import APIRouter, status, Depends, HTTPException, Path
+from fastapi import APIRouter, status, Depends
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
 from typing import Annotated
 from datetime import timedelta
 
-from todo_api.dependencies import db_dependency
+from todo_api.dependencies import db_dependency, user_dependency, oauth2_bearer
 from todo_api.models import User
-from todo_api.schema import CreateUserRequest, Message, TokenOutput
-from todo_api.security import hash_password, verify_password, create_access_token, credential_exception
+from todo_api.schema import CreateUserRequest, Message, TokenOutput, RefreshTokenRequest
+from todo_api.security import (hash_password_async, verify_password_async, create_access_token,
+                               decode_access_token, credential_exception)
+from todo_api.revocation import revocation_list, revoke_token
+from todo_api.ratelimit import limit_login, limit_register
+from todo_api.refresh_tokens import (issue_refresh_token, rotate_refresh_token,
+                                     revoke_refresh_family, purge_expired_refresh_tokens)
 from todo_api.config import settings
 
 
@@ -15,7 +21,7 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 # ============================= Create a new user ============================ #
 @router.post("/register", status_code=status.HTTP_201_CREATED,
              description="Register a new user account with username, email and password",
-             response_model=Message)
+             response_model=Message, dependencies=[Depends(limit_register)])
 async def register_user(user_request: CreateUserRequest, db: db_dependency) -> Message:
     """Handles user registration.
     
@@ -26,19 +32,18 @@ async def register_user(user_request: CreateUserRequest, db: db_dependency) -> M
     user_dict = user_request.model_dump()
     
     # Hash the password
-    user_dict["hashed_password"] = hash_password(user_dict.pop("password"))
+    user_dict["hashed_password"] = await hash_password_async(user_dict.pop("password"))
     
     # Create a new user
     new_user = User(**user_dict)
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
     
     return Message(message="User created successfully.")
 
 # ====================== Access and User Authentication ====================== #
-def authenticate_user(username: str, password: str, db: db_dependency) -> User | None:
+async def authenticate_user(username: str, password: str, db: db_dependency) -> User | None:
     """Authenticate a user by username and password.
 
     Args:
@@ -49,35 +54,87 @@ def authenticate_user(username: str, password: str, db: db_dependency) -> User |
     Returns:
         User: The authenticated user object if credentials are valid, else None.
     """
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.scalar(select(User).where(User.username == username))
     if not user:
         return None
     
-    if verify_password(password=password, hashed_password=user.hashed_password):
+    if await verify_password_async(password=password, hashed_password=user.hashed_password):
         return user
     else:
         return None
     
+def token_output(user: User, refresh_token: str, session_id: str) -> TokenOutput:
+    """Token response of a new access token, in the session of `refresh_token`."""
+    
+    expire_delta = timedelta(minutes=settings.access_token_expire_minutes)
+    token = create_access_token(
+        username=user.username,
+        user_id=user.id,
+        role=user.role,
+        expire_delta=expire_delta,
+        session_id=session_id
+    )
+    
+    return TokenOutput(access_token=token, token_type="bearer",
+                       expires_in=int(expire_delta.total_seconds()),
+                       refresh_token=refresh_token)
+    
 @router.post("/token", response_model=TokenOutput, status_code=status.HTTP_200_OK,
              description="Authenticates the user using username and password"
-             " (form data) and returns a JWT access token.")
+             " (form data) and returns a JWT access token and a refresh token.",
+             dependencies=[Depends(limit_login)])
 async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
                 db: db_dependency) -> TokenOutput:
-    """Handles user login by authenticating credentials and issuing a JWT access token.
+    """Handles user login by authenticating credentials and issuing a JWT access
+    token, with the refresh token of a new session.
 
     Raises:
         HTTPException (401 UNAUTHORIZED): If the provided username or password
         is incorrect.
+        HTTPException (429 TOO MANY REQUESTS): If the client IP or the username
+        made too many attempts, checked before any hashing.
     """
-    user = authenticate_user(form_data.username, form_data.password, db)
-    if user is None:
+    user = await authenticate_user(form_data.username, form_data.password, db)
+    # The token of an inactive user would be rejected anyway
+    if user is None or not user.is_active:
         raise credential_exception
-        
-    token = create_access_token(
-        username=user.username,
-        user_id=user.id,
-        role=user.role,
-        expire_delta=timedelta(minutes=settings.access_token_expire_minutes)
-    )
     
-    return TokenOutput(access_token=token, token_type="bearer")
\ No newline at end of file
+    await purge_expired_refresh_tokens(db, user.id)
+    refresh_token, session_id = await issue_refresh_token(db, user.id)
+    output = token_output(user, refresh_token, session_id)
+    await db.commit()
+    
+    return output
+
+# =============================== Token Refresh ============================== #
+@router.post("/refresh", response_model=TokenOutput, status_code=status.HTTP_200_OK,
+             description="Exchange a refresh token for a new access token and a new"
+             " refresh token, without the password. A refresh token is valid once.")
+async def refresh(refresh_request: RefreshTokenRequest, db: db_dependency) -> TokenOutput:
+    """Rotate the refresh token of a session, see `todo_api.refresh_tokens`.
+    
+    Raises:
+        HTTPException (401 UNAUTHORIZED): If the refresh token is invalid,
+        expired, already used or revoked, or the user is inactive.
+    """
+    
+    user, refresh_token, session_id = await rotate_refresh_token(db, refresh_request.refresh_token)
+    output = token_output(user, refresh_token, session_id)
+    await db.commit()
+    
+    return output
+
+# ================================== Logout ================================== #
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT,
+             description="Revoke the access token of the request and the refresh"
+             " tokens of its session.")
+async def logout(token: Annotated[str, Depends(oauth2_bearer)], user: user_dependency,
+                 db: db_dependency):
+    
+    token_data = decode_access_token(token)
+    await revoke_token(db, token_data["jti"], token_data["expires_at"])
+    if token_data["session_id"] is not None:
+        await revoke_refresh_family(db, token_data["session_id"])
+    await db.commit()
+    revocation_list.add(token_data["jti"], token_data["expires_at"])
+    return
@@ -1,53 +1,223 @@
-from fastapi import APIRouter, status, HTTPException, Query, Path
-from sqlalchemy import or_
+from fastapi import APIRouter, status, Query, Path, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, insert, update, delete
 
-from todo_api.dependencies import db_dependency, user_dependency, get_todo_dependency
-from todo_api.schema import Message, TodoRequest, TodoUpdateRequest, TodoOutput
-from todo_api.models import Todo
+from todo_api.dependencies import db_dependency, user_dependency, get_todo_dependency, get_todo_by_id
+from todo_api.schema import (Message, TodoRequest, TodoUpdateRequest, TodoOutput, Page, TodoChanges,
+                             TodoSort, TodoFileFormat, ImportReport, TodoStats)
+from todo_api.schema import (TodoBatchCreateRequest, TodoBatchUpdateRequest,
+                             TodoBatchDeleteRequest, BatchItemResult, BatchResult)
+from todo_api.models import Todo, TODO_SORT_COLUMNS
+from todo_api.pagination import paginate, parse_sort, cursor_query, limit_query
+from todo_api.search import search_todos
+from todo_api.etag import (if_none_match_header, make_etag, etag_matches, set_etag,
+                           not_modified, get_todos_version, bump_todos_version)
+from todo_api.sync import get_todo_changes, record_deleted_todos
+from todo_api.stats import get_todo_stats
+from todo_api.export import export_todos
+from todo_api.importer import import_todos
+from todo_api.responses import FastJSONResponse, output_columns
+from todo_api.config import settings
 
 router = APIRouter(prefix="/todos", tags=["todos"])
 
+TODO_OUTPUT_COLUMNS = output_columns(Todo, TodoOutput)
+
 # =============================== Create Todos =============================== #
 @router.post("", status_code=status.HTTP_201_CREATED, response_model=Message)
 async def create_todo(todo_request: TodoRequest, db: db_dependency,
                       user: user_dependency) -> Message:
     
-    new_todo = Todo(**todo_request.model_dump(), owner_id=user.id)
+    version = await bump_todos_version(db, user.id)
+    new_todo = Todo(**todo_request.model_dump(), owner_id=user.id, version=version)
     db.add(new_todo)
-    db.commit()
+    await db.commit()
     
     return Message(message="Todo created successfully.")
 
+# =============================== Batch Todos ================================ #
+# Declared before the '/{todo_id}' routes, which would otherwise match '/batch'
+@router.post("/batch", status_code=status.HTTP_201_CREATED, response_model=BatchResult)
+async def create_todos_batch(batch_request: TodoBatchCreateRequest, db: db_dependency,
+                             user: user_dependency) -> BatchResult:
+    
+    version = await bump_todos_version(db, user.id)
+    rows = [{**item.model_dump(), "owner_id": user.id, "version": version}
+            for item in batch_request.items]
+    
+    # A single executemany INSERT, ids are returned in the order of the rows
+    result = await db.execute(
+        insert(Todo).returning(Todo.id, sort_by_parameter_order=True), rows
+    )
+    ids = result.scalars().all()
+    await db.commit()
+    
+    return BatchResult(results=[
+        BatchItemResult(index=index, id=todo_id, status_code=status.HTTP_201_CREATED)
+        for index, todo_id in enumerate(ids)
+    ])
+    
+@router.patch("/batch", status_code=status.HTTP_200_OK, response_model=BatchResult)
+async def update_todos_batch(batch_request: TodoBatchUpdateRequest, db: db_dependency,
+                             user: user_dependency) -> BatchResult:
+    
+    # Keep the todos owned by the user, the others are reported as not found
+    result = await db.execute(
+        select(Todo.id).where(Todo.owner_id == user.id,
+                              Todo.id.in_({item.id for item in batch_request.items}))
+    )
+    owned_ids = set(result.scalars().all())
+    
+    results = []
+    rows = []
+    for index, item in enumerate(batch_request.items):
+        if item.id not in owned_ids:
+            results.append(BatchItemResult(
+                index=index, id=item.id, status_code=status.HTTP_404_NOT_FOUND,
+                detail="Todo not found or not owned by the user."
+            ))
+            continue
+        
+        row = item.model_dump(exclude_unset=True)
+        # The id alone has nothing to update
+        if len(row) > 1:
+            rows.append(row)
+        results.append(BatchItemResult(index=index, id=item.id,
+                                       status_code=status.HTTP_200_OK))
+    
+    # Bulk UPDATE by primary key, executemany per set of updated columns
+    if rows:
+        version = await bump_todos_version(db, user.id)
+        await db.execute(update(Todo), [{**row, "version": version} for row in rows])
+    await db.commit()
+    
+    return BatchResult(results=results)
+
+@router.delete("/batch", status_code=status.HTTP_200_OK, response_model=BatchResult)
+async def delete_todos_batch(batch_request: TodoBatchDeleteRequest, db: db_dependency,
+                             user: user_dependency) -> BatchResult:
+    
+    result = await db.execute(
+        delete(Todo).where(Todo.owner_id == user.id, Todo.id.in_(batch_request.ids))
+        .returning(Todo.id)
+    )
+    deleted_ids = set(result.scalars().all())
+    if deleted_ids:
+        version = await bump_todos_version(db, user.id)
+        record_deleted_todos(db, user.id, sorted(deleted_ids), version)
+    await db.commit()
+    
+    return BatchResult(results=[
+        BatchItemResult(index=index, id=todo_id, status_code=status.HTTP_204_NO_CONTENT)
+        if todo_id in deleted_ids else
+        BatchItemResult(index=index, id=todo_id, status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Todo not found or not owned by the user.")
+        for index, todo_id in enumerate(batch_request.ids)
+    ])
+
+# =============================== Import Todos =============================== #
+@router.post("/import", status_code=status.HTTP_201_CREATED, response_model=ImportReport,
+             description="Create todos from an NDJSON or CSV upload, streamed and inserted "
+             "in batches. Invalid records are rejected and reported, the others are created.",
+             openapi_extra={"requestBody": {"required": True, "content": {
+                 "application/x-ndjson": {"schema": {"type": "string"}},
+                 "text/csv": {"schema": {"type": "string"}},
+             }}})
+async def import_all_todos(request: Request, db: db_dependency, user: user_dependency,
+                           format: TodoFileFormat = Query(default=TodoFileFormat.ndjson)
+                           ) -> ImportReport:
+    
+    return await import_todos(db, user.id, request.stream(), format)
+
+# =============================== Todo Changes =============================== #
+# Declared before the '/{todo_id}' routes, see the batch routes
+@router.get("/changes", status_code=status.HTTP_200_OK, response_model=TodoChanges,
+            description="Todos created, updated or deleted since a sync token. "
+            "Without `since`, returns the token of the current state only.")
+async def read_todo_changes(db: db_dependency, user: user_dependency,
+                            since: str | None = Query(default=None)) -> TodoChanges:
+    
+    return await get_todo_changes(db, user.id, since)
+
+# ================================ Todo Stats ================================ #
+# Declared before the '/{todo_id}' routes, see the batch routes
+@router.get("/stats", status_code=status.HTTP_200_OK, response_model=TodoStats,
+            description="Counts of the user's todos by completion status and priority.")
+async def read_todo_stats(db: db_dependency, user: user_dependency, response: Response,
+                          if_none_match: if_none_match_header = None) -> TodoStats:
+    
+    # Checked before counting, see read_all_todos
+    etag = make_etag("stats", user.id, await get_todos_version(db, user.id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    return await get_todo_stats(db, user.id)
+
+# =============================== Export Todos =============================== #
+# Declared before the '/{todo_id}' routes, see the batch routes
+@router.get("/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse,
+            description="Stream all the todos of the user as NDJSON or CSV.")
+async def export_all_todos(db: db_dependency, user: user_dependency,
+                           format: TodoFileFormat = Query(default=TodoFileFormat.ndjson)):
+    
+    return export_todos(db, user.id, format)
+
 # ================================ Get Todos ================================= #
-@router.get("", status_code=status.HTTP_200_OK, response_model=list[TodoOutput])
+@router.get("", status_code=status.HTTP_200_OK, response_model=Page[TodoOutput])
 async def read_all_todos(db: db_dependency, user: user_dependency,
                          complete: bool | None = Query(default=None),
-                         search: str | None = Query(default=None)) -> list[TodoOutput]:
+                         search: str | None = Query(default=None),
+                         sort: TodoSort | None = Query(
+                             default=None,
+                             description="Sort order, by id or by search relevance by default."
+                         ),
+                         cursor: cursor_query = None,
+                         limit: limit_query = settings.default_page_size,
+                         if_none_match: if_none_match_header = None) -> Page[TodoOutput]:
+    
+    # The page only changes with the user's todos, a client holding the current
+    # version gets a 304 without the todos query running
+    etag = make_etag("todos", user.id, await get_todos_version(db, user.id),
+                     complete, search, sort, cursor, limit)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
     
-    # Base query filtering todos by the authenticated user
-    query = db.query(Todo).filter(Todo.owner_id == user.id)
+    # Base query filtering todos by the authenticated user, the columns of
+    # TodoOutput only (see `todo_api.responses`)
+    query = select(*TODO_OUTPUT_COLUMNS).where(Todo.owner_id == user.id)
     
     # If 'complete' is provided, further filter the todos
     if complete is not None:
-        query = query.filter(Todo.complete == complete)
+        query = query.where(Todo.complete == complete)
         
+    # If 'search' is provided, keep the matching todos, most relevant first
+    sort_key, descending = None, False
     if search is not None:
-        pattern = f"%{search}%"
-        query = query.filter(
-            or_(
-                Todo.title.ilike(pattern),
-                Todo.description.ilike(pattern)
-            )
-        )
-    
-    # query execution and return results: a list of TodoOutput
-    return query.all()
+        query, sort_key = search_todos(query, search, db.get_bind().dialect.name)
+        
+    # An explicit sort replaces the relevance order
+    if sort is not None:
+        sort_key, descending = parse_sort(sort.value, TODO_SORT_COLUMNS)
+    
+    # query execution and return results: a page of TodoOutput
+    page = await paginate(db, query, cursor, limit, sort=sort_key, descending=descending)
+    response = FastJSONResponse(page)
+    set_etag(response, etag)
+    return response
 
 @router.get("/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoOutput)
-async def read_todo(db: db_dependency, user: user_dependency,
-                    todo: get_todo_dependency) -> TodoOutput:
+async def read_todo(db: db_dependency, user: user_dependency, response: Response,
+                    todo_id: int = Path(gt=0),
+                    if_none_match: if_none_match_header = None) -> TodoOutput:
+    
+    # Checked before loading the todo, see read_all_todos
+    etag = make_etag("todo", user.id, await get_todos_version(db, user.id), todo_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     
-    return todo
+    return await get_todo_by_id(db, user, todo_id)
 
 # =============================== Update Todos =============================== #
 @router.put("/{todo_id}", status_code=status.HTTP_200_OK, response_model=Message)
@@ -58,7 +228,8 @@ async def update_todo(todo_request: TodoUpdateRequest, db: db_dependency,
     for field, value in todo_request.model_dump(exclude_unset=True).items():
         setattr(todo, field, value)
         
-    db.commit()
+    todo.version = await bump_todos_version(db, user.id)
+    await db.commit()
     return Message(message="Todo updated successfully.")
 
 # =============================== Delete Todos =============================== #
@@ -66,6 +237,8 @@ async def update_todo(todo_request: TodoUpdateRequest, db: db_dependency,
 async def delete_todo(db: db_dependency, user: user_dependency,
                       todo: get_todo_dependency):
     
-    db.delete(todo)
-    db.commit()
+    await db.delete(todo)
+    version = await bump_todos_version(db, user.id)
+    record_deleted_todos(db, user.id, [todo.id], version)
+    await db.commit()
     return
\ No newline at end of file
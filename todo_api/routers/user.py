@@ -1,33 +1,45 @@
-from fastapi import APIRouter, status, HTTPException
+from fastapi import APIRouter, status, HTTPException, Response
 
-from todo_api.dependencies import db_dependency, user_dependency
-from todo_api.models import User
+from todo_api.dependencies import db_dependency, user_dependency, user_row_dependency
+from todo_api.cache import user_cache
+from todo_api.etag import if_none_match_header, make_etag, etag_matches, set_etag, not_modified
 from todo_api.schema import Message, UpdateUserRequest, UpdatePasswordRequest, UserOutput
-from todo_api.security import hash_password, verify_password, credential_exception
+from todo_api.security import hash_password_async, verify_password_async, credential_exception
+from todo_api.models import utcnow
 
 
 router = APIRouter(prefix='/user', tags=["user"])
 
 # ================================= Get User ================================= #
 @router.get("/me", status_code=status.HTTP_200_OK, response_model=UserOutput)
-async def read_user_me(user: user_dependency, db: db_dependency) -> UserOutput:
-    return UserOutput.model_validate(user)
+async def read_user_me(user: user_dependency, db: db_dependency, response: Response,
+                       if_none_match: if_none_match_header = None) -> UserOutput:
+    
+    # The user comes from the cache, the ETag is a digest of the profile
+    profile = UserOutput.model_validate(user)
+    etag = make_etag("user", profile.model_dump_json())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    return profile
 
 # =============================== Update User ================================ #
 @router.put("/me", status_code=status.HTTP_200_OK, response_model=Message)
-async def update_user_me(update_request: UpdateUserRequest, user: user_dependency,
+async def update_user_me(update_request: UpdateUserRequest, user: user_row_dependency,
                          db: db_dependency) -> Message:
     
     # for loop to update attributes
     for field, value in update_request.model_dump(exclude_unset=True).items():
         setattr(user, field, value)
             
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(user.id)
     return Message(message="User updated successfully.")
 
 # ============================ Change Password =============================== #
 @router.put("/me/password", status_code=status.HTTP_200_OK, response_model=Message)
-async def change_password(password_request:UpdatePasswordRequest, user:user_dependency,
+async def change_password(password_request:UpdatePasswordRequest, user:user_row_dependency,
                           db:db_dependency) -> Message:
     
     # Veridy if the old and new password are identical
@@ -38,21 +50,24 @@ async def change_password(password_request:UpdatePasswordRequest, user:user_depe
         )
 
     # Verify the old password
-    if not verify_password(password=password_request.old_password, 
-                           hashed_password=user.hashed_password):
+    if not await verify_password_async(password=password_request.old_password,
+                                       hashed_password=user.hashed_password):
         
         raise credential_exception
     
-    # Update password
-    user.hashed_password = hash_password(password_request.new_password)
+    # Update password, the tokens issued until now are revoked
+    user.hashed_password = await hash_password_async(password_request.new_password)
+    user.tokens_valid_after = utcnow()
     
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(user.id)
     return Message(message="Password updated successfully.")
 
 # =============================== Delete User ================================ #
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user_me(user:user_dependency, db:db_dependency):
+async def delete_user_me(user:user_row_dependency, db:db_dependency):
     
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    await user_cache.invalidate(user.id)
     return
\ No newline at end of file
@@ -1,4 +1,9 @@
-from pydantic import BaseModel, Field, EmailStr
+from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel, Field, EmailStr, field_validator
+from typing import Generic, TypeVar
+
+from todo_api.config import settings
 
 
 # =============================== User Schemas =============================== #
@@ -143,6 +148,38 @@ class AdminUserOutput(UserOutput):
     """Extended schema for admin view of user data, includes 'is_active' status."""
     is_active: bool
 
+class AdminUserListOutput(AdminUserOutput):
+    """Schema for the users of the admin listing, with their todo activity when
+    requested (`include_stats`).
+    
+    Attributes:
+        todo_count (int | None): Number of todos of the user.
+        complete_count (int | None): Number of completed todos of the user.
+        last_activity (datetime | None): Last time a todo of the user was
+        created or updated (UTC), None without todos.
+    """
+    todo_count: int | None = None
+    complete_count: int | None = None
+    last_activity: datetime | None = None
+
+# Internal
+class UserPrincipal(AdminUserOutput):
+    """Snapshot of the authenticated user, cached between requests.
+    
+    Frozen since instances are shared by concurrent requests. 'hashed_password'
+    is excluded: endpoints needing it load the user from the database.
+    
+    Attributes:
+        tokens_valid_after (datetime | None): Access tokens issued before are
+        revoked.
+    """
+    tokens_valid_after: datetime | None = None
+    
+    model_config = {
+        "from_attributes": True,
+        "frozen": True
+    }
+
 # ================================ Todo Schemas ============================== #
 class TodoBase(BaseModel):
     """Base schema for Todo items, shared by request and response models.
@@ -202,6 +239,74 @@ class TodoUpdateRequest(BaseModel):
         }
     }
 
+class TodoBatchCreateRequest(BaseModel):
+    """Schema for creating several Todo items in a single transaction.
+    
+    Attributes:
+        items (list[TodoRequest]): The todo items to create.
+    """
+    items: list[TodoRequest] = Field(min_length=1, max_length=settings.max_batch_size)
+    
+    model_config = {"extra": "forbid"}
+    
+class TodoBatchUpdateItem(TodoUpdateRequest):
+    """Schema for one item of a batch update, a TodoUpdateRequest plus the id.
+    
+    Attributes:
+        id (int): The ID of the todo item to update.
+    """
+    id: int = Field(gt=0)
+    
+    @field_validator("title", "description", "priority", "complete")
+    @classmethod
+    def not_null(cls, value):
+        """Rejects the explicit nulls, the columns of the todos are not nullable."""
+        if value is None:
+            raise ValueError("Field may be omitted but not null")
+        return value
+    
+class TodoBatchUpdateRequest(BaseModel):
+    """Schema for updating several Todo items in a single transaction.
+    
+    Attributes:
+        items (list[TodoBatchUpdateItem]): The updates to apply.
+    """
+    items: list[TodoBatchUpdateItem] = Field(min_length=1,
+                                             max_length=settings.max_batch_size)
+    
+    model_config = {"extra": "forbid"}
+    
+class TodoBatchDeleteRequest(BaseModel):
+    """Schema for deleting several Todo items in a single transaction.
+    
+    Attributes:
+        ids (list[int]): The IDs of the todo items to delete.
+    """
+    ids: list[int] = Field(min_length=1, max_length=settings.max_batch_size)
+    
+    model_config = {"extra": "forbid"}
+
+class TodoSort(str, Enum):
+    """Sort orders of the todo listings, the '-' prefix sorts in descending order.
+    
+    Ties are broken by id, in the same direction.
+    """
+    
+    id = "id"
+    id_desc = "-id"
+    priority = "priority"
+    priority_desc = "-priority"
+    title = "title"
+    title_desc = "-title"
+    created_at = "created_at"
+    created_at_desc = "-created_at"
+
+class TodoFileFormat(str, Enum):
+    """File formats of the todo exports and imports."""
+    
+    ndjson = "ndjson"
+    csv = "csv"
+
 # Output/Response
 class TodoOutput(TodoBase):
     """Schema for Todo items returned to the client.
@@ -231,6 +336,108 @@ class TodoOutput(TodoBase):
         }
     }
 
+class TodoChanges(BaseModel):
+    """Todo changes since a sync token, see `GET /todos/changes`.
+    
+    Attributes:
+        changed (list[TodoOutput]): Todos created or updated since the token.
+        deleted (list[int]): Ids of the todos deleted since the token.
+        sync_token (str): Token to pass as `since` on the next call.
+    """
+    
+    changed: list[TodoOutput]
+    deleted: list[int]
+    sync_token: str
+
+class TodoCounts(BaseModel):
+    """Schema for counts of todos.
+    
+    Attributes:
+        total (int): Number of todos.
+        complete (int): Number of completed todos.
+        pending (int): Number of todos not completed.
+    """
+    total: int
+    complete: int
+    pending: int
+
+class PriorityStats(TodoCounts):
+    """Schema for the counts of todos of one priority level.
+    
+    Attributes:
+        priority (int | None): The priority level, None for the todos without
+        a priority.
+    """
+    priority: int | None
+
+class TodoStats(TodoCounts):
+    """Schema for todo statistics, see `GET /todos/stats`.
+    
+    Attributes:
+        by_priority (list[PriorityStats]): The counts per priority level, in
+        priority order, the todos without a priority last. Levels without any
+        todo are omitted.
+    """
+    by_priority: list[PriorityStats]
+
+class BatchItemResult(BaseModel):
+    """Schema for the outcome of one item of a batch request.
+    
+    Attributes:
+        index (int): Position of the item in the request.
+        id (int | None): The ID of the todo item, None if it could not be created.
+        status_code (int): HTTP status the item would have had as a single request.
+        detail (str | None): Error detail when the item was not applied.
+    """
+    index: int
+    id: int | None
+    status_code: int
+    detail: str | None = None
+
+class BatchResult(BaseModel):
+    """Schema for the response of a batch request.
+    
+    Attributes:
+        results (list[BatchItemResult]): One result per item, in request order.
+    """
+    results: list[BatchItemResult]
+
+class ImportRowError(BaseModel):
+    """Schema for a record rejected by an import.
+    
+    Attributes:
+        line (int): Line of the upload the record starts on.
+        detail (str): Why the record was rejected.
+    """
+    line: int
+    detail: str
+
+class ImportReport(BaseModel):
+    """Schema for the response of an import.
+    
+    Attributes:
+        accepted (int): Number of todos created.
+        rejected (int): Number of records rejected.
+        errors (list[ImportRowError]): The first rejected records, in upload order.
+    """
+    accepted: int
+    rejected: int
+    errors: list[ImportRowError]
+
+# ============================== Pagination Schemas ========================== #
+ItemT = TypeVar("ItemT")
+
+class Page(BaseModel, Generic[ItemT]):
+    """Schema for one page of a cursor paginated list.
+    
+    Attributes:
+        items (list): The items of the page, ordered by id.
+        next_cursor (str | None): Opaque cursor to send as `cursor` to fetch the
+        next page, None on the last page.
+    """
+    items: list[ItemT]
+    next_cursor: str | None
+
 # =============================== Other Schemas ============================== #
 class Message(BaseModel):
     """Schema representing a simple response message.
@@ -247,6 +454,19 @@ class TokenOutput(BaseModel):
     Attributes:
         access_token (str): The JWT access token string.
         token_type (str): The type of the token, typically "bearer".
+        expires_in (int): The lifetime of the access token, in seconds.
+        refresh_token (str): The token exchanged for the next access token at
+        `/auth/refresh`, valid once.
     """
     access_token: str
-    token_type: str
\ No newline at end of file
+    token_type: str
+    expires_in: int
+    refresh_token: str
+    
+class RefreshTokenRequest(BaseModel):
+    """Schema for exchanging a refresh token.
+
+    Attributes:
+        refresh_token (str): The refresh token of the last token response.
+    """
+    refresh_token: str = Field(min_length=1, max_length=128)
\ No newline at end of file
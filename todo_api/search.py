@@ -0,0 +1,118 @@
+"""Full-text search on todo titles and descriptions.
+
+SQLite uses an FTS5 external content table kept in sync with `todos` by
+triggers, PostgreSQL a GIN index on a tsvector expression. Other databases fall
+back to a case-insensitive substring match.
+"""
+import re
+from sqlalchemy import DDL, ColumnElement, Select, event, func, literal_column, or_, select, table
+
+from todo_api.models import Todo
+
+# ================================ Schema ==================================== #
+FTS_TABLE = "todos_fts"
+POSTGRES_SEARCH_INDEX = "ix_todos_search"
+
+SQLITE_FTS_DDL = (
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, description, content='todos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER todos_fts_after_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER todos_fts_after_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER todos_fts_after_update AFTER UPDATE OF title, description
+    ON todos BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+)
+
+# The query must use the exact indexed expression for the index to be used
+POSTGRES_TSVECTOR = ("to_tsvector('simple', coalesce(title, '') || ' ' || "
+                     "coalesce(description, ''))")
+
+POSTGRES_FTS_DDL = (
+    f"CREATE INDEX {POSTGRES_SEARCH_INDEX} ON todos USING gin ({POSTGRES_TSVECTOR})",
+)
+
+# Migrations create these objects explicitly, the listeners cover
+# `Base.metadata.create_all` (used by the tests).
+for statement in SQLITE_FTS_DDL:
+    event.listen(Todo.__table__, "after_create",
+                 DDL(statement).execute_if(dialect="sqlite"))
+
+for statement in POSTGRES_FTS_DDL:
+    event.listen(Todo.__table__, "after_create",
+                 DDL(statement).execute_if(dialect="postgresql"))
+
+event.listen(Todo.__table__, "before_drop",
+             DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"))
+
+def include_name(name: str | None, type_: str, parent_names: dict) -> bool:
+    """Alembic autogenerate filter hiding the search objects unknown to the models."""
+
+    if type_ == "table":
+        return not name.startswith(FTS_TABLE)
+    if type_ == "index":
+        return name != POSTGRES_SEARCH_INDEX
+    return True
+
+# ================================ Queries =================================== #
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def search_todos(query: Select, search: str,
+                 dialect: str) -> tuple[Select, ColumnElement | None]:
+    """Restrict a select of `Todo` to the todos matching `search`.
+
+    Every word of `search` must match the title or the description, as a word
+    prefix ("compl" matches "Completed").
+
+    Args:
+        query (Select): The select of Todo to filter.
+        search (str): The user search terms.
+        dialect (str): Name of the database dialect, e.g. "sqlite".
+
+    Returns:
+        tuple: The filtered query and the relevance expression, best matches
+        sort first in ascending order (None when results are not ranked).
+    """
+
+    tokens = TOKEN_PATTERN.findall(search)
+
+    if tokens and dialect == "sqlite":
+        fts_query = " ".join(f'"{token}"*' for token in tokens)
+        # bm25() is negative, the most relevant rows have the lowest rank
+        matches = select(
+            literal_column("rowid").label("todo_id"),
+            literal_column("rank").label("rank")
+        ).select_from(table(FTS_TABLE)).where(
+            literal_column(FTS_TABLE).op("MATCH")(fts_query)
+        ).subquery("matches")
+
+        query = query.join(matches, matches.c.todo_id == Todo.id)
+        return query, matches.c.rank
+
+    if tokens and dialect == "postgresql":
+        vector = literal_column(POSTGRES_TSVECTOR)
+        ts_query = func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+
+        query = query.where(vector.op("@@")(ts_query))
+        return query, -func.ts_rank(vector, ts_query)
+
+    # Substring match, cannot use any index
+    pattern = f"%{search}%"
+    query = query.where(
+        or_(
+            Todo.title.ilike(pattern),
+            Todo.description.ilike(pattern)
+        )
+    )
+    return query, None
@@ -1,9 +1,15 @@
+import asyncio
+import time
+import uuid
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import HTTPException, status
 from todo_api.config import settings
+from todo_api.metrics import record_argon2
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
+from typing import Any, Callable
 
 # =========================== Credential exception =========================== #
 credential_exception = HTTPException(
@@ -34,9 +40,75 @@ def verify_password(password: str, hashed_password: str) -> bool:
         return True
     except VerifyMismatchError:
         return False
+
+# ============================ Argon2 Worker Pool ============================ #
+hashing_unavailable_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Authentication service is busy, please retry shortly.",
+    headers={"Retry-After": "1"}
+)
+
+class PasswordHashingPool:
+    """Bounded thread pool running Argon2 operations off the event loop.
+    
+    argon2-cffi releases the GIL while hashing, so a small dedicated thread pool
+    gives real parallelism without blocking the event loop. The number of
+    operations running or waiting for a worker is capped: once
+    `max_workers + max_pending` operations are in flight, new calls are rejected
+    immediately with a 503 instead of queuing behind a login storm.
+    
+    Args:
+        max_workers (int): Number of threads running Argon2 concurrently.
+        max_pending (int): Number of operations allowed to wait for a worker.
+    """
+    
+    def __init__(self, max_workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="argon2")
+        self.capacity = max_workers + max_pending
+        self.in_flight = 0
+        
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run `func(*args)` on the pool and await its result.
+        
+        Raises:
+            HTTPException (503 SERVICE UNAVAILABLE): If the pool is saturated.
+        """
+        
+        # The counter is only touched from the event loop, no lock is needed
+        if self.in_flight >= self.capacity:
+            raise hashing_unavailable_exception
+        
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            record_argon2(func.__name__, time.perf_counter() - start)
+            
+    def shutdown(self) -> None:
+        """Stop the worker threads once pending operations are done."""
+        self._executor.shutdown(wait=True)
+
+# Shared by every caller so the whole process is bounded by a single pool
+hashing_pool = PasswordHashingPool(
+    max_workers=settings.argon2_pool_workers,
+    max_pending=settings.argon2_pool_max_pending
+)
+
+async def hash_password_async(password: str) -> str:
+    """Hashes a plaintext password on the shared Argon2 worker pool."""
+    return await hashing_pool.run(hash_password, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """Verifies a plaintext password on the shared Argon2 worker pool."""
+    return await hashing_pool.run(verify_password, password, hashed_password)
     
 # ==================================== JWT =================================== #
-def create_access_token(username: str, user_id:int, role:str, expire_delta: timedelta) -> str:
+def create_access_token(username: str, user_id:int, role:str, expire_delta: timedelta,
+                        session_id: str | None = None) -> str:
     """Create a JWT access token.
 
     Args:
@@ -44,28 +116,54 @@ def create_access_token(username: str, user_id:int, role:str, expire_delta: time
         user_id (int): The ID of the user.
         role (str): The role of the user.
         expires_delta (timedelta): The token expiration time.
+        session_id (str | None): The refresh token family of the session, see
+        `todo_api.refresh_tokens`.
 
     Returns:
         str: The encoded JWT token.
     """
     
     to_encode = {'sub':username, 'id':user_id, 'role':role}
-    expire = datetime.now(timezone.utc) + expire_delta
-    to_encode.update({'exp':expire})
+    now = datetime.now(timezone.utc)
+    # 'jti' identifies the token for revocation, 'iat' keeps the microseconds
+    # to compare with `users.tokens_valid_after`
+    to_encode.update({'exp':now + expire_delta, 'iat':now.timestamp(), 'jti':uuid.uuid4().hex})
+    if session_id is not None:
+        to_encode['sid'] = session_id
     return jwt.encode(to_encode, settings.secret_key, settings.algorithm)
 
+def _utc_datetime(timestamp: float) -> datetime:
+    # Naive UTC, like the DateTime columns
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
 def decode_access_token(token: str) -> dict:
+    """Decode and verify a JWT access token.
+
+    Returns:
+        dict: The `username`, `id` and `role` of the user, and the `jti`,
+        `issued_at` and `expires_at` (naive UTC) and `session_id` (None
+        without a session) of the token.
+
+    Raises:
+        HTTPException (401 UNAUTHORIZED): If the token is invalid, expired or
+        misses a claim.
+    """
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         
         username: str = payload.get('sub')
         user_id: int = payload.get('id')
         role: str = payload.get('role')
+        jti: str = payload.get('jti')
+        issued_at: float = payload.get('iat')
+        expires_at: float = payload.get('exp')
         
-        if (username is None) or (user_id is None) or (role is None):
+        if None in (username, user_id, role, jti, issued_at, expires_at):
             raise credential_exception
         
-        return {"username": username, "id": user_id, "role": role}
+        return {"username": username, "id": user_id, "role": role, "jti": jti,
+                "issued_at": _utc_datetime(issued_at), "expires_at": _utc_datetime(expires_at),
+                "session_id": payload.get('sid')}
     
     except JWTError:
         raise credential_exception
\ No newline at end of file
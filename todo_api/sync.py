@@ -0,0 +1,91 @@
+"""Incremental synchronization of the todos of a user.
+
+Every write to the todos of a user bumps `users.todos_version` and stamps the
+written todos with the new version, deleted todos leave a `TodoTombstone` with
+theirs. A sync token holds the version a client is up to date with, the changes
+since are the todos and tombstones with a greater version.
+"""
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from todo_api.etag import get_todos_version
+from todo_api.models import Todo, TodoTombstone
+from todo_api.pagination import decode_token, encode_cursor, is_int64
+
+# ========================= Invalid token exception ========================== #
+invalid_sync_token_exception = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid sync token."
+)
+
+# ================================== Token =================================== #
+def encode_sync_token(version: int) -> str:
+    return encode_cursor({"version": version})
+
+def decode_sync_token(token: str) -> int:
+    """Version of a token produced by `encode_sync_token`.
+
+    Raises:
+        HTTPException (400 BAD REQUEST): If the token is malformed.
+    """
+
+    try:
+        values = decode_token(token)
+    except ValueError:
+        raise invalid_sync_token_exception
+
+    if (not isinstance(values, dict) or not is_int64(values.get("version"))
+            or values["version"] < 0):
+        raise invalid_sync_token_exception
+
+    return values["version"]
+
+# ================================= Changes ================================== #
+async def get_todo_changes(db: AsyncSession, user_id: int,
+                           since: str | None) -> dict:
+    """Todos of a user created, updated or deleted since a sync token.
+
+    Without token, no change is returned: the token of the current state is
+    the starting point of a client that has just loaded the todos.
+
+    Returns:
+        dict: The changed todos under `changed`, the ids of the deleted todos
+        under `deleted` and the token to pass on the next call under
+        `sync_token`.
+    """
+
+    # Read first: a write committed meanwhile is sent again next time rather
+    # than missed
+    version = await get_todos_version(db, user_id)
+    changes = {"changed": [], "deleted": [], "sync_token": encode_sync_token(version)}
+
+    if since is None:
+        return changes
+
+    since_version = decode_sync_token(since)
+
+    changed = await db.scalars(
+        select(Todo).where(Todo.owner_id == user_id, Todo.version > since_version)
+        .order_by(Todo.id)
+    )
+    changes["changed"] = changed.all()
+
+    deleted = await db.scalars(
+        select(TodoTombstone.todo_id)
+        .where(TodoTombstone.owner_id == user_id, TodoTombstone.version > since_version)
+        .order_by(TodoTombstone.version)
+    )
+    # An id reused by a todo created afterwards is reported as changed only
+    changed_ids = {todo.id for todo in changes["changed"]}
+    changes["deleted"] = [todo_id for todo_id in dict.fromkeys(deleted.all())
+                          if todo_id not in changed_ids]
+
+    return changes
+
+def record_deleted_todos(db: AsyncSession, user_id: int, todo_ids: list[int],
+                         version: int) -> None:
+    """Leave a tombstone for each deleted todo, to call in the deleting transaction."""
+
+    db.add_all(TodoTombstone(todo_id=todo_id, owner_id=user_id, version=version)
+               for todo_id in todo_ids)
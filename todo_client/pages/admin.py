@@ -16,6 +16,7 @@ def delete_user_by_id_dialog(user_id: int):
                 return
             st.success("User deleted successfully.")
             st.session_state.pop("fetched_user", None)
+            st.session_state.pop("users_list", None)
             st.rerun()
     with col2:
         if st.button("Cancel", use_container_width=True):
@@ -50,6 +51,34 @@ def admin_page_content():
     
     filters = st.session_state.get('users_filters')
     
+    # The statistics and the first users page are independent, fetch them
+    # concurrently when both are needed
+    first_users_page = None
+    if "users_list" in st.session_state:
+        stats = client.read_todo_stats_admin()
+    else:
+        stats, first_users_page = client.gather(
+            client.read_todo_stats_admin,
+            lambda: client.read_all_users(**filters, include_stats=True)
+        )
+    
+    if not verify_error(stats):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Todos", stats["total"])
+        col2.metric("Completed", stats["complete"])
+        col3.metric("Pending", stats["pending"])
+    
+    # Counters of the HTTP transport shared by every session of this client
+    with st.expander("API client"):
+        transport = client.transport.snapshot()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Requests", transport["requests"])
+        col2.metric("Retries", transport["retries"])
+        col3.metric("Failures", transport["failures"])
+        col4.metric("Circuit", transport["circuit_state"],
+                    help=f"Opened {transport['circuit_opened']} times, "
+                         f"{transport['short_circuited']} requests not sent")
+    
     tab1, tab2, tab3 = st.tabs(["All Users", "User", "Todo"])
     
     with tab1:
@@ -95,13 +124,16 @@ def admin_page_content():
             
         if "users_list" not in st.session_state:
             with st.spinner("Loading Users..."):
-                result_user_list = client.read_all_users(**filters)
-                if verify_error(result_user_list):
+                result_page = first_users_page or client.read_all_users(**filters,
+                                                                        include_stats=True)
+                if verify_error(result_page):
                     return
                 
-                st.session_state["users_list"] = result_user_list
+                st.session_state["users_list"] = result_page["items"]
+                st.session_state["users_next_cursor"] = result_page["next_cursor"]
         
         result_user_list = st.session_state["users_list"]
+        users_next_cursor = st.session_state.get("users_next_cursor")
         
         # --- Display ---
         st.divider()
@@ -113,8 +145,23 @@ def admin_page_content():
         for user in result_user_list:
             user_text = f"**{user.get('username')}** - Role: **{user.get('role')}**"
             user_text += f"- Active: **{user.get('is_active')}** - ID: `{user.get('id')}`"
+            user_text += f" - Todos: **{user.get('todo_count')}** ({user.get('complete_count')} completed)"
+            if user.get('last_activity'):
+                user_text += f" - Last activity: {user['last_activity'][:16].replace('T', ' ')}"
             
             st.write(user_text)
+        
+        # --- Next page ---
+        if users_next_cursor and st.button("Load more users", use_container_width=True):
+            with st.spinner("Loading Users..."):
+                result_page = client.read_all_users(**filters, include_stats=True,
+                                                    cursor=users_next_cursor)
+                if verify_error(result_page):
+                    return
+                
+                st.session_state["users_list"] = result_user_list + result_page["items"]
+                st.session_state["users_next_cursor"] = result_page["next_cursor"]
+                st.rerun()
             
     with tab2:
         col1, col2 = st.columns(2, vertical_alignment="bottom")
@@ -184,7 +231,13 @@ def admin_page_content():
                             if verify_error(result_message):
                                 return
                             st.success("User updated successfully.")
-                            st.session_state.pop("fetched_user", None)
+                            # The client cache was invalidated by the update
+                            result_user = client.read_user_by_id(user_id_input)
+                            if verify_error(result_user):
+                                st.session_state.pop("fetched_user", None)
+                            else:
+                                st.session_state["fetched_user"] = result_user
+                            st.session_state.pop("users_list", None)
                             st.rerun()
                             
             if st.button("Delete User"):
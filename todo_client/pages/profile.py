@@ -48,7 +48,7 @@ def profile_page_content() -> None:
         return
     
     # Informations
-    st.header(f"Welcome {user_data.get("username")}")
+    st.header(f"Welcome {user_data.get('username')}")
     st.markdown("----")
     
     st.subheader("Your Information")
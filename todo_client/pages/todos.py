@@ -1,12 +1,33 @@
+import pandas as pd
 import streamlit as st
 import time
 
+from todo_client.utils.paging import view_page
+
 
 client = st.session_state["api_client"]
 
+# Sort parameter of the API -> label, None keeps the API order (id or relevance)
+SORT_OPTIONS = {
+    None: "--",
+    "-priority": "Priority (highest first)",
+    "priority": "Priority (lowest first)",
+    "-created_at": "Newest first",
+    "created_at": "Oldest first",
+    "title": "Title (A-Z)",
+    "-title": "Title (Z-A)",
+}
+# Fields of the todos the loaded list can be re-sorted on after a sync
+LOCAL_SORT_FIELDS = {"id", "priority", "title"}
+# Todos rendered per run, whatever the number of todos loaded
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+VIEW_MODES = ["Cards", "Table"]
+# Columns of the table view, the id is not editable
+TABLE_COLUMNS = ["id", "title", "description", "priority", "complete"]
+
 def verify_error(result: list[dict] | dict) -> bool:
     """Check API result and display any error message."""
-    if not isinstance(result, dict):
+    if not isinstance(result, dict) or "error" not in result:
         return False
     
     status_code = result.get("status_code")
@@ -36,7 +57,7 @@ def add_todo_dialog():
         else:
             st.success(result["message"])
             time.sleep(0.5)
-            st.session_state.pop("todos_data", None)
+            sync_todos()
             st.rerun()
 
 @st.dialog("Edit Todo")
@@ -72,9 +93,75 @@ def edit_todo_dialog(todo):
         else:
             st.success(result["message"])
             time.sleep(0.5)
-            st.session_state.pop("todos_data", None)
+            sync_todos()
             st.rerun()
 
+def load_todos_page(filters: dict, cursor: str | None = None,
+                    limit: int | None = None) -> bool:
+    """Fetch a page of todos and append it to the todos already loaded.
+    
+    The first page (no cursor) replaces the loaded todos, the sync token is
+    taken before it so that no later change is missed by `sync_todos`. The
+    pages are never served from the response cache: a cached page may be older
+    than the token, and the changes in between would never be synced.
+    """
+    if cursor is None:
+        changes = client.read_todo_changes()
+        if verify_error(changes):
+            return False
+        st.session_state["todos_sync_token"] = changes["sync_token"]
+    
+    result = client.read_all_todos(**filters, cursor=cursor, limit=limit, cache_ttl=0)
+    if verify_error(result):
+        return False
+    
+    loaded = st.session_state.get("todos_data", []) if cursor else []
+    st.session_state["todos_data"] = loaded + result["items"]
+    st.session_state["todos_next_cursor"] = result["next_cursor"]
+    return True
+
+def sync_todos() -> None:
+    """Merge the todo changes since the last sync into the loaded todos.
+    
+    Search results are ranked by the API and partially loaded lists not in
+    id order cannot place the changed todos, they are reloaded instead.
+    """
+    token = st.session_state.get("todos_sync_token")
+    filters = st.session_state.get("todos_filters", {})
+    sort = filters.get("sort") or "id"
+    fully_loaded = st.session_state.get("todos_next_cursor") is None
+    
+    if (token is None or "todos_data" not in st.session_state or filters.get("search")
+            or sort.removeprefix("-") not in LOCAL_SORT_FIELDS
+            or (sort != "id" and not fully_loaded)):
+        st.session_state.pop("todos_data", None)
+        return
+    
+    result = client.read_todo_changes(since=token)
+    if verify_error(result):
+        st.session_state.pop("todos_data", None)
+        return
+    
+    deleted = set(result["deleted"])
+    changed = {todo["id"]: todo for todo in result["changed"]}
+    todos = [changed.pop(todo["id"], todo) for todo in st.session_state["todos_data"]
+             if todo["id"] not in deleted]
+    
+    # The list is in id order: the other changed todos belong to the loaded
+    # range when all the pages are loaded, or when their id is below the last one
+    last_id = todos[-1]["id"] if todos else 0
+    todos.extend(todo for todo in changed.values() if fully_loaded or todo["id"] < last_id)
+    
+    # Same order as the API: the sort field then the id, in the same direction
+    complete = filters.get("complete")
+    field = sort.removeprefix("-")
+    st.session_state["todos_data"] = sorted(
+        (todo for todo in todos if complete is None or todo["complete"] == complete),
+        key=lambda todo: (todo[field], todo["id"]),
+        reverse=sort.startswith("-")
+    )
+    st.session_state["todos_sync_token"] = result["sync_token"]
+
 def delete_todo(todo):
     result = client.delete_todo(todo_id=todo.get('id'))
     if "error" in result:
@@ -82,20 +169,32 @@ def delete_todo(todo):
     else:
         st.success("Todo deleted successfully.")
         time.sleep(0.5)
-        st.session_state.pop("todos_data", None)
+        sync_todos()
         st.rerun()
 
+def show_todo_stats(stats: dict) -> None:
+    """Display the todo counts computed by the API."""
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total", stats["total"])
+    col2.metric("Completed", stats["complete"])
+    col3.metric("Pending", stats["pending"])
+
 def todos_page_content():
     st.title("🗒️ Todos")
 
+    # --- Stats (from the response cache, invalidated by the todo writes) ---
+    stats = client.read_todo_stats()
+    if not verify_error(stats):
+        show_todo_stats(stats)
+
     # --- Persist filters between runs ---
     if "todos_filters" not in st.session_state:
-        st.session_state.todos_filters = {"complete": None, "search": None}
+        st.session_state.todos_filters = {"complete": None, "search": None, "sort": None}
 
     filters = st.session_state.todos_filters
 
     # --- UI Filters ---
-    col1, col2, col3, col4 = st.columns([1, 2, 1, 1], vertical_alignment="bottom")
+    col1, col2, col3, col4, col5 = st.columns([1, 2, 1, 1, 1], vertical_alignment="bottom")
 
     with col1:
         complete_opt = st.selectbox(
@@ -110,40 +209,55 @@ def todos_page_content():
                                    help="Search todos by title or description")
 
     with col3:
+        sort_opt = st.selectbox(
+            "Sort",
+            options=list(SORT_OPTIONS),
+            format_func=SORT_OPTIONS.get,
+            index=list(SORT_OPTIONS).index(filters.get("sort")),
+        )
+
+    with col4:
         if st.button("Filter", use_container_width=True):
             complete = None if complete_opt == "--" else complete_opt
             search = search_opt.strip() or None if search_opt else None
 
-            if complete is None and search is None:
+            if complete is None and search is None and sort_opt is None:
                 st.warning("No filter options selected.")
             else:
-                st.session_state.todos_filters = {"complete": complete, "search": search}
+                st.session_state.todos_filters = {"complete": complete, "search": search,
+                                                  "sort": sort_opt}
                 st.session_state.pop("todos_data", None)
+                st.session_state["todos_view_page"] = 0
                 st.rerun()
 
-    with col4:
+    with col5:
         if st.button("Reset", use_container_width=True):
-            st.session_state.todos_filters = {"complete": None, "search": None}
+            st.session_state.todos_filters = {"complete": None, "search": None, "sort": None}
             st.session_state.pop("todos_data", None)
+            st.session_state["todos_view_page"] = 0
             st.rerun()
 
     # --- Fetch data ---
     st.divider()
 
+    page_size = st.session_state.setdefault("todos_page_size", PAGE_SIZE_OPTIONS[0])
     if "todos_data" not in st.session_state:
         with st.spinner("Loading todos..."):
-            result = client.read_all_todos(**filters)
-            if verify_error(result):
+            if not load_todos_page(filters, limit=page_size):
                 return
-            
-            st.session_state["todos_data"] = result
 
     result = st.session_state["todos_data"]
+    next_cursor = st.session_state.get("todos_next_cursor")
     
-    sub_col1, sub_col2 = st.columns([5, 1], vertical_alignment="bottom")
+    sub_col1, sub_col2, sub_col3, sub_col4 = st.columns([3, 1, 1, 1], vertical_alignment="bottom")
     with sub_col1:
-        st.subheader(f"Todos : {len(result)}")
+        st.subheader(f"Todos : {len(result)}{'+' if next_cursor else ''}")
     with sub_col2:
+        view_mode = st.selectbox("View", options=VIEW_MODES, key="todos_view_mode")
+    with sub_col3:
+        st.selectbox("Per page", options=PAGE_SIZE_OPTIONS, key="todos_page_size",
+                     on_change=lambda: st.session_state.update(todos_view_page=0))
+    with sub_col4:
         if st.button("Add", use_container_width=True):
             add_todo_dialog()
 
@@ -159,8 +273,39 @@ def todos_page_content():
     elif (not result) and (filters["search"] is not None):
         st.info("No todos match the search pattern.")
 
+    # --- Current page, the only todos rendered ---
+    page_todos, page, page_count = view_page(result, st.session_state.get("todos_view_page", 0),
+                                             page_size)
+    st.session_state["todos_view_page"] = page
+
     # --- Display ---
-    for i, todo in enumerate(result):
+    if view_mode == "Table":
+        show_todos_table(page_todos, page)
+    else:
+        show_todos_cards(page_todos)
+
+    # --- Page navigation, further pages are loaded from the API on demand ---
+    if result:
+        nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1], vertical_alignment="center")
+        with nav_col1:
+            if st.button("Previous", use_container_width=True, disabled=page == 0):
+                st.session_state["todos_view_page"] = page - 1
+                st.rerun()
+        with nav_col2:
+            st.markdown(f"Page {page + 1} of {page_count}{'+' if next_cursor else ''}")
+        with nav_col3:
+            last_page = page + 1 >= page_count and not next_cursor
+            if st.button("Next", use_container_width=True, disabled=last_page):
+                if page + 1 >= page_count:
+                    with st.spinner("Loading todos..."):
+                        if not load_todos_page(filters, cursor=next_cursor, limit=page_size):
+                            return
+                st.session_state["todos_view_page"] = page + 1
+                st.rerun()
+
+def show_todos_cards(todos: list[dict]) -> None:
+    """Display one expander per todo, with its edit and delete buttons."""
+    for todo in todos:
         
         extender_text = f"**{todo.get('title')}** - Priority: **{todo.get('priority')}**"
         extender_text += f" (ID: {todo.get('id')})"
@@ -171,9 +316,65 @@ def todos_page_content():
             
             extender_col1, extender_col2 = st.columns(2, width=250)
             with extender_col1:
-                if st.button("Edit", key=f"edit_{i}", width=100):
+                if st.button("Edit", key=f"edit_{todo['id']}", width=100):
                     edit_todo_dialog(todo)
                 
             with extender_col2:
-                if st.button("Delete", key=f"delete_{i}", width=100):
-                    delete_todo(todo)
\ No newline at end of file
+                if st.button("Delete", key=f"delete_{todo['id']}", width=100):
+                    delete_todo(todo)
+
+def show_todos_table(todos: list[dict], page: int) -> None:
+    """Display the todos in an editable table, saving the edited rows."""
+    if not todos:
+        return
+    
+    original = pd.DataFrame(todos, columns=TABLE_COLUMNS)
+    edited = st.data_editor(
+        original,
+        key=f"todos_table_{page}",
+        hide_index=True,
+        use_container_width=True,
+        disabled=["id"],
+        column_config={
+            "id": st.column_config.NumberColumn("ID"),
+            "title": st.column_config.TextColumn("Title", max_chars=100, required=True),
+            "description": st.column_config.TextColumn("Description", max_chars=250),
+            "priority": st.column_config.NumberColumn("Priority", min_value=1, max_value=5,
+                                                      step=1, required=True),
+            "complete": st.column_config.CheckboxColumn("Completed"),
+        },
+    )
+    
+    # Plain Python values of the changed cells, by todo id
+    updates = {}
+    for before, after in zip(original.to_dict("records"), edited.to_dict("records")):
+        changed = {field: after[field] for field in TABLE_COLUMNS[1:]
+                   if after[field] != before[field]}
+        if changed:
+            updates[int(before["id"])] = {
+                field: int(value) if field == "priority" else
+                       bool(value) if field == "complete" else value
+                for field, value in changed.items()
+            }
+    
+    if st.button(f"Save changes ({len(updates)})", disabled=not updates):
+        result = client.update_todos_batch(
+            [{"id": todo_id, **data} for todo_id, data in updates.items()]
+        )
+        if "error" in result:
+            st.error(f"Update of the todos failed: {result['error']}")
+            return
+        
+        failed = [item for item in result["results"] if item["status_code"] >= 400]
+        for item in failed:
+            st.error(f"Update of todo {item['id']} failed: {item['detail']}")
+        if failed:
+            # Keep the table edits so that the failed rows can be fixed
+            return
+        
+        st.success("Todos updated successfully.")
+        time.sleep(0.5)
+        # Edits are shown from the synced todos, not the table state
+        st.session_state.pop(f"todos_table_{page}", None)
+        sync_todos()
+        st.rerun()
@@ -1,21 +1,43 @@
+import copy
 import httpx
 import os
 import streamlit as st
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Callable
 from jose import jwt, JWTError
 
-from todo_client.utils.config import API_BASE_URL
+from todo_client.utils.cache import ResponseCache, create_response_cache
+from todo_client.utils.transport import Transport, create_transport
 
 
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+# The access token is refreshed when it expires within this delay
+TOKEN_REFRESH_MARGIN = timedelta(seconds=60)
+# Number of GET responses kept for revalidation with their ETag
+ETAG_CACHE_SIZE = 100
+
+@st.cache_resource
+def get_transport() -> Transport:
+    """The transport of the process, created on first use."""
+    
+    return create_transport()
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    """The response cache of the process, created on first use."""
+    
+    return create_response_cache()
 
 class APIClient:
     """An API client to interact with the backend server."""
     
     def __init__(self):
-        self.client = httpx.Client(base_url=API_BASE_URL,
-                                   timeout=10.0)
+        # Shared by every session, see `todo_client.utils.transport`
+        self.transport = get_transport()
+        # Shared by every session, see `todo_client.utils.cache`
+        self.response_cache = get_response_cache()
+        # Requests collected by `gather`
+        self._queued: list[dict] | None = None
         
     # ---------------------------- Helper Methods ---------------------------- #
     def _get_auth_headers(self) -> dict[str, str]:
@@ -23,27 +45,64 @@ class APIClient:
         
         token = st.session_state.get("auth_token")
         if token:
-            # Vrify token expiration
-            if self._is_token_expired():
+            # Refresh the token shortly before its expiry, without the password
+            if self._is_token_expired(margin=TOKEN_REFRESH_MARGIN) and not self._refresh_token():
                 self.logout()
                 st.error("Expired session. Please log in again.")
                 st.rerun()  # Rerun to reflect logout
             
-            return {"Authorization": f"Bearer {token}"}
+            return {"Authorization": f"Bearer {st.session_state['auth_token']}"}
         
         return {}
     
-    def _is_token_expired(self) -> bool:
-        """Verify if the current token is expired."""
+    def _is_token_expired(self, margin: timedelta = timedelta(0)) -> bool:
+        """Verify if the current token is expired, or expires within `margin`."""
         
         login_time_str = st.session_state.get("login_time")
         if not login_time_str:
             return True  # No login time means no valid session
         
         login_time = datetime.fromisoformat(login_time_str)
-        expiration_time = login_time + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expires_in = st.session_state.get("token_expires_in",
+                                          ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        expiration_time = login_time + timedelta(seconds=expires_in)
         
-        return datetime.now(timezone.utc) > expiration_time
+        return datetime.now(timezone.utc) + margin > expiration_time
+    
+    def _store_tokens(self, result: dict) -> None:
+        """Store the tokens of a token response and their issue time."""
+        
+        st.session_state["auth_token"] = result["access_token"]
+        st.session_state["refresh_token"] = result.get("refresh_token")
+        st.session_state["token_expires_in"] = result.get("expires_in",
+                                                          ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        st.session_state["login_time"] = datetime.now(timezone.utc).isoformat()
+    
+    def _refresh_token(self) -> bool:
+        """Exchange the refresh token of the session for new tokens.
+        
+        Returns False when the session cannot be refreshed (no refresh token,
+        refresh token expired or revoked, API unreachable).
+        """
+        
+        refresh_token = st.session_state.get("refresh_token")
+        if not refresh_token:
+            return False
+        
+        try:
+            response = self.transport.run(self.transport.send(
+                "POST", "/auth/refresh", json={"refresh_token": refresh_token}
+            ))
+        except httpx.RequestError:
+            return False
+        
+        if response.status_code != 200:
+            # The refresh token is valid once, never send it again
+            st.session_state["refresh_token"] = None
+            return False
+        
+        self._store_tokens(response.json())
+        return True
     
     def _decode_access_token_role(self, token: str) -> str:
         
@@ -57,42 +116,197 @@ class APIClient:
         except Exception as e:
             raise f"error unexpected: {str(e)}"
     
-    def _request(self, method: str, url: str, secure: bool, **kwarrgs) -> dict:
-        """Generic method to make API requests."""
+    def _etag_cache(self) -> dict[str, tuple[str, Any]]:
+        """GET responses of the session carrying an ETag, by URL and params."""
+        
+        if "etag_cache" not in st.session_state:
+            st.session_state["etag_cache"] = {}
+        return st.session_state["etag_cache"]
+    
+    def _prepare_request(self, method: str, url: str, secure: bool, kwargs: dict,
+                         cache_ttl: float | None) -> dict[str, Any]:
+        """Add the headers of a request to its `kwargs`.
+        
+        Returns:
+            dict: The request context: `method`, `url`, `kwargs`, the ETag cache
+            key of a GET and its cached response (`etag_key`, `etag_cached`),
+            the response cache key (`cache_key`, None when not cached) and
+            `cache_ttl`, and the cached `result` of a fresh response.
+        """
+        
+        context = {"method": method, "url": url, "kwargs": kwargs, "etag_key": None,
+                   "etag_cached": None, "cache_key": None, "cache_ttl": cache_ttl,
+                   "result": None}
+        
+        if method == "GET" and cache_ttl != 0:
+            context["cache_key"] = ResponseCache.key(st.session_state.get("username"),
+                                                     method, url, kwargs.get("params"))
+            cached_result = self.response_cache.get(context["cache_key"])
+            if cached_result is not None:
+                context["result"] = copy.deepcopy(cached_result)
+                return context
         
         # Prepare headers
-        headers = kwarrgs.pop("headers", {})
+        headers = kwargs.pop("headers", {})
         if secure:
             headers.update(self._get_auth_headers())
-
-        try:
-            # Make the request
-            response = self.client.request(method, url, headers=headers, **kwarrgs)
-            response.raise_for_status()
-
-            # Successful response
-            if response.status_code >= 200 and response.status_code < 300:
-                return response.json() if response.content else {"message": "Success"}
+            
+        if method == "GET":
+            context["etag_key"] = f"{url}?{sorted((kwargs.get('params') or {}).items())}"
+            context["etag_cached"] = self._etag_cache().get(context["etag_key"])
+            if context["etag_cached"] is not None:
+                headers["If-None-Match"] = context["etag_cached"][0]
+        
+        kwargs["headers"] = headers
+        return context
+    
+    def _handle_response(self, response: httpx.Response | Exception,
+                         context: dict[str, Any]) -> dict:
+        """Turn the response of a request, or the exception it raised, into the
+        result of the API call."""
         
-        except httpx.HTTPStatusError as e:
-            # Handle HTTP errors
-            if e.response.status_code == 401:
-                self.logout()
-                st.error("Unauthorized access. Please log in again.")
-                st.rerun()  # Rerun to reflect logout
-                return  {"error": "Unauthorized session cleared", "status_code": 401}
+        # Handle Request exceptions
+        if isinstance(response, httpx.RequestError):
+            st.error(f"Network error or API unreachable: {response}")
+            return {"error": "API unreachable", "status_code": 503}
+        if isinstance(response, Exception):
+            raise response
+        
+        # Not modified: the cached data is still current
+        cached = context["etag_cached"]
+        if response.status_code == 304 and cached is not None:
+            data = copy.deepcopy(cached[1])
+        
+        else:
+            try:
+                response.raise_for_status()
             
-            # Other HTTP errors
-            error_message = e.response.json().get(
-                "detail", e.response.text
-            ) if e.response.content else str(e)
+            except httpx.HTTPStatusError as e:
+                # Handle HTTP errors
+                if e.response.status_code == 401:
+                    self.logout()
+                    st.error("Unauthorized access. Please log in again.")
+                    st.rerun()  # Rerun to reflect logout
+                    return  {"error": "Unauthorized session cleared", "status_code": 401}
+                
+                # Other HTTP errors
+                error_message = e.response.json().get(
+                    "detail", e.response.text
+                ) if e.response.content else str(e)
+                
+                return {"error": error_message, "status_code": e.response.status_code}
+            
+            # Successful response
+            data = response.json() if response.content else {"message": "Success"}
             
-            return {"error": error_message, "status_code": e.response.status_code}
+            etag = response.headers.get("ETag")
+            if context["etag_key"] is not None and etag:
+                etag_cache = self._etag_cache()
+                etag_cache.pop(context["etag_key"], None)
+                etag_cache[context["etag_key"]] = (etag, copy.deepcopy(data))
+                # Drop the oldest entry beyond the cache size
+                if len(etag_cache) > ETAG_CACHE_SIZE:
+                    del etag_cache[next(iter(etag_cache))]
+        
+        if context["cache_key"] is not None:
+            self.response_cache.set(context["cache_key"], copy.deepcopy(data),
+                                    context["cache_ttl"])
+        return data
+    
+    def _request(self, method: str, url: str, secure: bool,
+                 cache_ttl: float | None = None, **kwarrgs) -> dict:
+        """Generic method to make API requests.
+        
+        GET responses are served from the response cache for `cache_ttl`
+        seconds (its default TTL when None, not cached when 0). Past that,
+        responses with an ETag are revalidated with `If-None-Match`: a 304
+        returns the data of the session's ETag cache. Within `gather`, the
+        request is only queued and its result is returned by `gather`.
+        """
         
-        # Handle Request exceptions
+        context = self._prepare_request(method, url, secure, kwarrgs, cache_ttl)
+        
+        if self._queued is not None:
+            self._queued.append(context)
+            return None
+        
+        if context["result"] is not None:
+            return context["result"]
+        
+        try:
+            response = self.transport.run(self.transport.send(method, url, **kwarrgs))
         except httpx.RequestError as e:
-            st.error(f"Network error or API unreachable: {e}")
-            return {"error": "API unreachable", "status_code": 503}
+            response = e
+        return self._handle_response(response, context)
+    
+    def _invalidate(self, result: dict, *url_prefixes: str, own: bool = False) -> None:
+        """Drop the cached responses a successful write made stale, of the
+        current user only with `own`, of every user otherwise."""
+        
+        if isinstance(result, dict) and "error" in result:
+            return
+        
+        user = st.session_state.get("username") if own else None
+        self.response_cache.invalidate(*url_prefixes, user=user)
+    
+    def _invalidate_username(self, result: dict, username: str | None) -> None:
+        """Drop every cached response of `username` after a successful write
+        freeing it (a deletion or a rename): another user may take the name
+        and would be served them. Every cached response when it is unknown."""
+        
+        if isinstance(result, dict) and "error" in result:
+            return
+        
+        if username is None:
+            self.response_cache.invalidate()
+        else:
+            self.response_cache.invalidate(user=username)
+    
+    def _username_of(self, user_id: int) -> str | None:
+        """The username of a user, None if it cannot be read."""
+        
+        user = self.read_user_by_id(user_id)
+        if not isinstance(user, dict) or "error" in user:
+            return None
+        return user.get("username")
+    
+    def _invalidate_todos(self, result: dict) -> None:
+        """Drop the cached responses made stale by a todo write: the todos of
+        the user and the admin views, which count them."""
+        
+        self._invalidate(result, "/todos", own=True)
+        self._invalidate(result, "/admin")
+    
+    def gather(self, *calls: Callable[[], Any]) -> list[Any]:
+        """Make independent API calls concurrently.
+        
+        Each call is a function making a single API request and returning its
+        result unchanged, such as the `read_*` methods:
+        
+            user, todos = client.gather(lambda: client.read_user_by_id(user_id),
+                                        lambda: client.read_user_todos_admin(user_id))
+        
+        Returns:
+            list: The result of every call, in order.
+        """
+        
+        self._queued = []
+        try:
+            for call in calls:
+                call()
+            queued = self._queued
+        finally:
+            self._queued = None
+        
+        # Only the calls missing from the response cache are sent
+        to_send = [context for context in queued if context["result"] is None]
+        responses = self.transport.run(self.transport.send_all(
+            [(context["method"], context["url"], context["kwargs"]) for context in to_send]
+        ))
+        for context, response in zip(to_send, responses):
+            context["result"] = self._handle_response(response, context)
+            
+        return [context["result"] for context in queued]
     
     # ---------------------------- Authentication ---------------------------- #
     def login(self, username: str, password: str) -> dict | bool:
@@ -104,12 +318,10 @@ class APIClient:
         result = self._request("POST", url, secure=False, data=data)
 
         if "error" not in result:
-            # Store token and login time in session state
-            token = result.get("access_token")
-            role = self._decode_access_token_role(token)
+            # Store tokens and login time in session state
+            role = self._decode_access_token_role(result.get("access_token"))
             st.session_state["user_role"] = role
-            st.session_state["auth_token"] = token
-            st.session_state["login_time"] = datetime.now(timezone.utc).isoformat()
+            self._store_tokens(result)
             st.session_state["username"] = username
             return True
         
@@ -129,8 +341,26 @@ class APIClient:
         return result
     
     def logout(self) -> None:
-        """Logout the current user by clearing session state."""
-        keys_to_remove = ["auth_token", "login_time", "username", "user_role"]
+        """Logout the current user by revoking the session and clearing session state."""
+        
+        # Best effort: the access token also revokes the refresh token of its
+        # session, an expired one needs no revocation. The session is cleared
+        # whatever the outcome
+        token = st.session_state.get("auth_token")
+        if token and not self._is_token_expired():
+            try:
+                self.transport.run(self.transport.send(
+                    "POST", "/auth/logout", headers={"Authorization": f"Bearer {token}"}
+                ))
+            except httpx.RequestError:
+                pass
+        
+        username = st.session_state.get("username")
+        if username is not None:
+            self.response_cache.invalidate(user=username)
+        
+        keys_to_remove = ["auth_token", "refresh_token", "token_expires_in", "login_time",
+                          "username", "user_role", "etag_cache"]
         for key in keys_to_remove:
             if key in st.session_state:
                 del st.session_state[key]
@@ -147,31 +377,47 @@ class APIClient:
         
         url = "/user/me"
         result = self._request("PUT", url, secure=True, json=data)
+        self._invalidate(result, "/user/me", own=True)
+        self._invalidate(result, "/admin/users")
+        # The cached responses are keyed by the username
+        if "error" not in result and "username" in data:
+            self._invalidate_username(result, st.session_state.get("username"))
+            st.session_state["username"] = data["username"]
         return result
     
     def change_password(self, data:dict[str, str]) -> dict:
         """Update the current user's profile data."""
         
         url = "/user/me/password"
-        result = self._request("PUT", url, secure=True, json=data)
+        # A repeated change fails the old password check
+        result = self._request("PUT", url, secure=True, retry=False, json=data)
         return result
     
     def delete_user_me(self) -> dict:
         
         url = "/user/me"
         result = self._request("DELETE", url, secure=True)
+        self._invalidate(result, own=True)
+        self._invalidate(result, "/admin")
         return result
     
     def create_todo(self, data: dict[str: Any]) -> dict:
         
         url = "/todos"
         result = self._request("POST", url, secure=True, json=data)
+        self._invalidate_todos(result)
         return result
     
     def read_all_todos(self, complete: bool | None = None,
-                       search: str | None = None) -> list[dict] | dict:
-        """Fetch all todos with optional filters for completion status or 
-        search query.
+                       search: str | None = None, sort: str | None = None,
+                       cursor: str | None = None, limit: int | None = None,
+                       cache_ttl: float | None = None) -> dict:
+        """Fetch one page of todos with optional filters for completion status
+        or search query, sorted by `sort` (e.g. "-priority") when given.
+        
+        Returns a dict with the todos of the page under `items` and the cursor
+        of the next page under `next_cursor` (None on the last page).
+        `cache_ttl=0` bypasses the response cache.
         """
         
         url = "/todos"
@@ -181,14 +427,57 @@ class APIClient:
             params["complete"] = complete
         if search is not None:
             params["search"] = search
+        if sort is not None:
+            params["sort"] = sort
+        if cursor is not None:
+            params["cursor"] = cursor
+        if limit is not None:
+            params["limit"] = limit
+        
+        result = self._request("GET", url, secure=True, cache_ttl=cache_ttl, params=params)
+        return result
+    
+    def read_todo_changes(self, since: str | None = None) -> dict:
+        """Fetch the todos created, updated or deleted since a sync token.
         
-        result = self._request("GET", url, secure=True, params=params)
+        Returns a dict with the changed todos under `changed`, the ids of the
+        deleted todos under `deleted` and the token of the next call under
+        `sync_token`. Without `since`, only the current token is returned.
+        """
+        
+        url = "/todos/changes"
+        params = {"since": since} if since is not None else {}
+        # Never cached, a stale token would miss the latest changes
+        result = self._request("GET", url, secure=True, cache_ttl=0, params=params)
+        return result
+    
+    def read_todo_stats(self) -> dict:
+        """Fetch the counts of the user's todos (`total`, `complete`, `pending`
+        and the same per priority under `by_priority`)."""
+        
+        url = "/todos/stats"
+        result = self._request("GET", url, secure=True)
         return result
     
     def update_todo(self, todo_id: int, data: dict[str: Any]) -> dict:
         
         url = f"/todos/{todo_id}"
         result = self._request("PUT", url, secure=True, json=data)
+        self._invalidate_todos(result)
+        
+        return result
+    
+    def update_todos_batch(self, items: list[dict[str, Any]]) -> dict:
+        """Update several todos in a single request, each item holding the id
+        of the todo and the fields to update.
+        
+        Returns a dict with one result per item under `results`, in request
+        order, each with its `id`, `status_code` and error `detail`.
+        """
+        
+        url = "/todos/batch"
+        result = self._request("PATCH", url, secure=True, json={"items": items})
+        self._invalidate_todos(result)
         
         return result
     
@@ -196,12 +485,21 @@ class APIClient:
         
         url = f"/todos/{todo_id}"
         result = self._request("DELETE", url, secure=True)
+        self._invalidate_todos(result)
         
         return result
     
     def read_all_users(self, role: str | None = None, 
                        username: str | None = None,
-                       is_active: bool | None = None) -> list[dict] | dict:
+                       is_active: bool | None = None,
+                       include_stats: bool = False,
+                       cursor: str | None = None,
+                       limit: int | None = None) -> dict:
+        """Fetch one page of users, see `read_all_todos` for the page format.
+        
+        With `include_stats`, every user has its `todo_count`, `complete_count`
+        and `last_activity`.
+        """
         
         url = "/admin/users"
         params = {}
@@ -211,6 +509,12 @@ class APIClient:
             params["username"] = username
         if is_active is not None:
             params["is_active"] = is_active
+        if include_stats:
+            params["include_stats"] = include_stats
+        if cursor is not None:
+            params["cursor"] = cursor
+        if limit is not None:
+            params["limit"] = limit
         result = self._request("GET", url, secure=True, params=params)
         
         return result
@@ -225,14 +529,29 @@ class APIClient:
     def update_user_by_id(self, user_id: int, data: dict[str, Any]) -> dict:
         
         url = f"/admin/users/{user_id}"
+        username = self._username_of(user_id) if "username" in data else None
         result = self._request("PUT", url, secure=True, json=data)
+        # The profile of the user is cached under its own username
+        self._invalidate(result, "/admin/users", "/user/me")
+        if "username" in data:
+            self._invalidate_username(result, username)
         
         return result
     
     def delete_user_by_id(self, user_id: int) -> dict:
         
         url = f"/admin/users/{user_id}"
+        username = self._username_of(user_id)
         result = self._request("DELETE", url, secure=True)
+        self._invalidate(result, "/admin")
+        self._invalidate_username(result, username)
+        
+        return result
+    
+    def read_todo_stats_admin(self) -> dict:
+        
+        url = "/admin/stats"
+        result = self._request("GET", url, secure=True)
         
         return result
     
@@ -243,9 +562,10 @@ class APIClient:
         
         return result
     
-    def read_user_todos_admin(self, user_id: int) -> list[dict] | dict:
+    def read_user_todos_admin(self, user_id: int, sort: str | None = None) -> list[dict] | dict:
         
         url = f"/admin/users/{user_id}/todos"
-        result = self._request("GET", url, secure=True)
+        params = {"sort": sort} if sort is not None else {}
+        result = self._request("GET", url, secure=True, params=params)
         
         return result
\ No newline at end of file
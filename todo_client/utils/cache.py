@@ -0,0 +1,80 @@
+"""Cache of the API responses, shared by every Streamlit session.
+
+GET responses are kept for a time-to-live, keyed by the user, the URL and the
+query parameters, so that page reruns do not call the API. `APIClient`
+invalidates the entries affected by its successful writes. Writes made by
+other clients (another browser, a direct API call) are seen once the entries
+expire, so the TTL bounds the staleness.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from todo_client.utils.config import RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_SIZE
+
+
+# (username, method, url, sorted query parameters)
+CacheKey = tuple[str | None, str, str, tuple]
+
+class ResponseCache:
+    """Size-bounded LRU cache whose entries expire after a time-to-live.
+    
+    Used by the threads of every session, its methods hold a lock.
+    
+    Args:
+        max_size (int): Maximum number of entries, the least recently used
+        entry is evicted beyond.
+        ttl (float): Default time-to-live of the entries, in seconds.
+    """
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[CacheKey, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        
+    @staticmethod
+    def key(user: str | None, method: str, url: str, params: dict | None) -> CacheKey:
+        return (user, method, url, tuple(sorted((params or {}).items())))
+    
+    def get(self, key: CacheKey) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: CacheKey, value: Any, ttl: float | None = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                
+    def invalidate(self, *url_prefixes: str, user: str | None = None) -> None:
+        """Drop the entries whose URL starts with one of `url_prefixes`, of
+        `user` only when given. Without prefixes, every entry (of `user`)."""
+        
+        with self._lock:
+            for key in [key for key in self._entries
+                        if (user is None or key[0] == user)
+                        and (not url_prefixes or key[2].startswith(url_prefixes))]:
+                del self._entries[key]
+                
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def create_response_cache() -> ResponseCache:
+    """A response cache configured from the environment, `APIClient` shares one
+    per process."""
+    
+    return ResponseCache(max_size=RESPONSE_CACHE_MAX_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS)
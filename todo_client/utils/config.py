@@ -4,3 +4,31 @@ from dotenv import load_dotenv
 # ========================= Load environment variables ======================= #
 load_dotenv()
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+
+# ============================== HTTP transport ============================== #
+# HTTP/2 needs the `h2` package (`httpx[http2]`), HTTP/1.1 is used without it
+API_HTTP2 = os.getenv("API_HTTP2", "auto").lower()
+# A connection is quickly known to fail, a response may take longer
+API_CONNECT_TIMEOUT_SECONDS = float(os.getenv("API_CONNECT_TIMEOUT_SECONDS", 3.0))
+API_READ_TIMEOUT_SECONDS = float(os.getenv("API_READ_TIMEOUT_SECONDS", 10.0))
+# Sending the request and waiting for a pooled connection
+API_TIMEOUT_SECONDS = float(os.getenv("API_TIMEOUT_SECONDS", 10.0))
+# Connections shared by every Streamlit session
+API_MAX_CONNECTIONS = int(os.getenv("API_MAX_CONNECTIONS", 20))
+API_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("API_MAX_KEEPALIVE_CONNECTIONS", 10))
+API_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("API_KEEPALIVE_EXPIRY_SECONDS", 30.0))
+
+# ============================== Response cache ============================== #
+# GET responses are served from the cache for this long, 0 disables the cache
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 30.0))
+RESPONSE_CACHE_MAX_SIZE = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", 1000))
+
+# =========================== Retries and breaker ============================ #
+# Retries of a failed request, with a jittered exponential backoff
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", 2))
+API_RETRY_BACKOFF_SECONDS = float(os.getenv("API_RETRY_BACKOFF_SECONDS", 0.25))
+API_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("API_RETRY_MAX_BACKOFF_SECONDS", 2.0))
+# Consecutive failures opening the circuit, requests then fail without being
+# sent until a trial request succeeds, at most every reset delay
+API_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("API_CIRCUIT_FAILURE_THRESHOLD", 5))
+API_CIRCUIT_RESET_SECONDS = float(os.getenv("API_CIRCUIT_RESET_SECONDS", 10.0))
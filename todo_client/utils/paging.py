@@ -0,0 +1,22 @@
+"""Paging of the items loaded by a page of the client.
+
+The API is paged with cursors: the pages load more items on demand, and render
+one view page of the loaded items at a time.
+"""
+from typing import TypeVar
+
+
+T = TypeVar("T")
+
+def view_page(items: list[T], page: int, page_size: int) -> tuple[list[T], int, int]:
+    """The items of a view page, the page being moved back to the last page
+    when the items shrank (deletion, filter).
+    
+    Returns:
+        tuple: The items of the page, the page index and the number of pages
+        (at least 1, for an empty list).
+    """
+    
+    page_count = max(1, -(-len(items) // page_size))
+    page = max(0, min(page, page_count - 1))
+    return items[page * page_size:(page + 1) * page_size], page, page_count
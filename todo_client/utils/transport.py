@@ -0,0 +1,265 @@
+"""HTTP transport shared by every Streamlit session.
+
+Streamlit runs each session's script in its own thread, and the API client
+keeps a synchronous interface for the pages. The requests are sent by a single
+`httpx.AsyncClient`, running on an event loop in a background thread: its
+connection pool (keep-alive, HTTP/2 when available) is shared by the sessions,
+and independent requests of a page are sent concurrently (`APIClient.gather`).
+
+Failed requests are retried with a jittered exponential backoff, and a circuit
+breaker fails the requests fast while the API is down, instead of having every
+session wait for its timeouts.
+"""
+import asyncio
+import importlib.util
+import random
+import threading
+import time
+from collections import Counter
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+import httpx
+
+from todo_client.utils.config import (API_BASE_URL, API_HTTP2, API_TIMEOUT_SECONDS,
+                                      API_CONNECT_TIMEOUT_SECONDS, API_READ_TIMEOUT_SECONDS,
+                                      API_MAX_CONNECTIONS, API_MAX_KEEPALIVE_CONNECTIONS,
+                                      API_KEEPALIVE_EXPIRY_SECONDS, API_MAX_RETRIES,
+                                      API_RETRY_BACKOFF_SECONDS, API_RETRY_MAX_BACKOFF_SECONDS,
+                                      API_CIRCUIT_FAILURE_THRESHOLD, API_CIRCUIT_RESET_SECONDS)
+
+
+T = TypeVar("T")
+
+# Methods a repeated request has the same effect for
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# Responses of an API restarting or overloaded, worth a retry
+RETRY_STATUS_CODES = {502, 503, 504}
+# Responses of an API unreachable behind a proxy, counted by the breaker. A 503
+# is an overloaded API (e.g. the Argon2 pool), not a down one.
+FAILURE_STATUS_CODES = {502, 504}
+
+def http2_enabled() -> bool:
+    """Whether to negotiate HTTP/2, `API_HTTP2` being "auto", "true" or "false"."""
+
+    if API_HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return API_HTTP2 in ("1", "true", "yes")
+
+# ============================== Circuit breaker ============================= #
+class CircuitOpenError(httpx.TransportError):
+    """The request was not sent, the circuit breaker is open."""
+
+class CircuitBreaker:
+    """Stops sending requests after consecutive failures.
+
+    Once `failure_threshold` requests failed in a row the circuit opens: the
+    requests fail without being sent. After `reset_timeout` a single trial
+    request is sent (half-open), its success closes the circuit and its
+    failure opens it again.
+
+    Args:
+        failure_threshold (int): Consecutive failures opening the circuit.
+        reset_timeout (float): Time before a trial request, in seconds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.opened = 0
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if self._trial else "open"
+
+    def retry_in(self) -> float:
+        """Seconds before the next trial request, 0 when one can be sent."""
+
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a request can be sent, marks the trial request as sent."""
+
+        # Only touched from the transport loop, no lock is needed
+        if self._opened_at is None:
+            return True
+        if self._trial or self.retry_in() > 0:
+            return False
+
+        self._trial = True
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def abort_trial(self) -> None:
+        """Forget the trial request, it ended without a response or a transport
+        error: the next request is the trial."""
+
+        self._trial = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._trial or (self._opened_at is None and self._failures >= self.failure_threshold):
+            self.opened += 1
+            self._opened_at = time.monotonic()
+            self._trial = False
+
+# ================================= Transport ================================ #
+class Transport:
+    """An `httpx.AsyncClient` and the event loop thread running its requests.
+
+    Args:
+        breaker (CircuitBreaker): The circuit breaker of the API.
+        max_retries (int): Retries of a failed request.
+        backoff (float): Base delay before a retry, doubled at each retry, in
+        seconds.
+        max_backoff (float): Maximum delay before a retry, in seconds.
+        client_options: Arguments of the `httpx.AsyncClient`.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, max_retries: int, backoff: float,
+                 max_backoff: float, **client_options: Any):
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # Requests sent, retried, failed and not sent (circuit open)
+        self.counters: Counter[str] = Counter()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="api-transport", daemon=True)
+        self._thread.start()
+        self.client = httpx.AsyncClient(**client_options)
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the transport loop and wait for its result, from
+        any other thread."""
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _retry_delay(self, retry: int, response: httpx.Response | None) -> float:
+        """Full jitter backoff, or the `Retry-After` of the response when given."""
+
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass  # An HTTP date, use the backoff
+
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (retry - 1)))
+
+    async def send(self, method: str, url: str, retry: bool = True,
+                   **kwargs: Any) -> httpx.Response:
+        """Send a request with the shared client, to run on the transport loop.
+
+        Idempotent requests are retried after a transport error (connection,
+        timeout) or a 502, 503 or 504 response, the others only when the
+        connection could not be established, since they were not received.
+        `retry=False` handles an idempotent method like the others, for the
+        requests whose repetition fails (e.g. a password change).
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            httpx.TransportError: If the last attempt failed.
+        """
+
+        idempotent = retry and method.upper() in IDEMPOTENT_METHODS
+        retries = 0
+        while True:
+            if not self.breaker.allow():
+                self.counters["short_circuited"] += 1
+                raise CircuitOpenError(
+                    f"API unavailable, next attempt in {self.breaker.retry_in():.0f}s"
+                )
+
+            self.counters["requests"] += 1
+            response = None
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                self.counters["failures"] += 1
+                not_received = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if retries >= self.max_retries or not (idempotent or not_received):
+                    raise
+            except BaseException:
+                # Neither an answer nor an unreachable API (decoding error,
+                # cancellation...), a pending trial must not block the circuit
+                self.breaker.abort_trial()
+                raise
+            else:
+                if response.status_code in FAILURE_STATUS_CODES:
+                    self.breaker.record_failure()
+                    self.counters["failures"] += 1
+                else:
+                    self.breaker.record_success()
+
+                if (response.status_code not in RETRY_STATUS_CODES or not idempotent
+                        or retries >= self.max_retries):
+                    return response
+                await response.aclose()
+
+            retries += 1
+            self.counters["retries"] += 1
+            await asyncio.sleep(self._retry_delay(retries, response))
+
+    async def send_all(self, requests: list[tuple[str, str, dict]]) -> list[httpx.Response | Exception]:
+        """Send `(method, url, kwargs)` requests concurrently.
+
+        Returns:
+            list: The response, or the raised exception, of every request in order.
+        """
+
+        return await asyncio.gather(*(self.send(method, url, **kwargs)
+                                      for method, url, kwargs in requests),
+                                    return_exceptions=True)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Counters of the transport, for monitoring."""
+
+        return {
+            "requests": self.counters["requests"],
+            "retries": self.counters["retries"],
+            "failures": self.counters["failures"],
+            "short_circuited": self.counters["short_circuited"],
+            "circuit_state": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+        }
+
+    def close(self) -> None:
+        """Close the connections and stop the loop."""
+
+        self.run(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+def create_transport() -> Transport:
+    """A transport configured from the environment, `APIClient` shares one per
+    process."""
+
+    return Transport(
+        breaker=CircuitBreaker(failure_threshold=API_CIRCUIT_FAILURE_THRESHOLD,
+                               reset_timeout=API_CIRCUIT_RESET_SECONDS),
+        max_retries=API_MAX_RETRIES,
+        backoff=API_RETRY_BACKOFF_SECONDS,
+        max_backoff=API_RETRY_MAX_BACKOFF_SECONDS,
+        base_url=API_BASE_URL,
+        http2=http2_enabled(),
+        timeout=httpx.Timeout(API_TIMEOUT_SECONDS, connect=API_CONNECT_TIMEOUT_SECONDS,
+                              read=API_READ_TIMEOUT_SECONDS),
+        limits=httpx.Limits(max_connections=API_MAX_CONNECTIONS,
+                            max_keepalive_connections=API_MAX_KEEPALIVE_CONNECTIONS,
+                            keepalive_expiry=API_KEEPALIVE_EXPIRY_SECONDS)
+    )